@@ -12,7 +12,45 @@ load_dotenv()
 class MonitorConfig:
     # 驱动模式：webhook/telegram
     driver_type: str  
+    ingest_workers: int = 4  # 消息处理worker数量
+    ingest_queue_size: int = 1000  # 接入队列最大长度
+    ingest_queue_policy: str = "reject"  # 队列满时的策略: reject(返回429)/drop_oldest(丢弃最早消息)
+    batch_max_items: int = 500  # 批量接口单次请求最多条数
+    dedup_enabled: bool = True  # 是否过滤重复推送
+    dedup_ttl_seconds: float = 1800  # 去重窗口(秒)
+    dedup_max_entries: int = 20000  # 去重记录的最大条目数
+    wal_enabled: bool = True  # 是否启用接收消息的预写日志
+    wal_dir: str = "data/wal"  # 预写日志目录
+    wal_segment_max_bytes: int = 16 * 1024 * 1024  # 单个日志分段的最大字节数
+    webhook_processes: int = 1  # webhook服务进程数, 大于1时启用多进程模式
+    webhook_reuse_port: bool = False  # 多进程模式下各进程以SO_REUSEPORT各自绑定端口, 否则共享父进程的监听socket
+    claim_db_path: str = "data/claims.db"  # 多进程模式下跨进程认领消息的SQLite文件
+    claim_lease_seconds: float = 300  # 处理中认领的租约时间(秒), 进程崩溃后其他进程在租约到期后可重新处理
+    priority_enabled: bool = True  # 是否按作者信号排序待分析的消息
+    priority_followers_weight: float = 1.0  # 每个数量级(log10)粉丝数的分数
+    priority_blue_verified_weight: float = 1.0  # 蓝V认证的分数
+    priority_verified_type_weights: Dict[str, float] = None  # 认证类型的分数, 如 Business:2,Government:2
+    priority_has_ca_weight: float = 2.0  # 用户资料中带合约地址的分数
+    priority_push_type_weights: Dict[str, float] = None  # 推送类型的分数, 如 new_tweet:1,new_description:0.5
+    priority_aging_per_second: float = 0.1  # 排队中的消息每等待1秒增加的分数, 避免低优先级消息饿死
+    browser_pages: int = 2  # 进程内常驻浏览器的页面数量, 即并发渲染页面的上限
+    browser_page_max_uses: int = 50  # 单个页面复用次数上限, 超过后重建
+    browser_ready_timeout: float = 10  # 等待推文页面就绪的最长时间(秒)
+    browser_lease_timeout: float = 30  # 等待空闲浏览器页面的最长时间(秒)
+    prefilter_enabled: bool = False  # 是否在调用大模型前做本地预筛选
+    prefilter_threshold: float = 1.0  # 预筛选分数低于该值的推文不调用大模型
+    prefilter_fast_path_enabled: bool = True  # 推文直接给出合约地址时是否跳过大模型直接搜索
+    prefilter_fast_path_score: float = 4.0  # 走快速路径的最低分数
+    prefilter_cashtag_weight: float = 2.0  # 每个非主流代币符号($TICKER)的分数
+    prefilter_ca_weight: float = 3.0  # 每个合约地址的分数
+    prefilter_keyword_weight: float = 1.0  # 每个meme关键词的分数(最多计3个)
+    prefilter_media_weight: float = 1.0  # 推文带图片或链接的分数
 
+    def __post_init__(self):
+        if self.priority_verified_type_weights is None:
+            self.priority_verified_type_weights = {"Business": 2.0, "Government": 2.0}
+        if self.priority_push_type_weights is None:
+            self.priority_push_type_weights = {"new_tweet": 1.0, "new_description": 0.5}
 
 
 @dataclass
@@ -23,12 +61,21 @@ class TelegramConfig:
     token: str
     notify_chat_id: int 
     news_push_chat_id: int 
+    workers: int = 4  # 并发解析消息的worker数量
+    queue_size: int = 200  # 待解析消息队列上限
+    message_timeout: float = 60  # 单条消息解析(抓取推文)超时(秒)
+    resolver_http_timeout: float = 5  # HTTP获取推文页面的超时(秒), 失败后使用浏览器渲染
+    resolver_cache_ttl: float = 600  # 推文解析结果缓存时间(秒)
+    resolver_cache_max_entries: int = 1000  # 推文解析结果缓存条目上限
+    templates_file: str = ""  # 自定义推送消息模板(JSON), 为空时只使用内置的kbot模板
 
 @dataclass
 class DingTalkConfig:
     """钉钉机器人配置"""
     token: str = ""  # 钉钉机器人token
     secret: str = ""  # 钉钉机器人加签密钥
+    rate_per_minute: int = 20  # 每分钟最多发送的通知数
+    queue_size: int = 1000  # 待发送通知的队列上限
 
 
 @dataclass
@@ -37,6 +84,39 @@ class LlmConfig:
     api_key: str
     base_url: str
     model: str
+    image_max_bytes: int = 10 * 1024 * 1024  # 下载图片的大小上限(字节)
+    image_max_dimension: int = 1024  # 图片最长边(像素), 超过时缩放后再上传
+    image_quality: int = 85  # 重新压缩图片的JPEG质量
+    image_fetch_timeout: float = 10  # 下载图片超时(秒)
+    image_cache_enabled: bool = True  # 是否按感知哈希缓存图片分析结果
+    image_cache_max_entries: int = 2048  # 内存中缓存的图片数
+    image_cache_ttl: float = 86400  # 图片分析缓存有效期(秒)
+    image_cache_threshold: int = 6  # 感知哈希汉明距离阈值, 不超过时视为同一张图
+    image_cache_db_path: str = ""  # 图片分析缓存的SQLite文件, 为空时只缓存在内存
+    image_max_count: int = 4  # 每条推文最多分析的图片数
+    image_total_bytes: int = 8 * 1024 * 1024  # 每条推文上传图片的总字节预算
+    image_parallel_calls: int = 1  # 多张图片分几次请求并发分析, 1表示全部放在一次请求中
+    overlap_text_image: bool = False  # 文本分析与图片分析同时进行, 文本已确定代币时不再等待图片(文本未确定时会多请求一次)
+    result_cache_enabled: bool = True  # 是否按归一化推文内容缓存分析结果
+    result_cache_max_entries: int = 5000  # 内存中缓存的分析结果数
+    result_cache_ttl: float = 0  # 分析结果缓存有效期(秒), 为0时与去重窗口(DEDUP_TTL_SECONDS)相同
+    result_cache_db_path: str = ""  # 分析结果缓存的SQLite文件, 为空时只缓存在内存
+    batch_size: int = 1  # 每次请求最多合并分析的推文数, 1表示每条推文单独请求
+    batch_window: float = 0.05  # 合并分析时等待更多推文的时间(秒)
+    stream: bool = False  # 流式返回分析结果, 代币名称输出后立即开始搜索代币
+    triage_model: str = ""  # 初筛模型(小而快的文本模型), 为空时不初筛
+    triage_base_url: str = ""  # 初筛模型的API基础URL, 为空时与 base_url 相同
+    triage_api_key: str = ""  # 初筛模型的API密钥, 为空时与 api_key 相同
+    triage_max_tokens: int = 4  # 初筛回复的最大token数, 只需要返回一个分数
+    triage_threshold: float = 50  # 初筛相关度(0-100)达到该值时才完整分析
+    triage_timeout: float = 5  # 初筛超时(秒), 超时或失败时直接完整分析
+    fallback_endpoints: str = ""  # 备用模型服务(JSON列表), 如 [{"base_url": "...", "api_key": "...", "model": "..."}]
+    request_timeout: float = 30  # 单次大模型请求超时(秒)
+    hedge_delay: float = 2  # 耗时样本不足时发送对冲请求前的等待时间(秒), 样本充足后使用服务的p95耗时
+    hedge_max_parallel: int = 2  # 同一请求最多同时发给几个服务
+    eject_after: int = 3  # 服务连续失败多少次后暂停使用
+    eject_seconds: float = 30  # 服务暂停使用的时间(秒)
+    json_mode: bool = True  # 文本分析使用JSON输出模式(response_format), 服务不支持时自动关闭
 
 @dataclass
 class TraderConfig:
@@ -75,12 +155,55 @@ class Config:
         self.telegram = telegram if telegram else TelegramConfig()
         self.dingtalk = dingtalk if dingtalk else DingTalkConfig()
 
+def _parse_weights(value: str) -> Dict[str, float]:
+    """解析 "key1:1.0,key2:0.5" 格式的权重配置"""
+    weights = {}
+    for item in value.split(","):
+        if ":" not in item:
+            continue
+        key, weight = item.rsplit(":", 1)
+        weights[key.strip()] = float(weight)
+    return weights
+
 def load_config() -> Config:
     """加载配置"""
     try:
         # 加载监控配置
         monitor_config = MonitorConfig(
-            driver_type=os.getenv("DRIVER_MODE", "webhook")
+            driver_type=os.getenv("DRIVER_MODE", "webhook"),
+            ingest_workers=int(os.getenv("INGEST_WORKERS", "4")),
+            ingest_queue_size=int(os.getenv("INGEST_QUEUE_SIZE", "1000")),
+            ingest_queue_policy=os.getenv("INGEST_QUEUE_POLICY", "reject"),
+            batch_max_items=int(os.getenv("BATCH_MAX_ITEMS", "500")),
+            dedup_enabled=os.getenv("DEDUP_ENABLED", "true").lower() == "true",
+            dedup_ttl_seconds=float(os.getenv("DEDUP_TTL_SECONDS", "1800")),
+            dedup_max_entries=int(os.getenv("DEDUP_MAX_ENTRIES", "20000")),
+            wal_enabled=os.getenv("WAL_ENABLED", "true").lower() == "true",
+            wal_dir=os.getenv("WAL_DIR", "data/wal"),
+            wal_segment_max_bytes=int(os.getenv("WAL_SEGMENT_MAX_BYTES", str(16 * 1024 * 1024))),
+            webhook_processes=int(os.getenv("WEBHOOK_PROCESSES", "1")),
+            webhook_reuse_port=os.getenv("WEBHOOK_REUSE_PORT", "false").lower() == "true",
+            claim_db_path=os.getenv("CLAIM_DB_PATH", "data/claims.db"),
+            claim_lease_seconds=float(os.getenv("CLAIM_LEASE_SECONDS", "300")),
+            priority_enabled=os.getenv("PRIORITY_ENABLED", "true").lower() == "true",
+            priority_followers_weight=float(os.getenv("PRIORITY_FOLLOWERS_WEIGHT", "1.0")),
+            priority_blue_verified_weight=float(os.getenv("PRIORITY_BLUE_VERIFIED_WEIGHT", "1.0")),
+            priority_verified_type_weights=_parse_weights(os.getenv("PRIORITY_VERIFIED_TYPE_WEIGHTS", "Business:2,Government:2")),
+            priority_has_ca_weight=float(os.getenv("PRIORITY_HAS_CA_WEIGHT", "2.0")),
+            priority_push_type_weights=_parse_weights(os.getenv("PRIORITY_PUSH_TYPE_WEIGHTS", "new_tweet:1,new_description:0.5")),
+            priority_aging_per_second=float(os.getenv("PRIORITY_AGING_PER_SECOND", "0.1")),
+            browser_pages=int(os.getenv("BROWSER_PAGES", "2")),
+            browser_page_max_uses=int(os.getenv("BROWSER_PAGE_MAX_USES", "50")),
+            browser_ready_timeout=float(os.getenv("BROWSER_READY_TIMEOUT", "10")),
+            browser_lease_timeout=float(os.getenv("BROWSER_LEASE_TIMEOUT", "30")),
+            prefilter_enabled=os.getenv("PREFILTER_ENABLED", "false").lower() == "true",
+            prefilter_threshold=float(os.getenv("PREFILTER_THRESHOLD", "1.0")),
+            prefilter_fast_path_enabled=os.getenv("PREFILTER_FAST_PATH_ENABLED", "true").lower() == "true",
+            prefilter_fast_path_score=float(os.getenv("PREFILTER_FAST_PATH_SCORE", "4.0")),
+            prefilter_cashtag_weight=float(os.getenv("PREFILTER_CASHTAG_WEIGHT", "2.0")),
+            prefilter_ca_weight=float(os.getenv("PREFILTER_CA_WEIGHT", "3.0")),
+            prefilter_keyword_weight=float(os.getenv("PREFILTER_KEYWORD_WEIGHT", "1.0")),
+            prefilter_media_weight=float(os.getenv("PREFILTER_MEDIA_WEIGHT", "1.0"))
         )
 
         # 加载Telegram配置
@@ -89,20 +212,62 @@ def load_config() -> Config:
             api_hash=os.getenv("TELEGRAM_API_HASH", ' '),
             token=os.getenv("TELEGRAM_TOKEN", ""),
             notify_chat_id=int(os.getenv("TELEGRAM_NOTIFY_CHAT_ID", -100000)),
-            news_push_chat_id=int(os.getenv("TELEGRAM_NEWS_PUSH_CHAT_ID", -100258))
+            news_push_chat_id=int(os.getenv("TELEGRAM_NEWS_PUSH_CHAT_ID", -100258)),
+            workers=int(os.getenv("TELEGRAM_WORKERS", "4")),
+            queue_size=int(os.getenv("TELEGRAM_QUEUE_SIZE", "200")),
+            message_timeout=float(os.getenv("TELEGRAM_MESSAGE_TIMEOUT", "60")),
+            resolver_http_timeout=float(os.getenv("TELEGRAM_RESOLVER_HTTP_TIMEOUT", "5")),
+            resolver_cache_ttl=float(os.getenv("TELEGRAM_RESOLVER_CACHE_TTL", "600")),
+            resolver_cache_max_entries=int(os.getenv("TELEGRAM_RESOLVER_CACHE_MAX_ENTRIES", "1000")),
+            templates_file=os.getenv("TELEGRAM_TEMPLATES_FILE", "")
         )
 
         # 加载钉钉配置
         dingtalk_config = DingTalkConfig(
             token=os.getenv("DINGTALK_TOKEN", ""),
             secret=os.getenv("DINGTALK_SECRET", ""),
+            rate_per_minute=int(os.getenv("DINGTALK_RATE_PER_MINUTE", "20")),
+            queue_size=int(os.getenv("DINGTALK_QUEUE_SIZE", "1000")),
         )
 
         # 加载LLM配置
         llm_config = LlmConfig(
             api_key=os.getenv("LLM_API_KEY", ""),
             base_url=os.getenv("LLM_BASE_URL", "https://api.openai.com/v1"),
-            model=os.getenv("LLM_MODEL", "gpt-4")
+            model=os.getenv("LLM_MODEL", "gpt-4"),
+            image_max_bytes=int(os.getenv("LLM_IMAGE_MAX_BYTES", str(10 * 1024 * 1024))),
+            image_max_dimension=int(os.getenv("LLM_IMAGE_MAX_DIMENSION", "1024")),
+            image_quality=int(os.getenv("LLM_IMAGE_QUALITY", "85")),
+            image_fetch_timeout=float(os.getenv("LLM_IMAGE_FETCH_TIMEOUT", "10")),
+            image_cache_enabled=os.getenv("LLM_IMAGE_CACHE_ENABLED", "true").lower() == "true",
+            image_cache_max_entries=int(os.getenv("LLM_IMAGE_CACHE_MAX_ENTRIES", "2048")),
+            image_cache_ttl=float(os.getenv("LLM_IMAGE_CACHE_TTL", "86400")),
+            image_cache_threshold=int(os.getenv("LLM_IMAGE_CACHE_THRESHOLD", "6")),
+            image_cache_db_path=os.getenv("LLM_IMAGE_CACHE_DB_PATH", ""),
+            image_max_count=int(os.getenv("LLM_IMAGE_MAX_COUNT", "4")),
+            image_total_bytes=int(os.getenv("LLM_IMAGE_TOTAL_BYTES", str(8 * 1024 * 1024))),
+            image_parallel_calls=int(os.getenv("LLM_IMAGE_PARALLEL_CALLS", "1")),
+            overlap_text_image=os.getenv("LLM_OVERLAP_TEXT_IMAGE", "false").lower() == "true",
+            result_cache_enabled=os.getenv("LLM_RESULT_CACHE_ENABLED", "true").lower() == "true",
+            result_cache_max_entries=int(os.getenv("LLM_RESULT_CACHE_MAX_ENTRIES", "5000")),
+            result_cache_ttl=float(os.getenv("LLM_RESULT_CACHE_TTL", "0")),
+            result_cache_db_path=os.getenv("LLM_RESULT_CACHE_DB_PATH", ""),
+            batch_size=int(os.getenv("LLM_BATCH_SIZE", "1")),
+            batch_window=float(os.getenv("LLM_BATCH_WINDOW", "0.05")),
+            stream=os.getenv("LLM_STREAM", "false").lower() == "true",
+            triage_model=os.getenv("LLM_TRIAGE_MODEL", ""),
+            triage_base_url=os.getenv("LLM_TRIAGE_BASE_URL", ""),
+            triage_api_key=os.getenv("LLM_TRIAGE_API_KEY", ""),
+            triage_max_tokens=int(os.getenv("LLM_TRIAGE_MAX_TOKENS", "4")),
+            triage_threshold=float(os.getenv("LLM_TRIAGE_THRESHOLD", "50")),
+            triage_timeout=float(os.getenv("LLM_TRIAGE_TIMEOUT", "5")),
+            fallback_endpoints=os.getenv("LLM_FALLBACK_ENDPOINTS", ""),
+            request_timeout=float(os.getenv("LLM_REQUEST_TIMEOUT", "30")),
+            hedge_delay=float(os.getenv("LLM_HEDGE_DELAY", "2")),
+            hedge_max_parallel=int(os.getenv("LLM_HEDGE_MAX_PARALLEL", "2")),
+            eject_after=int(os.getenv("LLM_EJECT_AFTER", "3")),
+            eject_seconds=float(os.getenv("LLM_EJECT_SECONDS", "30")),
+            json_mode=os.getenv("LLM_JSON_MODE", "true").lower() == "true"
         )
         
         # 加载交易配置
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+from loguru import logger
+from core.data_def import Msg
+from core.dedup import normalize_content
+from core.media import payload_images
+from core.processor import TwitterLinkProcessor
+from utils.ttl_cache import TTLCache
+
+
+def analysis_key(msg: Msg, prompt_version: str, model: str = "",
+                 image_fingerprint: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    计算推文分析结果的缓存键
+
+    键由归一化后的文本、推送类型、图片指纹、模型和提示词版本组成.
+    图片指纹默认取推送自带的媒体链接; 推送没有媒体但带 t.co 短链时使用短链本身,
+    这类推文只有同一条推文重复推送时才会命中, 避免不同图片的推文共用结果.
+
+    Returns:
+        str: 缓存键, 文本和图片都为空时返回 None(不缓存)
+    """
+    text = normalize_content(msg.content or '')
+    if image_fingerprint is None:
+        short_url = TwitterLinkProcessor.extract_short_url(msg.content or '')
+        image_fingerprint = payload_images(msg) or ([short_url] if short_url else [])
+    images = sorted(set(image_fingerprint))
+    if not text and not images:
+        return None
+    raw = json.dumps([prompt_version, model, msg.push_type or '', text, images], ensure_ascii=False)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class AnalysisResultCache:
+    """推文分析结果缓存
+
+    复制粘贴的喊单、机器人转发以及重复推送的用户简介文本完全相同, 命中缓存时直接返回之前的分析结果.
+    内存中为带过期时间的 LRU; 配置 db_path 时同时写入 SQLite, 重启后可复用.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl: float = 3600.0, db_path: Optional[str] = None):
+        """
+        Args:
+            max_entries: 内存中最多缓存的结果数
+            ttl: 缓存有效期(秒)
+            db_path: SQLite 文件路径, 为空时只使用内存缓存
+        """
+        self.ttl = ttl
+        self.db_path = db_path
+        # 键 -> 分析结果的JSON, 取出时重新解析, 调用方修改结果不影响缓存
+        self._memory = TTLCache(max_entries=max_entries, ttl=ttl)
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.disk_hits = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS analysis_result "
+                         "(key TEXT PRIMARY KEY, result TEXT, created_at REAL)")
+            self._conn = conn
+        return self._conn
+
+    def load(self) -> int:
+        """从 SQLite 加载最近的未过期记录到内存, 并清理过期记录, 返回加载条数"""
+        if not self.db_path:
+            return 0
+        now = time.time()
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM analysis_result WHERE created_at < ?", (now - self.ttl,))
+            rows = conn.execute(
+                "SELECT key, result, created_at FROM analysis_result ORDER BY created_at DESC LIMIT ?",
+                (self._memory.max_entries,)
+            ).fetchall()
+        for key, result, created_at in reversed(rows):
+            self._memory.set(key, result, ttl=self.ttl - (now - created_at))
+        return len(rows)
+
+    def _lookup_disk_sync(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT result, created_at FROM analysis_result WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def _store_disk_sync(self, key: str, result: str, created_at: float):
+        with self._db_lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO analysis_result (key, result, created_at) VALUES (?, ?, ?)",
+                (key, result, created_at)
+            )
+
+    async def get(self, key: str) -> Optional[dict]:
+        """查找分析结果, 先查内存再查 SQLite"""
+        result = self._memory.get(key)
+        if result is None and self.db_path:
+            loop = asyncio.get_running_loop()
+            try:
+                row = await loop.run_in_executor(None, self._lookup_disk_sync, key)
+            except Exception as e:
+                logger.warning(f"读取分析结果缓存失败: {str(e)}")
+                row = None
+            if row:
+                result = row[0]
+                self._memory.set(key, result, ttl=self.ttl - (time.time() - row[1]))
+                self.disk_hits += 1
+        return json.loads(result) if result is not None else None
+
+    async def set(self, key: str, result: dict):
+        """写入分析结果"""
+        data = json.dumps(result, ensure_ascii=False)
+        self._memory.set(key, data)
+        if self.db_path:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, self._store_disk_sync, key, data, time.time())
+            except Exception as e:
+                logger.warning(f"写入分析结果缓存失败: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        return stats
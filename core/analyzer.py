@@ -1,11 +1,20 @@
-import requests
 from datetime import datetime
-from openai import AsyncOpenAI
-from typing import Dict, List, Optional, Any
+from openai import BadRequestError
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import json
-import base64
+import re
+from core.media import MediaResolver, payload_images
 from core.processor import TwitterLinkProcessor
-from core.data_def import Msg
+from core.image_cache import ImageAnalysisCache, image_hash
+from core.analysis_cache import AnalysisResultCache, analysis_key
+from core.prefilter import MAINSTREAM_TOKENS
+from core.llm_client import HedgedLlmClient, LlmEndpoint
+from utils.micro_batch import MicroBatcher
+from utils.json_stream import JsonFieldStream
+from utils.json_repair import loads_lenient
+from utils.metrics import LatencyTracker
+from utils.image_fetch import FetchedImage, fetch_image, shrink_image_async, sniff_content_type
+from core.data_def import AIAnalysisResult, Msg, normalize_token_name
 
 
 import asyncio
@@ -15,55 +24,199 @@ from loguru import logger
 from dataclasses import dataclass
 from typing import List, Optional
 
+# 分析提示词版本, 修改下面的提示词时需要递增, 使之前缓存的分析结果失效
+PROMPT_VERSION = "1"
+# 不带 $ 前缀时按完整单词确认代币名称的最小长度
+_CONFIDENT_MIN_WORD_LEN = 3
+
+_SYSTEM_PROMPT = """你是一个加密货币领域的专家，特别擅长识别新发行的代币和小市值代币。
+                    你了解加密货币市场的各种现象，包括：
+                    1. 土狗币的常见命名模式（如模因、热点话题等）
+                    2. 营销话术和炒作手法
+                    3. 代币发行和预售的典型流程
+                    4. 社区运营和传播策略
+                    请基于这些知识，帮助分析内容中可能涉及的新代币。"""
+
+_ANALYSIS_POINTS = """分析要点：
+1. 直接相关信息：
+   - 代币名称或符号
+   - 价格信息和走势
+   - 交易所信息
+   - 图表或技术指标
+
+2. 潜在影响因素：
+   - 是否包含知名人物（如Elon Musk）或热门话题
+   - 是否涉及热门meme元素或梗图
+   - 是否包含可能引发新meme代币的关键词或概念
+   - 是否有病毒式传播的潜力
+
+3. 市场影响分析：
+   - 内容与现有meme代币的关联度
+   - 可能对哪些代币价格产生影响
+   - 传播影响力评估
+
+4. 情感分析：
+   - 推文的整体情感倾向
+   - 社区反应预测
+   - 市场情绪影响"""
+
+_RESULT_FORMAT = """{
+    "speculate_result": [
+        {
+            "token_name": "已有或潜在的代币名称（这个字段只展示代币名，不要附加任何额外的信息",
+            "reason": "详细分析原因",
+            "key_elements": ["关键影响元素"]
+        }
+    ]
+}"""
+
+_TRIAGE_PROMPT = """你是加密货币推文的初筛分类器。判断推文是否可能与某个代币相关, 尤其是新发行的土狗币/meme币:
+包括直接提到代币名称、符号或合约地址, 发币、预售、空投等信息, 以及可能引发新meme币的热点人物、事件和梗。
+只讨论BTC、ETH等主流币行情、日常问候或与加密货币无关的内容视为不相关。
+只回答一个0到100之间的整数, 表示相关的可能性, 不要输出任何其他内容。"""
+
+_FILTER_RULES = f"""注意：
+1. 代币名称为单个英文单词
+2. reason 需要详细解释为什么认为这是土狗币
+3. 如果提到多个代币,按可能性从高到低排序,最多返回3个
+4. 严格过滤:{'、'.join(MAINSTREAM_TOKENS)}等主流代币和已上架大型交易所的代币都不应该包含在结果中
+5. 如果无法确定是土狗币，返回空列表
+6. 如果不是推文中提到,不要给代币名添加Token或者Coin之类的字符
+7. 推文内容存在"@xxx"格式，大概率是某个用户用户名，不要分析为代币，请忽略
+8. 返回的代币名称,不能包含币对信息,例如BTC-USDT,只返回BTC
+9. 如果只是提到主流代币（如比特币、以太坊等）或者只是讨论行情，应该返回空列表"""
+
+
 class LlmAnalyzer:
     """大模型分析器，用于分析推文内容"""
 
-    def __init__(self, api_key: str , base_url: str , model: str):
+    def __init__(self, api_key: str , base_url: str , model: str,
+                 image_max_bytes: int = 10 * 1024 * 1024, image_max_dimension: int = 1024,
+                 image_quality: int = 85, image_fetch_timeout: float = 10.0,
+                 image_cache: Optional[ImageAnalysisCache] = None, image_max_count: int = 4,
+                 image_total_bytes: int = 8 * 1024 * 1024, image_parallel_calls: int = 1,
+                 overlap_text_image: bool = False, result_cache: Optional[AnalysisResultCache] = None,
+                 batch_size: int = 1, batch_window: float = 0.05, stream: bool = False,
+                 triage_model: str = "", triage_base_url: str = "", triage_api_key: str = "",
+                 triage_max_tokens: int = 4, triage_threshold: float = 50, triage_timeout: float = 5.0,
+                 fallback_endpoints: Optional[List[LlmEndpoint]] = None, request_timeout: float = 30.0,
+                 hedge_delay: float = 2.0, hedge_max_parallel: int = 2,
+                 eject_after: int = 3, eject_seconds: float = 30.0, json_mode: bool = True):
         """初始化 AI 处理器
 
         Args:
             api_key (str): API密钥
             base_url (str, optional): API基础URL. Defaults to OPENAI_BASE_URL.
             model (str, optional): 模型名称. Defaults to OPENAI_MODEL.
+            image_max_bytes (int): 下载图片的大小上限
+            image_max_dimension (int): 图片最长边, 超过时缩放后再上传
+            image_quality (int): 重新压缩图片的JPEG质量
+            image_fetch_timeout (float): 下载图片超时(秒)
+            image_cache (ImageAnalysisCache): 图片分析结果缓存, 为空时不缓存
+            image_max_count (int): 每条推文最多分析的图片数
+            image_total_bytes (int): 每条推文上传图片的总字节预算
+            image_parallel_calls (int): 多张图片分几次请求并发分析, 1 表示全部放在一次请求中
+            overlap_text_image (bool): 文本分析与图片分析是否同时进行
+            result_cache (AnalysisResultCache): 推文分析结果缓存, 为空时不缓存
+            batch_size (int): 每次请求最多合并分析的推文数, 1 表示不合并
+            batch_window (float): 合并分析时等待更多推文的时间(秒)
+            stream (bool): 是否流式返回, 开启后每个代币名称返回完整时立即回调 on_tokens
+            triage_model (str): 初筛模型, 为空时不初筛, 所有推文直接完整分析
+            triage_base_url (str): 初筛模型的API基础URL, 为空时与完整分析相同
+            triage_api_key (str): 初筛模型的API密钥, 为空时与完整分析相同
+            triage_max_tokens (int): 初筛回复的最大token数
+            triage_threshold (float): 初筛打分(0-100)达到该值时才完整分析
+            triage_timeout (float): 初筛超时(秒), 超时或失败时直接完整分析
+            fallback_endpoints (List[LlmEndpoint]): 备用模型服务, 主服务响应慢或失败时对冲请求
+            request_timeout (float): 单次请求超时(秒)
+            hedge_delay (float): 样本不足时发送对冲请求前的等待时间(秒), 样本充足后使用服务的 p95 耗时
+            hedge_max_parallel (int): 同一请求最多同时发给几个服务
+            eject_after (int): 服务连续失败多少次后暂停使用
+            eject_seconds (float): 服务暂停使用的时间(秒)
+            json_mode (bool): 文本分析是否使用JSON输出模式, 服务不支持时自动关闭
         """
-        self.client = AsyncOpenAI(
-            api_key=api_key,
-            base_url=base_url.rstrip('/'),
+        self.client = HedgedLlmClient(
+            [LlmEndpoint(base_url=base_url, api_key=api_key, name="primary")] + list(fallback_endpoints or []),
+            timeout=request_timeout,
+            hedge_delay=hedge_delay,
+            max_parallel=hedge_max_parallel,
+            eject_after=eject_after,
+            eject_seconds=eject_seconds,
         )
         self.model = model
-
-
-    def _encode_image_from_url(self, image_url: str) -> Optional[str]:
+        self.json_mode = json_mode
+        self.image_max_bytes = image_max_bytes
+        self.image_max_dimension = image_max_dimension
+        self.image_quality = image_quality
+        self.image_fetch_timeout = image_fetch_timeout
+        self.image_cache = image_cache
+        self.image_max_count = image_max_count
+        self.image_total_bytes = image_total_bytes
+        self.image_parallel_calls = image_parallel_calls
+        self.overlap_text_image = overlap_text_image
+        self.result_cache = result_cache
+        # 缓存键 -> 正在进行的分析, 同时到达的相同推文只请求一次
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 突发流量下把短时间内到达的多条推文合并到一次请求中分析
+        self.text_batcher = MicroBatcher(
+            self._analyze_text_batch, max_size=batch_size, window=batch_window, name="LLM分析"
+        ) if batch_size > 1 else None
+        self.stream = stream
+        # 两级模型: 小模型快速判断推文是否与代币相关, 只有相关的推文才使用完整提示词和多模态模型
+        self.triage_model = triage_model
+        # 初筛只有一个服务, 不对冲也不改发, 使用同一客户端是为了统一超时、失败统计和耗时统计
+        self.triage_client = HedgedLlmClient(
+            [LlmEndpoint(base_url=triage_base_url or base_url, api_key=triage_api_key or api_key, name="triage")],
+            timeout=triage_timeout,
+            eject_after=eject_after,
+            eject_seconds=eject_seconds,
+        ) if triage_model else None
+        self.triage_max_tokens = triage_max_tokens
+        self.triage_threshold = triage_threshold
+        self.triage_timeout = triage_timeout
+        self.triage_counts = {"passed": 0, "rejected": 0, "errors": 0}
+        # 各级模型请求耗时
+        self.latency = {"triage": LatencyTracker(), "text": LatencyTracker(), "vision": LatencyTracker()}
+        # 推文图片解析: 优先使用推送自带的媒体
+        self.media_resolver = MediaResolver()
+
+
+    async def _encode_image_from_url(self, image_url: str) -> Optional[FetchedImage]:
         """
-        从URL获取图片并转换为base64格式
+        异步下载图片, 缩放压缩后用于上传
 
         Args:
             image_url: 图片URL
 
         Returns:
-            str: base64编码的图片数据
+            FetchedImage: 图片数据及实际类型
         """
         try:
-            response = requests.get(image_url)
-            response.raise_for_status()
-            return base64.b64encode(response.content).decode('utf-8')
+            image = await fetch_image(image_url, max_bytes=self.image_max_bytes,
+                                      timeout=self.image_fetch_timeout)
+            original_size = len(image.data)
+            image = await shrink_image_async(image, self.image_max_dimension, self.image_quality)
+            logger.debug(f"图片大小: {original_size} -> {len(image.data)}, 类型: {image.content_type}")
+            return image
         except Exception as e:
             logger.error(f"获取图片失败: {str(e)}")
             return None
 
-    def _encode_image_from_file(self, image_path: str) -> Optional[str]:
+    async def _encode_image_from_file(self, image_path: str) -> Optional[FetchedImage]:
         """
-        从本地文件读取图片并转换为base64格式
+        从本地文件读取图片, 缩放压缩后用于上传
 
         Args:
             image_path: 图片文件路径
 
         Returns:
-            str: base64编码的图片数据
+            FetchedImage: 图片数据及实际类型
         """
         try:
             with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
+                data = image_file.read()
+            image = FetchedImage(data, sniff_content_type(data))
+            return await shrink_image_async(image, self.image_max_dimension, self.image_quality)
         except Exception as e:
             logger.error(f"读取图片文件失败: {str(e)}")
             return None
@@ -89,50 +242,86 @@ class LlmAnalyzer:
         Returns:
             Dict: 分析结果
         """
-        try:
-            logger.info(f'开始分析图片{image_source}')
-            # 获取base64编码的图片
-            image_base64 = (
-                self._encode_image_from_url(image_source) if is_url
-                else self._encode_image_from_file(image_source)
-            )
+        return await self.analyze_images([image_source], is_url=is_url, prompt=prompt, max_tokens=max_tokens)
 
-            if not image_base64:
-                return {"error": "图片编码失败"}
+    async def analyze_images(
+            self,
+            image_sources: List[str],
+            is_url: bool = True,
+            prompt: str = "请详细描述这张图片的内容",
+            max_tokens: int = 1000
+    ) -> Dict[str, Any]:
+        """
+        分析多张图片
 
-            # 准备API请求，使用await等待异步操作完成
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_base64}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=max_tokens
-            )
+        图片并发下载和压缩, 超出数量上限或总字节预算的图片不再分析;
+        命中缓存的图片复用之前的描述, 其余图片按 image_parallel_calls 分组,
+        每组在一次多模态请求中分析, 各组并发请求.
+
+        Args:
+            image_sources: 图片URL或本地文件路径列表
+            is_url: 是否为URL
+            prompt: 分析提示
+            max_tokens: 每次请求的最大返回token数
+
+        Returns:
+            Dict: 分析结果, analysis 为各图片描述的汇总
+        """
+        try:
+            sources = list(dict.fromkeys(image_sources))[:self.image_max_count]
+            logger.info(f'开始分析图片{sources}')
+            loaded = await asyncio.gather(*(
+                self._encode_image_from_url(source) if is_url else self._encode_image_from_file(source)
+                for source in sources
+            ))
+            images = self._apply_bytes_budget([image for image in loaded if image])
+            if not images:
+                return {"error": "图片编码失败"}
 
-            # 保存结果
-            result = {
+            # 相似图片(转发的同一张梗图)直接复用之前的分析结果
+            descriptions: List[Optional[str]] = [None] * len(images)
+            keys: List[Optional[int]] = [None] * len(images)
+            if self.image_cache:
+                loop = asyncio.get_running_loop()
+                keys = list(await asyncio.gather(*(
+                    loop.run_in_executor(None, image_hash, image.data) for image in images
+                )))
+                for index, key in enumerate(keys):
+                    descriptions[index] = await self.image_cache.get(key, prompt)
+            pending = [index for index, description in enumerate(descriptions) if description is None]
+            if len(pending) < len(images):
+                logger.info(f"{len(images) - len(pending)} 张图片分析命中缓存")
+
+            groups = self._group_images(pending)
+            results = await asyncio.gather(*(
+                self._describe_images([images[index] for index in group], prompt, max_tokens)
+                for group in groups
+            ))
+            for group, description in zip(groups, results):
+                if len(group) == 1:
+                    descriptions[group[0]] = description
+                    if keys[group[0]] is not None and description:
+                        await self.image_cache.set(keys[group[0]], description, prompt)
+                else:
+                    # 多张图片在一次请求中分析, 描述无法拆分到单张图片, 不写入缓存
+                    descriptions[group[0]] = description
+                    for index in group[1:]:
+                        descriptions[index] = ''
+
+            parts = [d for d in descriptions if d]
+            if len(images) == 1 or len(parts) == 1:
+                analysis = parts[0] if parts else ''
+            else:
+                analysis = "\n".join(f"图片{i}: {d}" for i, d in enumerate(parts, 1))
+            return {
                 "timestamp": datetime.now().isoformat(),
-                "analysis": response.choices[0].message.content,
+                "analysis": analysis,
                 "prompt": prompt,
+                "image_count": len(images),
+                "cached": not pending,
                 "status": "success"
             }
 
-            return result
-
         except Exception as e:
             logger.error(f"分析图片时出错: {str(e)}")
             return {
@@ -141,167 +330,485 @@ class LlmAnalyzer:
                 "status": "error"
             }
 
+    def _apply_bytes_budget(self, images: List[FetchedImage]) -> List[FetchedImage]:
+        """按顺序保留图片, 直到总字节数超出预算(至少保留一张)"""
+        kept, total = [], 0
+        for image in images:
+            total += len(image.data)
+            if kept and total > self.image_total_bytes:
+                logger.warning(f"图片总大小超出预算 {self.image_total_bytes}, 跳过剩余 {len(images) - len(kept)} 张图片")
+                break
+            kept.append(image)
+        return kept
+
+    def _group_images(self, indexes: List[int]) -> List[List[int]]:
+        """把待分析的图片平均分为最多 image_parallel_calls 组"""
+        if not indexes:
+            return []
+        count = max(1, min(self.image_parallel_calls, len(indexes)))
+        return [indexes[i::count] for i in range(count)]
+
+    async def _describe_images(self, images: List[FetchedImage], prompt: str, max_tokens: int) -> str:
+        """在一次多模态请求中分析一组图片"""
+        text = prompt if len(images) == 1 else f"{prompt}\n共 {len(images)} 张图片, 请按顺序分别描述每张图片。"
+        content = [{"type": "text", "text": text}]
+        content.extend({"type": "image_url", "image_url": {"url": image.to_data_url()}} for image in images)
+        with self.latency["vision"].measure():
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": content}],
+                max_tokens=max_tokens
+            )
+        return response.choices[0].message.content or ''
+
 
-    async def analyze_content(self, tweet_msg: Msg) -> Optional[dict]:
+    async def analyze_content(self, tweet_msg: Msg,
+                              on_tokens: Optional[Callable[[List[str]], None]] = None) -> Optional[AIAnalysisResult]:
         """
         统一的内容分析方法，可以同时处理文本和图片内容
+
+        配置了 result_cache 时, 按归一化文本、图片指纹和提示词版本缓存分析结果,
+        重复推送直接返回缓存; 相同推文同时到达时共用一次分析.
+
+        Args:
+            tweet_msg: 推文消息
+            on_tokens: 提前得到代币名称时的回调, 便于调用方提前开始搜索代币
+        Returns:
+            AIAnalysisResult: 分析结果，包含发现的代币信息; 分析失败时为 None
+        """
+        result = await self._analyze_cached(tweet_msg, on_tokens)
+        return AIAnalysisResult.from_dict(result) if result is not None else None
+
+    async def _analyze_cached(self, tweet_msg: Msg,
+                              on_tokens: Optional[Callable[[List[str]], None]] = None) -> Optional[dict]:
+        """经过结果缓存的分析, 返回大模型输出的JSON"""
+        model = f"{self.triage_model}>{self.model}" if self.triage_model else self.model
+        key = analysis_key(tweet_msg, PROMPT_VERSION, model) if self.result_cache else None
+        if key is None:
+            return await self._analyze_content(tweet_msg, on_tokens)
+        cached = await self.result_cache.get(key)
+        if cached is not None:
+            logger.info("推文内容命中分析结果缓存")
+            return cached
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                result = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # 发起分析的任务被取消(如超时)时, 由当前任务重新分析
+                if not pending.cancelled():
+                    raise
+                return await self._analyze_cached(tweet_msg, on_tokens)
+            return json.loads(json.dumps(result)) if result is not None else None
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        image_failures: List[str] = []
+        try:
+            result = await self._analyze_content(tweet_msg, on_tokens, image_failures)
+            future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        # 分析失败(None)或图片分析失败只按文本分析的结果不缓存, 下次重新请求
+        if result is None:
+            return result
+        if image_failures:
+            logger.info(f"图片分析失败({image_failures[0]}), 分析结果不写入缓存")
+            return result
+        await self.result_cache.set(key, result)
+        return result
+
+    async def _analyze_content(self, tweet_msg: Msg,
+                               on_tokens: Optional[Callable[[List[str]], None]] = None,
+                               image_failures: Optional[List[str]] = None) -> Optional[dict]:
+        """
+        分析推文文本和图片内容(不经过结果缓存)
+
+        overlap_text_image 开启时, 文本分析与图片解析/分析同时进行:
+        文本分析得到推文中明确出现的代币时立即回调 on_tokens 并直接返回, 不再等待图片;
+        否则等待图片描述, 结合图片重新分析.
+
         Args:
-            tweet_text: 推文文本内容
+            tweet_msg: 推文消息
+            on_tokens: 提前得到代币名称时的回调, 便于调用方提前开始搜索代币
+            image_failures: 图片解析或分析失败时在其中记录原因
         Returns:
             AIAnalysisResult: 分析结果，包含发现的代币信息
         """
         try:
-            tweet_text = tweet_msg.content
-            image_ai_analysis = None
+            if self.triage_client is not None and not await self._triage(tweet_msg):
+                return {"speculate_result": []}
+            if not self.overlap_text_image or not self._may_have_images(tweet_msg):
+                image_ai_analysis = await self._describe_tweet_images(tweet_msg, image_failures)
+                return await self._analyze_text(tweet_msg, image_ai_analysis, on_tokens)
+
+            image_task = asyncio.ensure_future(self._describe_tweet_images(tweet_msg, image_failures))
             try:
-                image_url = await TwitterLinkProcessor.extract_image_url(tweet_text)
-                if image_url:
-                    logger.info(f"找到推文中的图片链接{image_url}")
-                    result = await self.analyze_image(
-                        image_source=image_url,
-                        is_url=True,
-                        prompt="请详细描述这张图片中的内容，包括主要元素、场景和任何值得注意的细节"
-                    )
-                    if result["status"] == "success":
-                        logger.info(f"分析结果:{result}")
-                        result_ana = result.get("analysis")
-                        if result_ana:
-                            image_ai_analysis = result_ana
-                    else:
-                        logger.error(f'图片分析失败, {result}')
-            except Exception as e:
-                import traceback
-                traceback.print_exc()
-                logger.error(f'图片解析处理失败， {e}')
-            # 后续代码确保没有对字典对象使用 await
-            if tweet_msg.push_type == "new_description":
-               tweet_text  = f'修改了用户简介,新的简介为:{tweet_text}'
-            # 准备消息内容
-            messages = [
-                {
-                    "role": "system",
-                    "content": """你是一个加密货币领域的专家，特别擅长识别新发行的代币和小市值代币。
-                    你了解加密货币市场的各种现象，包括：
-                    1. 土狗币的常见命名模式（如模因、热点话题等）
-                    2. 营销话术和炒作手法
-                    3. 代币发行和预售的典型流程
-                    4. 社区运营和传播策略
-                    请基于这些知识，帮助分析内容中可能涉及的新代币。"""
-                }
-            ]
+                text_result = await self._analyze_text(tweet_msg, None, on_tokens)
+                confident = self._confident_tokens(text_result, tweet_msg.content)
+                if confident:
+                    logger.info(f"文本分析已得到推文中出现的代币 {confident}, 不再等待图片分析")
+                    if on_tokens:
+                        on_tokens(confident)
+                    return text_result
+                image_ai_analysis = await image_task
+            finally:
+                if not image_task.done():
+                    image_task.cancel()
+            if not image_ai_analysis:
+                return text_result
+            # 结合图片描述重新分析
+            return await self._analyze_text(tweet_msg, image_ai_analysis, on_tokens)
 
-            # 构建用户消息
-            user_content = [
-                {
-                    "type": "text",
-                    "text": f"""分析这条推文内容，重点关注以下几个方面：
+        except Exception as e:
+            logger.error(f"Error analyzing content: {str(e)}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return None
 
-推文内容：
-{tweet_text}
+    async def _triage(self, tweet_msg: Msg) -> bool:
+        """
+        用初筛模型判断推文是否可能与代币相关
 
-分析要点：
-1. 直接相关信息：
-   - 代币名称或符号
-   - 价格信息和走势
-   - 交易所信息
-   - 图表或技术指标
+        Returns:
+            bool: True 表示需要完整分析; 初筛超时、失败或回复无法解析时也返回 True
+        """
+        tweet_text = self._tweet_text(tweet_msg)
+        if self._may_have_images(tweet_msg):
+            tweet_text += "\n(推文带有图片或链接)"
+        try:
+            with self.latency["triage"].measure():
+                response = await asyncio.wait_for(self.triage_client.chat.completions.create(
+                    model=self.triage_model,
+                    messages=[
+                        {"role": "system", "content": _TRIAGE_PROMPT},
+                        {"role": "user", "content": tweet_text},
+                    ],
+                    temperature=0,
+                    max_tokens=self.triage_max_tokens
+                ), self.triage_timeout)
+            reply = (response.choices[0].message.content or '') if response.choices else ''
+            match = re.search(r'\d+', reply)
+            if match is None:
+                raise ValueError(f"无法解析初筛回复: {reply!r}")
+            score = int(match.group(0))
+        except Exception as e:
+            self.triage_counts["errors"] += 1
+            logger.warning(f"初筛失败, 直接完整分析: {type(e).__name__} {str(e)}")
+            return True
+        if score >= self.triage_threshold:
+            self.triage_counts["passed"] += 1
+            logger.info(f"初筛相关度 {score}, 进入完整分析")
+            return True
+        self.triage_counts["rejected"] += 1
+        logger.info(f"初筛相关度 {score}, 低于 {self.triage_threshold}, 不做完整分析")
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """各级模型的请求耗时和初筛统计"""
+        return {
+            "latency": {tier: tracker.stats() for tier, tracker in self.latency.items()},
+            "triage": dict(self.triage_counts, model=self.triage_model,
+                           client=self.triage_client.stats() if isinstance(self.triage_client, HedgedLlmClient) else None)
+            if self.triage_client else None,
+            "client": self.client.stats() if isinstance(self.client, HedgedLlmClient) else None,
+        }
 
-2. 潜在影响因素：
-   - 是否包含知名人物（如Elon Musk）或热门话题
-   - 是否涉及热门meme元素或梗图
-   - 是否包含可能引发新meme代币的关键词或概念
-   - 是否有病毒式传播的潜力
+    def _may_have_images(self, tweet_msg: Msg) -> bool:
+        """推文是否可能带图片(推送自带媒体或包含短链接)"""
+        return bool(payload_images(tweet_msg) or tweet_msg.urls
+                    or TwitterLinkProcessor.extract_short_url(tweet_msg.content or ''))
 
-3. 市场影响分析：
-   - 内容与现有meme代币的关联度
-   - 可能对哪些代币价格产生影响
-   - 传播影响力评估
+    @staticmethod
+    def _confident_tokens(result: Any, tweet_text: str) -> List[str]:
+        """
+        分析结果中在推文原文里直接出现的代币名称
 
-4. 情感分析：
-   - 推文的整体情感倾向
-   - 社区反应预测
-   - 市场情绪影响
+        以 $TICKER 形式出现, 或名称不少于3个字符且作为完整单词出现才算;
+        "AI"、"ME"、"X" 这类短名称在普通推文中随处可见, 只认 $ 前缀的写法
+        """
+        if not result or not tweet_text:
+            return []
+        confident = []
+        for name in AIAnalysisResult.from_dict(result).token_names:
+            prefix = r'\$?' if len(name) >= _CONFIDENT_MIN_WORD_LEN else r'\$'
+            if re.search(rf'(?<![\w$]){prefix}{re.escape(name)}(?!\w)', tweet_text, re.I):
+                confident.append(name)
+        return confident
+
+    async def _describe_tweet_images(self, tweet_msg: Msg,
+                                     failures: Optional[List[str]] = None) -> Optional[str]:
+        """解析并分析推文中的图片, 返回图片描述; 有图片但分析失败时在 failures 中记录原因"""
+        try:
+            images = await self.media_resolver.resolve(tweet_msg)
+            if not images:
+                return None
+            logger.info(f"找到推文中的图片链接{images}")
+            result = await self.analyze_images(
+                images,
+                is_url=True,
+                prompt="请详细描述这张图片中的内容，包括主要元素、场景和任何值得注意的细节"
+            )
+            if result.get("status") == "success" and result.get("analysis"):
+                logger.info(f"分析结果:{result}")
+                return result["analysis"]
+            logger.error(f'图片分析失败, {result}')
+            error = result.get("error") or "图片描述为空"
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            logger.error(f'图片解析处理失败， {e}')
+            error = str(e)
+        if failures is not None:
+            failures.append(error)
+        return None
+
+    @staticmethod
+    def _tweet_text(tweet_msg: Msg) -> str:
+        """推文文本, 用户简介变更时加上说明"""
+        tweet_text = tweet_msg.content
+        if tweet_msg.push_type == "new_description":
+            tweet_text = f'修改了用户简介,新的简介为:{tweet_text}'
+        return tweet_text
+
+    def _build_messages(self, tweet_msg: Msg, image_ai_analysis: Optional[str]) -> List[dict]:
+        """构建文本分析的请求消息"""
+        tweet_text = self._tweet_text(tweet_msg)
+        # 准备消息内容
+        messages = [
+            {
+                "role": "system",
+                "content": _SYSTEM_PROMPT
+            }
+        ]
+
+        # 构建用户消息
+        user_content = [
+            {
+                "type": "text",
+                "text": f"""分析这条推文内容，重点关注以下几个方面：
+
+推文内容：
+{tweet_text}
+
+{_ANALYSIS_POINTS}
 
 请用JSON格式返回分析结果,格式如下:
-{{
-    "speculate_result": [
-        {{
-            "token_name": "已有或潜在的代币名称（这个字段只展示代币名，不要附加任何额外的信息",
-            "reason": "详细分析原因",
-            "key_elements": ["关键影响元素"]
-        }}
-    ]
-}}
+{_RESULT_FORMAT}
 如果没有发现比较确定的代币信息，请返回空。
 
-注意：
-1. 代币名称为单个英文单词
-2. reason 需要详细解释为什么认为这是土狗币
-3. 如果提到多个代币,按可能性从高到低排序,最多返回3个
-4. 严格过滤:BTC、ETH、USDT、SOL、TON、DOGE、XRP、BCH、LTC、BNB等主流代币和已上架大型交易所的代币都不应该包含在结果中
-5. 如果无法确定是土狗币，返回空列表
-6. 如果不是推文中提到,不要给代币名添加Token或者Coin之类的字符
-7. 推文内容存在"@xxx"格式，大概率是某个用户用户名，不要分析为代币，请忽略
-8. 返回的代币名称,不能包含币对信息,例如BTC-USDT,只返回BTC
-9. 如果只是提到主流代币（如比特币、以太坊等）或者只是讨论行情，应该返回空列表
+{_FILTER_RULES}
 
 
 {f"推文中存在图片,以下内容为图片内容描述,请结合起来分析,图片中也可能包含meme币信息: {image_ai_analysis}" if image_ai_analysis else ""}
 """
 
-                }
-            ]
-
-            messages.append({
+            }
+        ]
+
+        messages.append({
+            "role": "user",
+            "content": user_content
+        })
+
+        return messages
+
+    def _build_batch_messages(self, items: List[Tuple[Msg, Optional[str]]]) -> List[dict]:
+        """构建多条推文合并分析的请求消息, 推文按序号 1..N 编号"""
+        tweets = []
+        for index, (tweet_msg, image_ai_analysis) in enumerate(items, 1):
+            block = f"推文ID: {index}\n推文内容：\n{self._tweet_text(tweet_msg)}"
+            if image_ai_analysis:
+                block += f"\n推文中存在图片,以下内容为图片内容描述,请结合起来分析,图片中也可能包含meme币信息: {image_ai_analysis}"
+            tweets.append(block)
+        tweets_text = "\n\n".join(tweets)
+        return [
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {
                 "role": "user",
-                "content": user_content
-            })
+                "content": [{
+                    "type": "text",
+                    "text": f"""分析以下{len(items)}条推文内容，每条推文单独分析，互不影响，重点关注以下几个方面：
 
-            request_start_time = time.time()
-            # 调用 API
-            response = await self.client.chat.completions.create(
+{tweets_text}
+
+{_ANALYSIS_POINTS}
+
+请用JSON格式返回分析结果,以推文ID为键,每条推文的结果格式如下:
+{{
+    "推文ID": {_RESULT_FORMAT.replace(chr(10), chr(10) + "    ")}
+}}
+每条推文都必须返回结果,没有发现比较确定的代币信息的推文返回空列表。
+
+{_FILTER_RULES}
+"""
+                }]
+            }
+        ]
+
+    async def _analyze_text(self, tweet_msg: Msg, image_ai_analysis: Optional[str],
+                            on_tokens: Optional[Callable[[List[str]], None]] = None) -> Optional[dict]:
+        """
+        分析推文文本(可附带图片描述)
+
+        开启合并分析时与同时到达的推文一起请求(合并请求不流式返回, 不会提前回调 on_tokens)
+        """
+        if self.text_batcher is not None:
+            return await self.text_batcher.submit((tweet_msg, image_ai_analysis))
+        return await self._analyze_text_single(tweet_msg, image_ai_analysis, on_tokens)
+
+    async def _analyze_text_batch(self, items: List[Tuple[Msg, Optional[str]]]) -> List[Optional[dict]]:
+        """
+        在一次请求中分析多条推文
+
+        结果按推文序号取回; 返回内容无法解析或缺少某条推文时, 缺少的推文单独重新分析
+        """
+        if len(items) == 1:
+            return [await self._analyze_text_single(*items[0])]
+        messages = self._build_batch_messages(items)
+        request_start_time = time.time()
+        with self.latency["text"].measure():
+            response = await self._create_text_completion(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1000 * len(items)
+            )
+        logger.info(f"AI batch analysis of {len(items)} tweets took {time.time() - request_start_time:.2f} seconds")
+
+        parsed = None
+        truncated = False
+        if response.choices:
+            content = response.choices[0].message.content
+            logger.info(f"API Response: {content}")
+            parsed = self._parse_response(content)
+            truncated = getattr(response.choices[0], "finish_reason", None) == "length"
+        results: List[Optional[dict]] = []
+        missing = []
+        for index in range(len(items)):
+            value = parsed.get(str(index + 1)) if isinstance(parsed, dict) else None
+            if not isinstance(value, dict):
+                missing.append(index)
+            results.append(value if isinstance(value, dict) else None)
+        if truncated:
+            # 输出被截断时最后一条推文的结果可能不完整, 同样单独重新分析
+            last = max((index for index, value in enumerate(results) if value is not None), default=None)
+            if last is not None:
+                results[last] = None
+                missing.append(last)
+        if missing:
+            logger.warning(f"合并分析缺少 {len(missing)}/{len(items)} 条推文的结果, 单独重新分析")
+            retried = await asyncio.gather(*(self._analyze_text_single(*items[i]) for i in missing),
+                                           return_exceptions=True)
+            for index, value in zip(missing, retried):
+                results[index] = None if isinstance(value, BaseException) else value
+        return results
+
+    async def _analyze_text_single(self, tweet_msg: Msg, image_ai_analysis: Optional[str],
+                                   on_tokens: Optional[Callable[[List[str]], None]] = None) -> Optional[dict]:
+        """调用大模型分析推文文本(可附带图片描述), 返回解析后的JSON"""
+        messages = self._build_messages(tweet_msg, image_ai_analysis)
+        if self.stream:
+            result = await self._stream_completion(messages, on_tokens)
+            return self._parse_response(result) if result else None
+        request_start_time = time.time()
+        # 调用 API
+        with self.latency["text"].measure():
+            response = await self._create_text_completion(
                 model=self.model,
                 messages=messages,
                 temperature=0.7,
                 max_tokens=1000
             )
-            logger.info(f"AI analysis took {time.time() - request_start_time:.2f} seconds")
+        logger.info(f"AI analysis took {time.time() - request_start_time:.2f} seconds")
 
-            if not response.choices:
-                logger.error(f"Invalid API response: {response}")
-                return None
+        if not response.choices:
+            logger.error(f"Invalid API response: {response}")
+            return None
 
-            result = response.choices[0].message.content
-            logger.info(f"API Response: {result}")
+        result = response.choices[0].message.content
+        logger.info(f"API Response: {result}")
+        return self._parse_response(result)
 
+    async def _create_text_completion(self, **kwargs):
+        """
+        文本分析请求, 开启 json_mode 时要求返回JSON对象
+
+        只有错误信息指明不支持 response_format/json_object 时才关闭 json_mode 后重试;
+        上下文过长、内容审核等其他参数错误与输出模式无关, 直接抛出
+        """
+        if self.json_mode:
             try:
-                # 处理可能的 markdown 代码块
-                if '```' in result:
-                    parts = result.split('```')
-                    for part in parts:
-                        if '{' in part and '}' in part:
-                            # 移除可能的语言标识符 (如 'json')
-                            if part.strip().startswith('json'):
-                                part = part[4:]
-                            result = part.strip()
-                            break
-
-                # 解析JSON并创建AIAnalysisResult实例
-                parsed_result = json.loads(result)
-                # return AIAnalysisResult.from_dict(parsed_result)
-                return parsed_result
-            except json.JSONDecodeError:
-                logger.error(f"Failed to parse AI response as JSON: {result}")
-                return None
-            except Exception as e:
-                logger.error(f"Error processing AI response: {str(e)}")
-                return None
+                return await self.client.chat.completions.create(response_format={"type": "json_object"}, **kwargs)
+            except BadRequestError as e:
+                if not self._is_json_mode_unsupported(e):
+                    raise
+                logger.warning(f"模型服务不支持JSON输出模式, 已关闭: {str(e)}")
+                self.json_mode = False
+        return await self.client.chat.completions.create(**kwargs)
+
+    @staticmethod
+    def _is_json_mode_unsupported(error: BadRequestError) -> bool:
+        """参数错误是否由 response_format 引起"""
+        message = f"{error} {getattr(error, 'body', '') or ''}".lower()
+        return "response_format" in message or "json_object" in message
+
+    async def _stream_completion(self, messages: List[dict],
+                                 on_tokens: Optional[Callable[[List[str]], None]] = None) -> str:
+        """
+        流式调用大模型, 返回完整的回复文本
 
-        except Exception as e:
-            logger.error(f"Error analyzing content: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
+        代币名称在 reason 之前输出, 每个 token_name 完整后立即回调 on_tokens,
+        调用方可以在模型输出分析原因的同时开始搜索代币.
+        """
+        request_start_time = time.time()
+        token_names = JsonFieldStream("token_name")
+        with self.latency["text"].measure():
+            stream = await self._create_text_completion(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1000,
+                stream=True
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                # 与 AIAnalysisResult.from_dict 相同的归一化, 调用方可以按最终结果中的名称复用提前开始的搜索
+                names = [name for name in map(normalize_token_name, token_names.feed(delta)) if name]
+                if names:
+                    logger.info(f"流式返回中得到代币名称 {names}, 耗时 {time.time() - request_start_time:.2f} seconds")
+                    if on_tokens:
+                        on_tokens(names)
+        logger.info(f"AI analysis took {time.time() - request_start_time:.2f} seconds")
+        logger.info(f"API Response: {token_names.text}")
+        return token_names.text
+
+    @staticmethod
+    def _parse_response(result: str) -> Optional[Any]:
+        """
+        解析大模型返回的JSON
+
+        兼容 markdown 代码块、多余的逗号和被截断的输出; 仍然无法解析时从文本中提取已完整的代币名称
+        """
+        if not result:
             return None
+        parsed_result = loads_lenient(result)
+        if parsed_result is not None:
+            return parsed_result
+        token_names = JsonFieldStream("token_name")
+        token_names.feed(result)
+        if token_names.values:
+            logger.warning(f"AI response is not valid JSON, extracted token names: {token_names.values}")
+            return {"speculate_result": [{"token_name": name} for name in token_names.values]}
+        logger.error(f"Failed to parse AI response as JSON: {result}")
+        return None
 
 
 
@@ -472,7 +979,7 @@ class TokenSearcher:
         return safe_tokens
 
     async def search_token_inner(self, token_name: str, chain: str) -> TokenSearchResponse:
-        from curl_cffi import requests
+        from curl_cffi.requests import AsyncSession
 
         # 请求头
         headers = {
@@ -495,13 +1002,14 @@ class TokenSearcher:
         try:
             # 构建请求 URL
             url = f'https://gmgn.ai/defi/quotation/v1/tokens/{chain}/search?q={token_name}'
-            # 使用curl_cffi进行请求，它支持更好的浏览器模拟
-            response = requests.get(
-                url,
-                headers=headers,
-                impersonate='chrome120',
-                verify=False
-            )
+            # 使用curl_cffi进行请求，它支持更好的浏览器模拟; 异步请求不阻塞事件循环
+            async with AsyncSession() as session:
+                response = await session.get(
+                    url,
+                    headers=headers,
+                    impersonate='chrome120',
+                    verify=False
+                )
 
             if response.status_code == 200:
                 data = response.json()
@@ -1,5 +1,6 @@
-from dataclasses import dataclass
-from typing import List, Optional
+import json
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Dict, List, Optional, Union
 
 @dataclass
 class User:
@@ -71,3 +72,264 @@ class Msg:
     content: str
     name: str
     screen_name: str
+    tweet_id: str = ''
+    msg_id: str = ''  # 接收时分配的记录ID(WAL)
+    # 作者信号, 用于消息优先级排序
+    followers_count: int = 0
+    is_blue_verified: bool = False
+    verified_type: str = ''
+    has_ca: bool = False
+    # 推送中自带的媒体(图片/视频封面)和链接, 分析时优先使用, 无需再抓取短链接
+    medias: List[str] = field(default_factory=list)
+    urls: List[str] = field(default_factory=list)
+    media_type: str = ''  # 推送中推文的媒体类型, 如 photo/video
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Msg":
+        """从字典构建, 忽略未知字段(兼容旧版本写入的WAL记录)"""
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+
+# ---------------------------------------------------------------------------
+# 推送消息快速解码
+#
+# 完整的 User/Tweet dataclass 字段较多, 且对缺失/未知字段直接报错.
+# 分析流程只用到其中少数字段, 这里使用 __slots__ 精简记录, 嵌套对象在首次访问时才构建.
+# ---------------------------------------------------------------------------
+
+try:
+    import orjson
+
+    def json_loads(data: Union[str, bytes]) -> Any:
+        """优先使用 orjson 解析 JSON"""
+        return orjson.loads(data)
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+    def json_loads(data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+def _from_dict(cls, data: Dict[str, Any]):
+    """按 dataclass 字段宽松构建实例: 忽略未知字段, 缺失字段填 None"""
+    return cls(**{f.name: data.get(f.name) for f in fields(cls)})
+
+
+def _str_list(items: Any) -> List[str]:
+    """把推送中的 medias/urls 统一为字符串列表, 兼容 null 和 {"expanded_url": ...} 形式
+
+    带 type/media_type 的媒体对象只保留图片(photo), 视频和GIF的封面不作为图片使用
+    """
+    if not items:
+        return []
+    if not isinstance(items, list):
+        items = [items]
+    result = []
+    for item in items:
+        if isinstance(item, dict):
+            media_type = item.get("type") or item.get("media_type")
+            if media_type and media_type != "photo":
+                continue
+            item = item.get("expanded_url") or item.get("media_url_https") or item.get("url")
+        if isinstance(item, str) and item:
+            result.append(item)
+    return result
+
+
+class UserRecord:
+    """推送中的用户信息(精简版)"""
+    __slots__ = ("id_str", "name", "screen_name", "followers_count", "is_blue_verified",
+                 "verified_type", "ca", "has_ca")
+
+    def __init__(self, data: Dict[str, Any]):
+        get = data.get
+        self.id_str = str(get("id_str") or get("id") or "")
+        self.name = get("name") or ""
+        self.screen_name = get("screen_name") or ""
+        self.followers_count = get("followers_count") or 0
+        self.is_blue_verified = bool(get("is_blue_verified"))
+        self.verified_type = get("verified_type") or ""
+        self.ca = get("ca") or ""
+        self.has_ca = bool(get("has_ca"))
+
+    def __repr__(self):
+        return f"UserRecord(screen_name={self.screen_name!r}, name={self.name!r}, followers_count={self.followers_count})"
+
+
+class TweetRecord:
+    """推送中的推文信息(精简版)"""
+    __slots__ = ("tweet_id", "text", "media_type", "medias", "urls", "is_retweet", "is_quote",
+                 "is_reply", "related_tweet_id", "ca", "has_ca")
+
+    def __init__(self, data: Dict[str, Any]):
+        get = data.get
+        self.tweet_id = str(get("tweet_id") or "")
+        self.text = get("text") or ""
+        self.media_type = get("media_type") or ""
+        self.medias = get("medias") or []
+        self.urls = get("urls")
+        self.is_retweet = bool(get("is_retweet"))
+        self.is_quote = bool(get("is_quote"))
+        self.is_reply = bool(get("is_reply"))
+        self.related_tweet_id = get("related_tweet_id") or ""
+        self.ca = get("ca") or ""
+        self.has_ca = bool(get("has_ca"))
+
+    def __repr__(self):
+        return f"TweetRecord(tweet_id={self.tweet_id!r}, media_type={self.media_type!r})"
+
+
+class PushRecord:
+    """推送消息解码结果, user/tweet 在首次访问时才构建"""
+    __slots__ = ("push_type", "title", "content", "_user_raw", "_tweet_raw", "_user", "_tweet")
+
+    def __init__(self, push_type: str, title: str, content: str,
+                 user_raw: Dict[str, Any], tweet_raw: Optional[Dict[str, Any]] = None):
+        self.push_type = push_type
+        self.title = title
+        self.content = content
+        self._user_raw = user_raw
+        self._tweet_raw = tweet_raw
+        self._user = None
+        self._tweet = None
+
+    @property
+    def user(self) -> UserRecord:
+        if self._user is None:
+            self._user = UserRecord(self._user_raw)
+        return self._user
+
+    @property
+    def tweet(self) -> Optional[TweetRecord]:
+        if self._tweet is None and self._tweet_raw:
+            self._tweet = TweetRecord(self._tweet_raw)
+        return self._tweet
+
+    def to_msg(self) -> Msg:
+        """转换为分析流程使用的 Msg"""
+        user = self.user
+        tweet = self.tweet
+        return Msg(
+            push_type=self.push_type,
+            title=self.title,
+            content=self.content,
+            name=user.name,
+            screen_name=user.screen_name,
+            tweet_id=tweet.tweet_id if tweet else '',
+            followers_count=user.followers_count,
+            is_blue_verified=user.is_blue_verified,
+            verified_type=user.verified_type,
+            has_ca=user.has_ca,
+            medias=_str_list(tweet.medias) if tweet else [],
+            urls=_str_list(tweet.urls) if tweet else [],
+            media_type=tweet.media_type if tweet else ''
+        )
+
+    def to_push_msg(self) -> PushMsg:
+        """转换为完整的 PushMsg, 缺失字段为 None"""
+        return PushMsg(
+            push_type=self.push_type,
+            title=self.title,
+            content=self.content,
+            user=_from_dict(User, self._user_raw),
+            tweet=_from_dict(Tweet, self._tweet_raw) if self._tweet_raw else None
+        )
+
+    def __repr__(self):
+        return f"PushRecord(push_type={self.push_type!r}, title={self.title!r}, content={self.content[:50]!r})"
+
+
+def decode_push(raw_data: Union[str, bytes, Dict[str, Any]]) -> PushRecord:
+    """
+    解码单条推送消息
+
+    Args:
+        raw_data: 原始JSON字符串/字节或已解析的字典
+
+    Returns:
+        PushRecord: 解码结果
+
+    Raises:
+        ValueError: 数据不是JSON对象或缺少用户信息
+    """
+    data = json_loads(raw_data) if isinstance(raw_data, (str, bytes)) else raw_data
+    if not isinstance(data, dict):
+        raise ValueError("push message must be a json object")
+    user_raw = data.get("user")
+    if not isinstance(user_raw, dict):
+        raise ValueError("push message missing user object")
+
+    push_type = data.get("push_type") or ""
+    # 只有new_tweet类型才有tweet数据
+    tweet_raw = data.get("tweet") if push_type == "new_tweet" else None
+    if not isinstance(tweet_raw, dict):
+        tweet_raw = None
+
+    return PushRecord(
+        push_type=push_type,
+        title=data.get("title") or "",
+        content=data.get("content") or "",
+        user_raw=user_raw,
+        tweet_raw=tweet_raw
+    )
+
+
+def normalize_token_name(name: Any) -> str:
+    """代币名称去掉前缀 $ 和币对后缀(BTC-USDT 只保留 BTC)"""
+    name = str(name or '').strip().lstrip('$')
+    return name.replace('/', '-').split('-')[0].strip()
+
+
+@dataclass
+class SpeculateToken:
+    """大模型推测的代币"""
+    token_name: str
+    reason: str = ""
+    key_elements: List[str] = field(default_factory=list)
+
+
+@dataclass
+class AIAnalysisResult:
+    """推文分析结果"""
+    speculate_result: List[SpeculateToken] = field(default_factory=list)
+
+    @property
+    def token_names(self) -> List[str]:
+        return [token.token_name for token in self.speculate_result]
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "AIAnalysisResult":
+        """
+        从大模型返回的JSON构建结果, 容忍常见的格式偏差
+
+        - speculate_result 缺失或为空时视为没有发现代币, 也接受直接返回的列表
+        - 列表元素可以是对象或代币名称字符串, 没有代币名称的元素忽略
+        - 代币名称去掉前缀 $ 和币对后缀(BTC-USDT 只保留 BTC), 重复的代币只保留第一个
+        """
+        items = data.get("speculate_result") if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            items = []
+        tokens: List[SpeculateToken] = []
+        seen = set()
+        for item in items:
+            if isinstance(item, str):
+                item = {"token_name": item}
+            if not isinstance(item, dict):
+                continue
+            name = normalize_token_name(item.get("token_name"))
+            if not name or name.upper() in seen:
+                continue
+            seen.add(name.upper())
+            elements = item.get("key_elements")
+            if not isinstance(elements, list):
+                elements = [elements] if elements else []
+            tokens.append(SpeculateToken(
+                token_name=name,
+                reason=str(item.get("reason") or ''),
+                key_elements=[str(element) for element in elements if element is not None],
+            ))
+        return cls(speculate_result=tokens)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"speculate_result": [asdict(token) for token in self.speculate_result]}
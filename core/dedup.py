@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+from core.data_def import Msg
+from utils.ttl_cache import TTLCache
+
+_URL_PATTERN = re.compile(r'https?://\S+')
+_RETWEET_PREFIX = re.compile(r'^rt\s+@\w+:\s*')
+_NON_WORD = re.compile(r'[^\w$@#]+')
+
+
+def normalize_content(text: str) -> str:
+    """
+    归一化推文内容, 用于识别重复推送
+
+    去掉链接(同一内容的 t.co 短链每次都不同)、转推前缀、大小写和多余的标点空白
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).lower()
+    text = _URL_PATTERN.sub(' ', text)
+    text = _RETWEET_PREFIX.sub('', text.strip())
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def message_keys(msg: Msg, min_content_len: int = 8) -> Iterator[Tuple[str, str]]:
+    """
+    生成消息的去重键
+
+    Yields:
+        (键类型, 键): 键类型为 tweet_id 或 content
+    """
+    if msg.tweet_id:
+        yield "tweet_id", f"id:{msg.tweet_id}"
+    normalized = normalize_content(msg.content)
+    if len(normalized) >= min_content_len:
+        digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).hexdigest()
+        yield "content", f"c:{msg.push_type}:{digest}"
+
+
+class MessageDeduplicator:
+    """按 tweet_id 和归一化内容哈希过滤重复推送"""
+
+    def __init__(self, ttl: float = 1800.0, max_entries: int = 20000, min_content_len: int = 8):
+        """
+        Args:
+            ttl: 去重窗口(秒)
+            max_entries: 最多记录的键数量, 超出后淘汰最久未命中的
+            min_content_len: 归一化内容短于该长度时不按内容去重, 避免误伤 "gm" 之类的短推文
+        """
+        self.min_content_len = min_content_len
+        self._seen = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.duplicates = {"tweet_id": 0, "content": 0}
+        self.unique = 0
+
+    def check(self, msg: Msg) -> Optional[str]:
+        """
+        检查消息是否重复, 未重复时记录该消息
+
+        Returns:
+            Optional[str]: 重复时返回命中的键类型(tweet_id/content), 否则返回None
+        """
+        keys = list(message_keys(msg, self.min_content_len))
+        for kind, key in keys:
+            if key in self._seen:
+                # 刷新其余键, 让同一内容的后续变体也能命中
+                for _, other in keys:
+                    self._seen.set(other)
+                self.duplicates[kind] += 1
+                logger.info(f"过滤重复推送({kind}): {msg.screen_name}-{msg.content[:50]}")
+                return kind
+        for _, key in keys:
+            self._seen.set(key)
+        self.unique += 1
+        return None
+
+    def forget(self, msg: Msg):
+        """
+        撤销 check 对该消息的记录
+
+        消息未能处理(被其他进程认领或分析失败)时调用, 之后的重复推送或WAL重放可以重新处理
+        """
+        for _, key in message_keys(msg, self.min_content_len):
+            self._seen.pop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = sum(self.duplicates.values())
+        return {
+            "hits": hits,
+            "misses": self.unique,
+            "hits_by_key": dict(self.duplicates),
+            "tracked_keys": len(self._seen),
+            "evictions": self._seen.evictions,
+        }
+
+
+class SharedClaimStore:
+    """基于 SQLite 的跨进程认领表
+
+    多进程部署时每个进程都有自己的内存去重, 同一条推文可能被不同进程各处理一次.
+    处理前先在共享的 SQLite 文件中认领消息的去重键, 只有认领成功的进程继续分析和交易.
+
+    认领先以 lease 秒的租约记录, 处理完成后 confirm 延长到完整的 ttl, 处理失败时 release 释放.
+    认领记录的 owner 为消息的WAL记录ID, 进程崩溃后重放同一条记录时可以重新认领;
+    进程不再恢复时, 其他进程在租约到期后也可以处理该推文.
+    """
+
+    def __init__(self, path: str, ttl: float = 1800.0, lease: float = 300.0, min_content_len: int = 8):
+        """
+        Args:
+            path: SQLite 文件路径, 所有进程使用同一个文件
+            ttl: 处理完成后认领的有效期(秒)
+            lease: 处理中认领的租约时间(秒), 应大于单条消息的处理时间
+            min_content_len: 与 MessageDeduplicator 一致的内容去重最小长度
+        """
+        self.path = path
+        self.ttl = ttl
+        self.lease = lease
+        self.min_content_len = min_content_len
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._last_purge = 0.0
+        self.claimed = 0
+        self.conflicts = 0
+        self.released = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS claims (key TEXT PRIMARY KEY, owner TEXT, expires_at REAL)")
+            self._conn = conn
+        return self._conn
+
+    def _transaction(self, fn):
+        """在写事务中执行 fn(conn, now)"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn, now)
+                conn.execute("COMMIT")
+                return result
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _claim_sync(self, keys: List[str], owner: str) -> bool:
+        def claim(conn: sqlite3.Connection, now: float) -> bool:
+            if now - self._last_purge > 60:
+                conn.execute("DELETE FROM claims WHERE expires_at < ?", (now,))
+                self._last_purge = now
+            placeholders = ",".join("?" * len(keys))
+            row = conn.execute(
+                f"SELECT 1 FROM claims WHERE key IN ({placeholders}) AND expires_at >= ? AND owner != ? LIMIT 1",
+                (*keys, now, owner)
+            ).fetchone()
+            if row:
+                return False
+            conn.executemany(
+                "INSERT OR REPLACE INTO claims (key, owner, expires_at) VALUES (?, ?, ?)",
+                [(key, owner, now + self.lease) for key in keys]
+            )
+            return True
+
+        return self._transaction(claim)
+
+    def _confirm_sync(self, keys: List[str], owner: str):
+        placeholders = ",".join("?" * len(keys))
+        self._transaction(lambda conn, now: conn.execute(
+            f"UPDATE claims SET expires_at = ? WHERE key IN ({placeholders}) AND owner = ?",
+            (now + self.ttl, *keys, owner)
+        ))
+
+    def _release_sync(self, keys: List[str], owner: str):
+        placeholders = ",".join("?" * len(keys))
+        self._transaction(lambda conn, now: conn.execute(
+            f"DELETE FROM claims WHERE key IN ({placeholders}) AND owner = ?",
+            (*keys, owner)
+        ))
+
+    async def _run(self, fn, keys: List[str], owner: str):
+        """SQLite 访问在线程池中执行, 锁竞争时不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, list(keys), owner)
+
+    async def claim(self, keys: List[str], owner: str) -> bool:
+        """
+        以租约认领一组键, 其中任一键已被其他 owner 认领且未过期时返回 False
+        """
+        if not keys:
+            return True
+        claimed = await self._run(self._claim_sync, keys, owner)
+        if claimed:
+            self.claimed += 1
+        else:
+            self.conflicts += 1
+        return claimed
+
+    async def confirm(self, keys: List[str], owner: str):
+        """处理完成, 认领有效期延长到 ttl"""
+        if keys:
+            await self._run(self._confirm_sync, keys, owner)
+
+    async def release(self, keys: List[str], owner: str):
+        """处理失败, 释放认领, 其他进程或WAL重放可以重新处理"""
+        if keys:
+            await self._run(self._release_sync, keys, owner)
+            self.released += 1
+
+    def _message_claim(self, msg: Msg) -> Tuple[List[str], str]:
+        keys = [key for _, key in message_keys(msg, self.min_content_len)]
+        # 未启用WAL时消息没有记录ID, 以进程号作为 owner
+        return keys, msg.msg_id or f"pid:{os.getpid()}"
+
+    async def claim_message(self, msg: Msg) -> bool:
+        """认领一条消息, 返回当前进程是否应处理该消息"""
+        return await self.claim(*self._message_claim(msg))
+
+    async def confirm_message(self, msg: Msg):
+        await self.confirm(*self._message_claim(msg))
+
+    async def release_message(self, msg: Msg):
+        await self.release(*self._message_claim(msg))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "claimed": self.claimed, "conflicts": self.conflicts,
+                "released": self.released}
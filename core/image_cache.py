@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from loguru import logger
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - Pillow 为可选依赖
+    Image = None
+
+_HASH_SIZE = 8  # 8x8 差值哈希, 共64位
+# 纯色/大面积留白的图片哈希几乎全0或全1, 彼此距离很近, 这类图片只做精确匹配
+_MIN_NEAR_BITS = 8
+
+
+def image_hash(data: bytes) -> int:
+    """
+    计算图片的64位感知哈希(差值哈希 dHash)
+
+    缩放、重新压缩、轻微调色后的同一张图哈希值只相差几位;
+    未安装 Pillow 或图片无法解析时退化为内容哈希, 只能命中完全相同的图片.
+    """
+    if Image is not None:
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                img.draft("L", (_HASH_SIZE * 4, _HASH_SIZE * 4))
+                pixels = img.convert("L").resize((_HASH_SIZE + 1, _HASH_SIZE), Image.BILINEAR).tobytes()
+            value = 0
+            for row in range(_HASH_SIZE):
+                offset = row * (_HASH_SIZE + 1)
+                for col in range(_HASH_SIZE):
+                    value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+            return value
+        except Exception as e:
+            logger.debug(f"计算图片感知哈希失败, 使用内容哈希: {str(e)}")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class ImageAnalysisCache:
+    """按图片感知哈希缓存图片分析结果
+
+    同一张梗图会在几分钟内被大量账号转发, 汉明距离不超过 threshold 的图片复用之前的描述.
+    内存中为带过期时间的 LRU; 配置 db_path 时同时写入 SQLite, 重启后以及其他进程可复用.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 86400.0, threshold: int = 6,
+                 db_path: Optional[str] = None):
+        """
+        Args:
+            max_entries: 内存中最多缓存的图片数
+            ttl: 缓存有效期(秒)
+            threshold: 汉明距离阈值, 0 表示只命中哈希完全相同的图片
+            db_path: SQLite 文件路径, 为空时只使用内存缓存
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.threshold = threshold
+        self.db_path = db_path
+        # (prompt, 哈希) -> (写入时间, 描述)
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, str]]" = OrderedDict()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS image_analysis "
+                         "(hash TEXT, prompt TEXT, description TEXT, created_at REAL, PRIMARY KEY (hash, prompt))")
+            self._conn = conn
+        return self._conn
+
+    def load(self) -> int:
+        """从 SQLite 加载最近的未过期记录到内存, 返回加载条数"""
+        if not self.db_path:
+            return 0
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT hash, prompt, description, created_at FROM image_analysis "
+                "WHERE created_at >= ? ORDER BY created_at DESC LIMIT ?",
+                (time.time() - self.ttl, self.max_entries)
+            ).fetchall()
+        for hash_hex, prompt, description, created_at in reversed(rows):
+            self._put((prompt, int(hash_hex, 16)), description, created_at)
+        return len(rows)
+
+    def _put(self, key: Tuple[str, int], description: str, created_at: float):
+        self._entries[key] = (created_at, description)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _lookup_memory(self, hash_value: int, prompt: str) -> Optional[str]:
+        now = time.time()
+        key = (prompt, hash_value)
+        item = self._entries.get(key)
+        if item and now - item[0] <= self.ttl:
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return item[1]
+        bits = bin(hash_value).count("1")
+        if self.threshold <= 0 or not _MIN_NEAR_BITS <= bits <= 64 - _MIN_NEAR_BITS:
+            return None
+        best: Optional[Tuple[int, Tuple[str, int]]] = None
+        for entry_key, (created_at, _) in self._entries.items():
+            if entry_key[0] != prompt or now - created_at > self.ttl:
+                continue
+            distance = hamming_distance(entry_key[1], hash_value)
+            if distance <= self.threshold and (best is None or distance < best[0]):
+                best = (distance, entry_key)
+        if best is None:
+            return None
+        self._entries.move_to_end(best[1])
+        self.near_hits += 1
+        return self._entries[best[1]][1]
+
+    def _lookup_disk_sync(self, hash_value: int, prompt: str) -> Optional[Tuple[str, float]]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT description, created_at FROM image_analysis WHERE hash = ? AND prompt = ? AND created_at >= ?",
+                (f"{hash_value:016x}", prompt, time.time() - self.ttl)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def _store_disk_sync(self, hash_value: int, prompt: str, description: str, created_at: float):
+        with self._db_lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO image_analysis (hash, prompt, description, created_at) VALUES (?, ?, ?, ?)",
+                (f"{hash_value:016x}", prompt, description, created_at)
+            )
+
+    async def get(self, hash_value: int, prompt: str = "") -> Optional[str]:
+        """
+        查找相似图片的分析结果
+
+        先查内存(完全相同或汉明距离不超过阈值), 再按哈希查 SQLite
+        """
+        description = self._lookup_memory(hash_value, prompt)
+        if description is not None:
+            return description
+        if self.db_path:
+            loop = asyncio.get_running_loop()
+            try:
+                row = await loop.run_in_executor(None, self._lookup_disk_sync, hash_value, prompt)
+            except Exception as e:
+                logger.warning(f"读取图片分析缓存失败: {str(e)}")
+                row = None
+            if row:
+                self._put((prompt, hash_value), row[0], row[1])
+                self.disk_hits += 1
+                return row[0]
+        self.misses += 1
+        return None
+
+    async def set(self, hash_value: int, description: str, prompt: str = ""):
+        """写入分析结果"""
+        created_at = time.time()
+        self._put((prompt, hash_value), description, created_at)
+        if self.db_path:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, self._store_disk_sync, hash_value, prompt, description, created_at)
+            except Exception as e:
+                logger.warning(f"写入图片分析缓存失败: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.near_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "size": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
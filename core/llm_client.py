@@ -0,0 +1,217 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI
+from utils.metrics import LatencyTracker
+
+
+@dataclass
+class LlmEndpoint:
+    """OpenAI 兼容的模型服务"""
+    base_url: str
+    api_key: str
+    model: str = ""  # 该服务使用的模型名, 为空时使用调用方传入的模型
+    name: str = ""  # 名称, 用于日志和统计, 为空时使用 base_url
+
+
+def parse_endpoints(value: str) -> List[LlmEndpoint]:
+    """
+    解析备用模型服务配置
+
+    格式为 JSON 列表, 如 [{"base_url": "https://...", "api_key": "...", "model": "..."}]
+    """
+    if not value or not value.strip():
+        return []
+    return [LlmEndpoint(**item) for item in json.loads(value)]
+
+
+class EmptyResponseError(ValueError):
+    """模型服务返回的结果为空"""
+
+
+# 这些状态码与服务本身的负载有关, 换一个服务可能成功; 其余 4xx 是请求本身的问题
+_RETRYABLE_STATUS = (408, 429)
+
+
+def is_endpoint_failure(error: BaseException) -> bool:
+    """
+    错误是否由模型服务本身引起(连接失败、超时、5xx、限流、返回为空)
+
+    请求参数错误等其余 4xx 换服务也不会成功, 不计入服务的失败次数, 也不改发其他服务
+    """
+    if isinstance(error, (APIConnectionError, asyncio.TimeoutError, EmptyResponseError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code >= 500 or error.status_code in _RETRYABLE_STATUS
+    return False
+
+
+class _EndpointState:
+    def __init__(self, endpoint: LlmEndpoint, timeout: float):
+        self.endpoint = endpoint
+        self.name = endpoint.name or endpoint.base_url
+        # 重试和超时由 HedgedLlmClient 统一处理
+        self.client = AsyncOpenAI(api_key=endpoint.api_key, base_url=endpoint.base_url.rstrip('/'),
+                                  timeout=timeout, max_retries=0)
+        # 流式请求只计到收到响应头, 与完整请求的耗时分开统计
+        self.latency = LatencyTracker()
+        self.stream_latency = LatencyTracker()
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.wins = 0
+
+    def available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def tracker(self, stream: bool) -> LatencyTracker:
+        return self.stream_latency if stream else self.latency
+
+
+class HedgedLlmClient:
+    """多服务对冲请求的大模型客户端
+
+    与 AsyncOpenAI 相同的调用方式(client.chat.completions.create), 可以直接替换:
+    - 请求先发给延迟最低的可用服务, 超过该服务近期 p95 耗时仍未返回时, 再向下一个服务发送相同请求,
+      取最先返回的有效结果并取消其余请求
+    - 请求失败时立即改发下一个服务; 参数错误等 4xx 直接抛出, 不改发也不计入失败次数
+    - 连续失败 eject_after 次的服务暂停使用 eject_seconds 秒, 之后再次尝试
+    - 流式请求在建立流(收到响应头)时即视为返回, 耗时与非流式请求分开统计
+    """
+
+    def __init__(self, endpoints: List[LlmEndpoint], timeout: float = 30.0, hedge_delay: float = 2.0,
+                 min_hedge_delay: float = 0.2, max_parallel: int = 2, min_samples: int = 20,
+                 eject_after: int = 3, eject_seconds: float = 30.0):
+        """
+        Args:
+            endpoints: 模型服务列表, 顺序即初始优先级
+            timeout: 单次请求超时(秒)
+            hedge_delay: 样本不足时发送对冲请求前的等待时间(秒)
+            min_hedge_delay: 对冲等待时间的下限(秒)
+            max_parallel: 同时进行的请求数上限
+            min_samples: 使用服务自身 p95 耗时作为对冲等待时间所需的最少样本数
+            eject_after: 连续失败多少次后暂停使用该服务
+            eject_seconds: 暂停使用的时间(秒)
+        """
+        if not endpoints:
+            raise ValueError("至少需要一个模型服务")
+        self._endpoints = [_EndpointState(endpoint, timeout) for endpoint in endpoints]
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_parallel = max(1, int(max_parallel))
+        self.min_samples = min_samples
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.requests = 0
+        self.hedges = 0
+        self.failovers = 0
+        # 保持与 AsyncOpenAI 相同的调用路径
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _ranked(self, stream: bool = False) -> List[_EndpointState]:
+        """按同类请求近期 p50 耗时排序的可用服务, 样本不足的服务保持配置顺序排在后面; 全部暂停时使用最早恢复的服务"""
+        now = time.monotonic()
+        available = [state for state in self._endpoints if state.available(now)]
+        if not available:
+            return [min(self._endpoints, key=lambda state: state.ejected_until)]
+
+        def key(item):
+            index, state = item
+            latency = state.tracker(stream)
+            if latency.count >= self.min_samples:
+                return (0, latency.percentile(50), index)
+            return (1, 0.0, index)
+
+        return [state for _, state in sorted(enumerate(available), key=key)]
+
+    def _hedge_delay(self, state: _EndpointState, stream: bool = False) -> float:
+        latency = state.tracker(stream)
+        if latency.count < self.min_samples:
+            return self.hedge_delay
+        return max(self.min_hedge_delay, latency.percentile(95))
+
+    async def _call(self, state: _EndpointState, kwargs: Dict[str, Any]) -> Any:
+        if state.endpoint.model:
+            kwargs = dict(kwargs, model=state.endpoint.model)
+        stream = bool(kwargs.get("stream"))
+        with state.tracker(stream).measure():
+            response = await state.client.chat.completions.create(**kwargs)
+        if not stream and not getattr(response, "choices", None):
+            raise EmptyResponseError("返回结果为空")
+        return response
+
+    def _on_success(self, state: _EndpointState):
+        state.consecutive_failures = 0
+        state.ejected_until = 0.0
+        state.wins += 1
+
+    def _on_failure(self, state: _EndpointState, error: BaseException):
+        state.consecutive_failures += 1
+        if state.consecutive_failures >= self.eject_after:
+            state.ejected_until = time.monotonic() + self.eject_seconds
+            logger.warning(f"模型服务 {state.name} 连续失败 {state.consecutive_failures} 次, 暂停使用 {self.eject_seconds} 秒")
+        logger.warning(f"模型服务 {state.name} 请求失败: {type(error).__name__} {str(error)}")
+
+    async def create(self, **kwargs) -> Any:
+        """发送 chat.completions 请求, 返回最先得到的有效结果"""
+        self.requests += 1
+        stream = bool(kwargs.get("stream"))
+        candidates = self._ranked(stream)
+        pending: Dict[asyncio.Task, _EndpointState] = {}
+        last_error: Optional[BaseException] = None
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            state = candidates[next_index]
+            next_index += 1
+            pending[asyncio.ensure_future(self._call(state, kwargs))] = state
+            return state
+
+        primary = launch()
+        delay = self._hedge_delay(primary, stream)
+        try:
+            while pending:
+                can_hedge = next_index < len(candidates) and len(pending) < self.max_parallel
+                done, _ = await asyncio.wait(pending, timeout=delay if can_hedge else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    state = launch()
+                    self.hedges += 1
+                    logger.info(f"模型服务 {primary.name} 超过 {delay:.2f} 秒未返回, 同时请求 {state.name}")
+                    continue
+                for task in done:
+                    state = pending.pop(task)
+                    if task.exception() is None:
+                        self._on_success(state)
+                        return task.result()
+                    last_error = task.exception()
+                    if not is_endpoint_failure(last_error):
+                        # 请求本身的问题, 其他服务也会失败
+                        raise last_error
+                    self._on_failure(state, last_error)
+                if not pending and next_index < len(candidates):
+                    self.failovers += 1
+                    launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+            "endpoints": {
+                state.name: dict(state.latency.stats(), stream=state.stream_latency.stats(),
+                                 wins=state.wins, ejected=not state.available(now))
+                for state in self._endpoints
+            },
+        }
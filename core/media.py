@@ -0,0 +1,65 @@
+import re
+from typing import List
+from loguru import logger
+from core.data_def import Msg
+from core.processor import TwitterLinkProcessor
+
+# 可以交给图片分析的链接: pbs.twimg.com/media 下的图片, 或其他域名下以图片扩展名结尾的链接.
+# 视频封面(ext_tw_video_thumb/tweet_video_thumb 等)和 video.twimg.com 的视频不作为图片
+_IMAGE_URL = re.compile(
+    r'^https?://(?:pbs\.twimg\.com/media/\S+'
+    r'|(?!(?:pbs|video)\.twimg\.com/)\S+\.(?:jpe?g|png|webp|gif)(?:[?#]\S*)?$)', re.I)
+
+
+def payload_images(msg: Msg) -> List[str]:
+    """推送中自带的图片链接(去重, 保持原顺序), 推文媒体类型不是图片时忽略 medias"""
+    medias = msg.medias or []
+    if msg.media_type and msg.media_type != "photo":
+        medias = []
+    images = [url for url in medias if _IMAGE_URL.match(url)]
+    images.extend(url for url in (msg.urls or []) if _IMAGE_URL.match(url))
+    return list(dict.fromkeys(images))
+
+
+class MediaResolver:
+    """推文图片解析
+
+    优先使用推送中自带的媒体链接, 只有推送没有媒体时才通过浏览器渲染推文中的 t.co 短链接查找图片
+    """
+
+    def __init__(self, scrape_fallback: bool = True):
+        """
+        Args:
+            scrape_fallback: 推送没有媒体时是否抓取短链接
+        """
+        self.scrape_fallback = scrape_fallback
+        self.from_payload = 0
+        self.from_scrape = 0
+        self.no_media = 0
+
+    async def resolve(self, msg: Msg) -> List[str]:
+        """
+        获取推文的图片链接
+
+        Returns:
+            List[str]: 图片链接列表, 没有图片时为空
+        """
+        images = payload_images(msg)
+        if images:
+            self.from_payload += 1
+            logger.info(f"使用推送中的媒体链接: {images}")
+            return images
+        if self.scrape_fallback and TwitterLinkProcessor.extract_short_url(msg.content or ''):
+            images = await TwitterLinkProcessor.extract_image_urls(msg.content)
+            if images:
+                self.from_scrape += 1
+                return images
+        self.no_media += 1
+        return []
+
+    def stats(self) -> dict:
+        return {
+            "from_payload": self.from_payload,
+            "from_scrape": self.from_scrape,
+            "no_media": self.no_media,
+        }
@@ -0,0 +1,131 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from loguru import logger
+from core.data_def import Msg
+
+_STATUS_URL = re.compile(r'/([A-Za-z0-9_]+)/status(?:es)?/(\d+)')
+_SOURCE_URL = re.compile(r'Source:\s*(https?://\S+)')
+
+# kbot 推送格式:
+# 🔴 CZ posted a new tweet 🔴
+# 📝 Content: ...(可能多行)
+# 🕔 Time: 5/20/2025, 3:43:58 PM
+# 🔗 Source: https://x.com/cz_binance/status/1924853614155374842
+KBOT_NEW_TWEET = (
+    r'^\W*(?P<name>.+?) posted a new tweet\W*$'
+    r'.*?Content:[ \t]*(?P<content>.*?)\s*'
+    r'(?:^\W*Time:[ \t]*(?P<time>[^\n]*?)\s*)?'
+    r'^\W*Source:\s*(?P<url>https?://\S+)'
+)
+
+
+@dataclass
+class MessageTemplate:
+    """推送消息模板
+
+    pattern 为正则表达式, 支持的命名分组: name / screen_name / content / time / url
+    """
+    name: str
+    pattern: str
+    push_type: str = "new_tweet"
+    _regex: re.Pattern = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._regex = re.compile(self.pattern, re.S | re.M)
+
+    def parse(self, text: str) -> Optional[Dict[str, str]]:
+        """匹配成功时返回各字段, 否则返回None"""
+        match = self._regex.search(text or '')
+        if not match:
+            return None
+        return {key: (value or '').strip() for key, value in match.groupdict().items()}
+
+
+DEFAULT_TEMPLATES = [MessageTemplate("kbot_new_tweet", KBOT_NEW_TWEET)]
+
+
+class TemplateRegistry:
+    """按来源频道注册消息模板
+
+    指定频道的模板优先匹配, 未匹配时再尝试通用模板
+    """
+
+    def __init__(self, templates: Optional[List[MessageTemplate]] = None):
+        self._default: List[MessageTemplate] = list(DEFAULT_TEMPLATES if templates is None else templates)
+        self._by_chat: Dict[int, List[MessageTemplate]] = {}
+        self.matched = 0
+        self.unmatched = 0
+
+    def register(self, template: MessageTemplate, chat_id: Optional[int] = None):
+        """注册模板, chat_id 为空时对所有频道生效"""
+        if chat_id is None:
+            self._default.append(template)
+        else:
+            self._by_chat.setdefault(int(chat_id), []).append(template)
+
+    def load_file(self, path: str):
+        """
+        从JSON文件加载模板
+
+        文件内容为列表, 每项包含 name / pattern, 可选 push_type / chat_id
+        """
+        with open(path, encoding='utf-8') as f:
+            items = json.load(f)
+        for item in items:
+            chat_id = item.get("chat_id")
+            self.register(
+                MessageTemplate(item["name"], item["pattern"], item.get("push_type", "new_tweet")),
+                chat_id=chat_id
+            )
+        logger.info(f"已加载 {len(items)} 个消息模板: {path}")
+
+    def templates_for(self, chat_id: Optional[int] = None) -> List[MessageTemplate]:
+        chat_templates = self._by_chat.get(int(chat_id), []) if chat_id is not None else []
+        return chat_templates + self._default
+
+    def parse(self, text: str, chat_id: Optional[int] = None) -> Optional[Msg]:
+        """
+        用模板把推送文本直接解析为 Msg
+
+        Returns:
+            Optional[Msg]: 没有模板匹配时返回None
+        """
+        for template in self.templates_for(chat_id):
+            fields = template.parse(text)
+            if fields is not None:
+                self.matched += 1
+                return build_msg(fields, template.push_type)
+        self.unmatched += 1
+        return None
+
+    def stats(self) -> dict:
+        return {"matched": self.matched, "unmatched": self.unmatched}
+
+
+def build_msg(fields: Dict[str, str], push_type: str = "new_tweet") -> Msg:
+    """根据模板解析出的字段构建 Msg, 用户名和推文ID优先从原文链接中提取"""
+    url = fields.get("url", '')
+    screen_name = fields.get("screen_name", '')
+    tweet_id = ''
+    status = _STATUS_URL.search(url)
+    if status:
+        tweet_id = status.group(2)
+        if not screen_name and status.group(1) != "i":
+            screen_name = status.group(1)
+    name = fields.get("name", '') or screen_name
+    return Msg(
+        push_type=push_type,
+        title=f'{screen_name or name} 发布了一条新推文',
+        content=fields.get("content", ''),
+        name=name,
+        screen_name=screen_name,
+        tweet_id=tweet_id,
+    )
+
+
+def source_url(text: str) -> Optional[str]:
+    """从推送文本中提取原文链接"""
+    match = _SOURCE_URL.search(text or '')
+    return match.group(1) if match else None
@@ -0,0 +1,149 @@
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+from core.data_def import AIAnalysisResult, Msg, SpeculateToken
+from core.media import payload_images
+from core.processor import TwitterLinkProcessor
+
+# 主流代币, 分析提示词中的过滤规则使用同一份列表
+MAINSTREAM_TOKENS = ("BTC", "ETH", "USDT", "SOL", "TON", "DOGE", "XRP", "BCH", "LTC", "BNB")
+
+# 土狗/meme 相关词汇, 英文按整词匹配(不区分大小写), 中文按子串匹配
+MEME_KEYWORDS = (
+    "meme", "memecoin", "memecoins", "pump", "pumping", "pump.fun", "pumpfun", "moon", "mooning",
+    "launch", "launched", "launching", "stealth launch", "fair launch", "presale", "airdrop",
+    "ticker", "ca", "contract", "token", "tokens", "coin", "coins", "degen", "ape", "aping",
+    "100x", "1000x", "gem", "rug", "dex", "raydium", "uniswap", "dexscreener", "birdeye", "gmgn",
+    "mint", "lfg", "wagmi",
+    "土狗", "金狗", "发币", "合约", "上线", "空投", "预售", "代币", "打新", "百倍", "千倍", "meme币",
+)
+
+SKIP = "skip"  # 不调用大模型
+FAST_PATH = "fast_path"  # 推文中直接给出了合约地址, 跳过大模型直接搜索
+FULL = "full"  # 调用大模型完整分析
+
+_CASHTAG = re.compile(r'(?<![\w$])\$([A-Za-z][A-Za-z0-9]{1,14})(?![\w])')
+_EVM_ADDRESS = re.compile(r'(?<![0-9A-Za-z])0x[0-9a-fA-F]{40}(?![0-9A-Za-z])')
+_SOLANA_ADDRESS = re.compile(r'(?<![0-9A-Za-z])[1-9A-HJ-NP-Za-km-z]{32,44}(?![0-9A-Za-z])')
+_URL = re.compile(r'https?://\S+')
+
+
+def _keyword_pattern(keywords: Iterable[str]) -> Optional["re.Pattern"]:
+    """把关键词编译为一个正则, 一次扫描匹配所有关键词"""
+    parts = []
+    for keyword in sorted({k.lower() for k in keywords if k}, key=len, reverse=True):
+        escaped = re.escape(keyword)
+        if keyword.isascii():
+            escaped = rf'(?<![a-z0-9]){escaped}(?![a-z0-9])'
+        parts.append(escaped)
+    return re.compile('|'.join(parts)) if parts else None
+
+
+@dataclass
+class PrefilterWeights:
+    """预筛选打分权重"""
+    cashtag: float = 2.0  # 每个非主流代币符号($TICKER)
+    contract_address: float = 3.0  # 每个合约地址
+    keyword: float = 1.0  # 每个命中的meme关键词
+    max_keywords: int = 3  # 关键词最多计分个数
+    media: float = 1.0  # 推文带图片或链接(内容需要看图片才能判断)
+
+
+@dataclass
+class TriageResult:
+    """预筛选结果"""
+    decision: str
+    score: float
+    tokens: List[str] = field(default_factory=list)  # 推文中直接出现的代币符号和合约地址
+    keywords: List[str] = field(default_factory=list)
+    addresses: List[str] = field(default_factory=list)  # 推文中的合约地址
+
+    def to_analysis_result(self) -> AIAnalysisResult:
+        """
+        转换为与大模型分析相同格式的结果, 用于跳过大模型的快速路径
+
+        只包含合约地址: 代币符号是否为已上架大型交易所的代币需要大模型按过滤规则判断
+        """
+        return AIAnalysisResult([
+            SpeculateToken(token_name=address, reason="推文中直接给出了合约地址", key_elements=list(self.keywords))
+            for address in self.addresses
+        ])
+
+
+class TweetPrefilter:
+    """调用大模型前的本地预筛选
+
+    根据代币符号、合约地址、meme关键词和图片打分:
+    低于 threshold 的推文(回复、问候、只讨论主流币行情等)直接跳过;
+    带有合约地址且分数达到 fast_path_score 的推文跳过大模型, 直接按合约地址搜索代币;
+    其余推文(包括只有代币符号的)交给大模型完整分析, 由提示词的过滤规则排除已上架大型交易所的代币.
+    """
+
+    def __init__(self, threshold: float = 1.0, fast_path_score: float = 4.0,
+                 fast_path_enabled: bool = True, keywords: Iterable[str] = MEME_KEYWORDS,
+                 blocklist: Iterable[str] = MAINSTREAM_TOKENS, weights: PrefilterWeights = None):
+        """
+        Args:
+            threshold: 完整分析的最低分数
+            fast_path_score: 走快速路径的最低分数
+            fast_path_enabled: 是否启用快速路径
+            keywords: meme关键词
+            blocklist: 主流代币符号, 不计分
+            weights: 打分权重
+        """
+        self.threshold = threshold
+        self.fast_path_score = fast_path_score
+        self.fast_path_enabled = fast_path_enabled
+        self.blocklist = {symbol.upper() for symbol in blocklist}
+        self.weights = weights or PrefilterWeights()
+        self._keywords = _keyword_pattern(keywords)
+        self.counts = {SKIP: 0, FAST_PATH: 0, FULL: 0}
+
+    def extract_cashtags(self, text: str) -> List[str]:
+        """推文中的非主流代币符号(去重, 保持原顺序)"""
+        symbols = (match.group(1) for match in _CASHTAG.finditer(text))
+        return list(dict.fromkeys(s for s in symbols if s.upper() not in self.blocklist))
+
+    @staticmethod
+    def extract_addresses(text: str) -> List[str]:
+        """推文中的 EVM / Solana 合约地址"""
+        text = _URL.sub(' ', text)
+        addresses = _EVM_ADDRESS.findall(text)
+        # base58 长串中几乎总有数字, 以此排除超长的普通单词
+        addresses.extend(a for a in _SOLANA_ADDRESS.findall(text) if any(c.isdigit() for c in a))
+        return list(dict.fromkeys(addresses))
+
+    def match_keywords(self, text: str) -> List[str]:
+        if self._keywords is None:
+            return []
+        return list(dict.fromkeys(self._keywords.findall(text.lower())))
+
+    def triage(self, msg: Msg) -> TriageResult:
+        """对推文打分并给出处理方式"""
+        text = msg.content or ''
+        w = self.weights
+        cashtags = self.extract_cashtags(text)
+        addresses = self.extract_addresses(text)
+        keywords = self.match_keywords(_URL.sub(' ', text))
+        score = (w.cashtag * len(cashtags) + w.contract_address * len(addresses)
+                 + w.keyword * min(len(keywords), w.max_keywords))
+        if payload_images(msg) or TwitterLinkProcessor.extract_short_url(text):
+            score += w.media
+        if self.fast_path_enabled and addresses and score >= self.fast_path_score:
+            decision = FAST_PATH
+        elif score >= self.threshold:
+            decision = FULL
+        else:
+            decision = SKIP
+        self.counts[decision] += 1
+        return TriageResult(decision, score, cashtags + addresses, keywords, addresses)
+
+    def stats(self) -> dict:
+        total = sum(self.counts.values())
+        saved = self.counts[SKIP] + self.counts[FAST_PATH]
+        return {
+            **self.counts,
+            "total": total,
+            "llm_saved": saved,
+            "llm_saved_ratio": round(saved / total, 4) if total else 0.0,
+        }
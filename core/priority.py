@@ -0,0 +1,40 @@
+import math
+from dataclasses import dataclass, field
+from typing import Dict
+from core.data_def import Msg
+
+
+@dataclass
+class PriorityWeights:
+    """消息优先级权重"""
+    followers: float = 1.0  # 每个数量级(log10)粉丝数的分数
+    blue_verified: float = 1.0  # 蓝V认证
+    verified_type: Dict[str, float] = field(default_factory=lambda: {"Business": 2.0, "Government": 2.0})
+    has_ca: float = 2.0  # 用户资料中带有合约地址
+    push_type: Dict[str, float] = field(default_factory=lambda: {"new_tweet": 1.0, "new_description": 0.5})
+
+
+class MessagePrioritizer:
+    """根据作者信号为消息打分, 分数越高越先分析"""
+
+    def __init__(self, weights: PriorityWeights = None):
+        self.weights = weights or PriorityWeights()
+
+    def score(self, msg: Msg) -> float:
+        """
+        计算消息优先级分数
+
+        百万粉丝的蓝V账号约为 6 + 1 + 1 = 8 分, 千粉小号约为 3 + 1 = 4 分
+        """
+        w = self.weights
+        score = w.followers * math.log10(max(int(msg.followers_count or 0), 0) + 1)
+        if msg.is_blue_verified:
+            score += w.blue_verified
+        if msg.verified_type:
+            score += w.verified_type.get(msg.verified_type, 0.0)
+        if msg.has_ca:
+            score += w.has_ca
+        score += w.push_type.get(msg.push_type, 0.0)
+        return score
+
+    __call__ = score
@@ -8,8 +8,8 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
 import re
-from typing import Optional
-from playwright.async_api import async_playwright
+from typing import List, Optional
+from utils.browser_pool import get_browser_pool
 
 
 class TwitterLinkProcessor:
@@ -18,29 +18,14 @@ class TwitterLinkProcessor:
     @staticmethod
     async def ensure_playwright_browser():
         """
-        确保 Playwright Chromium 浏览器已安装
+        确保 Playwright Chromium 浏览器已安装并启动
+
+        浏览器由进程内共享的页面池管理, 安装检查只在首次启动时进行一次
         """
         try:
-            import playwright
-            from playwright.async_api import async_playwright
-
-            # 尝试启动浏览器来检查是否已安装
-            async with async_playwright() as p:
-                try:
-                    browser = await p.chromium.launch()
-                    await browser.close()
-                    return
-                except Exception:
-                    pass
-
-            # 如果启动失败，安装浏览器
-            logger.info("正在安装 Playwright Chromium...")
-            import subprocess
-            subprocess.run(['playwright', 'install', 'chromium'], check=True)
-            logger.info("Playwright Chromium 安装完成")
-
+            await get_browser_pool().start()
         except Exception as e:
-            logger.error(f"安装 Playwright Chromium 时出错: {str(e)}")
+            logger.error(f"启动 Playwright Chromium 时出错: {str(e)}")
             raise
 
     @staticmethod
@@ -52,42 +37,48 @@ class TwitterLinkProcessor:
             url: 要处理的URL
             
         Returns:
-            Optional[str]: 提取到的图片URL，如果未找到则返回None
+            Optional[str]: 提取到的第一个图片URL，如果未找到则返回None
         """
-        # 确保浏览器已安装
-        await TwitterLinkProcessor.ensure_playwright_browser()
+        images = await TwitterLinkProcessor.extract_images_with_playwright(url)
+        return images[0] if images else None
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+    @staticmethod
+    async def extract_images_with_playwright(url: str) -> List[str]:
+        """
+        使用 playwright 处理动态加载的页面并提取所有图片链接
 
-            try:
-                # 设置超时时间
-                page.set_default_timeout(30000)
+        从进程内共享的浏览器页面池借用页面, 不再每次启动浏览器
 
+        Args:
+            url: 要处理的URL
+
+        Returns:
+            List[str]: 提取到的图片URL列表(去重, 保持页面顺序)
+        """
+        try:
+            async with get_browser_pool().page() as page:
                 # 访问URL
-                await page.goto(url)
+                await page.goto(url, timeout=30000)
 
                 # 等待图片元素加载
-                await page.wait_for_selector('img')
+                await page.wait_for_selector('img', timeout=30000)
 
                 # 获取所有图片元素
-                images = await page.query_selector_all('img')
-                for img in images:
+                images = []
+                for img in await page.query_selector_all('img'):
                     src = await img.get_attribute('src')
-                    if src and "media" in src:  # 过滤 Twitter 图片链接
-                        logger.info(f"找到图片链接: {src}")
-                        await browser.close()
-                        return src
+                    if src and "media" in src and src not in images:  # 过滤 Twitter 图片链接
+                        images.append(src)
 
-                logger.info("未能找到图片链接。")
-                return None
+                if images:
+                    logger.info(f"找到图片链接: {images}")
+                else:
+                    logger.info("未能找到图片链接。")
+                return images
 
-            except Exception as e:
-                logger.error(f"Playwright 出现错误: {e}")
-                return None
-            finally:
-                await browser.close()
+        except Exception as e:
+            logger.error(f"Playwright 出现错误: {e}")
+            return []
 
     @staticmethod
     def extract_image_with_selenium(url: str) -> Optional[str]:
@@ -168,23 +159,37 @@ class TwitterLinkProcessor:
             tweet_text: 推文内容
             
         Returns:
-            str: 提取到的图片URL，如果未找到则返回空字符串
+            str: 提取到的第一个图片URL，如果未找到则返回空字符串
+        """
+        images = await TwitterLinkProcessor.extract_image_urls(tweet_text)
+        return images[0] if images else ''
+
+    @staticmethod
+    async def extract_image_urls(tweet_text: str) -> List[str]:
+        """
+        从推文中提取所有图片URL
+
+        Args:
+            tweet_text: 推文内容
+
+        Returns:
+            List[str]: 提取到的图片URL列表, 未找到时为空
         """
         short_url = TwitterLinkProcessor.extract_short_url(tweet_text)
         if not short_url:
-            return ''
+            return []
             
         logger.info(f"找到短链接: {short_url}")
         
         if sys.platform == "darwin":
             image_url = TwitterLinkProcessor.extract_image_with_selenium(short_url)
+            images = [image_url] if image_url else []
         else:
-            image_url = await TwitterLinkProcessor.extract_image_with_playwright(short_url)
+            images = await TwitterLinkProcessor.extract_images_with_playwright(short_url)
             
-        if image_url:
-            logger.info(f"图片链接: {image_url}")
-            return image_url
-        return ''
+        if images:
+            logger.info(f"图片链接: {images}")
+        return images
     
     @staticmethod
     async def expand_short_url(short_url: str) -> str:
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import os
+import re
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+from loguru import logger
+
+_SEGMENT_PATTERN = re.compile(r'^wal-(\d{8})\.log$')
+
+
+class WalRecord:
+    """待处理的日志记录"""
+    __slots__ = ("record_id", "kind", "payload")
+
+    def __init__(self, record_id: str, kind: str, payload: Dict[str, Any]):
+        self.record_id = record_id
+        self.kind = kind
+        self.payload = payload
+
+    def __repr__(self):
+        return f"WalRecord(record_id={self.record_id!r}, kind={self.kind!r})"
+
+
+class WriteAheadLog:
+    """追加写的本地消息日志, 用于崩溃后重放未处理完的推送
+
+    - append() 写入一条推送记录, 在 fsync 完成后返回, 之后才能向推送方确认
+    - mark_done() 追加一条完成记录, 重放时跳过已完成的记录
+    - 后台协程把并发的写入合并为一次 write + fsync(组提交)
+    - 日志按大小切分为多个分段文件, 分段内的记录全部完成后删除该分段
+    """
+
+    def __init__(self, directory: str, segment_max_bytes: int = 16 * 1024 * 1024, max_batch: int = 512):
+        """
+        Args:
+            directory: 日志目录
+            segment_max_bytes: 单个分段文件的最大字节数
+            max_batch: 单次组提交的最大记录数
+        """
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_batch = max_batch
+        self._file = None
+        self._active_seq = 0
+        self._active_size = 0
+        self._pending_by_segment: Dict[int, Set[str]] = {}
+        self._segment_of: Dict[str, int] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._counters = {"appends": 0, "done": 0, "fsyncs": 0, "replayed": 0}
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"wal-{seq:08d}.log")
+
+    def _list_segments(self) -> List[int]:
+        if not os.path.isdir(self.directory):
+            return []
+        seqs = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_PATTERN.match(name)
+            if match:
+                seqs.append(int(match.group(1)))
+        return sorted(seqs)
+
+    def replay(self) -> List[WalRecord]:
+        """
+        读取已有分段, 返回尚未完成的记录(按写入顺序)
+
+        需在 open() 之前调用. 末尾写了一半的行(崩溃时)会被忽略.
+        """
+        records: Dict[str, Tuple[int, WalRecord]] = {}
+        for seq in self._list_segments():
+            with open(self._segment_path(seq), 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"WAL分段 {seq} 存在损坏的记录, 已跳过")
+                        continue
+                    if entry.get("t") == "push":
+                        records[entry["id"]] = (seq, WalRecord(entry["id"], entry.get("k", ""), entry.get("d") or {}))
+                    elif entry.get("t") == "done":
+                        records.pop(entry["id"], None)
+
+        # 记录各分段仍未完成的记录, 完成后才能删除分段
+        pending = {seq: set() for seq in self._list_segments()}
+        for record_id, (seq, _) in records.items():
+            pending[seq].add(record_id)
+            self._segment_of[record_id] = seq
+        self._pending_by_segment = pending
+        self._active_seq = max(pending) if pending else 0
+
+        result = [record for _, record in records.values()]
+        self._counters["replayed"] = len(result)
+        if result:
+            logger.info(f"WAL中有 {len(result)} 条未处理完成的推送, 将重新处理")
+        return result
+
+    async def open(self):
+        """打开新的活动分段并启动组提交协程"""
+        if self._flusher:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._active_seq += 1
+        self._open_segment(self._active_seq)
+        self._queue = asyncio.Queue()
+        self._flusher = asyncio.create_task(self._flush_loop(), name="wal-flusher")
+        logger.info(f"WAL已启动, 目录: {self.directory}, 当前分段: {self._active_seq}")
+
+    async def close(self):
+        """写完已排队的记录后关闭"""
+        if not self._flusher:
+            return
+        await self._queue.join()
+        self._flusher.cancel()
+        await asyncio.gather(self._flusher, return_exceptions=True)
+        self._flusher = None
+        if self._file:
+            self._file.close()
+            self._file = None
+        logger.info("WAL已关闭")
+
+    async def append(self, kind: str, payload: Dict[str, Any], record_id: Optional[str] = None) -> str:
+        """
+        追加一条推送记录, 数据落盘后返回
+
+        Args:
+            kind: 记录类型, 重放时用于分发
+            payload: 可JSON序列化的消息内容
+            record_id: 记录ID, 默认随机生成
+
+        Returns:
+            str: 记录ID
+        """
+        record_id = record_id or uuid.uuid4().hex
+        line = json.dumps({"t": "push", "id": record_id, "k": kind, "d": payload}, ensure_ascii=False)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((record_id, line.encode('utf-8') + b'\n', future))
+        await future
+        self._counters["appends"] += 1
+        return record_id
+
+    def mark_done(self, record_id: str):
+        """标记记录已处理完成(不等待落盘)"""
+        if not record_id or not self._queue:
+            return
+        line = json.dumps({"t": "done", "id": record_id})
+        self._queue.put_nowait((None, line.encode('utf-8') + b'\n', None))
+        self._counters["done"] += 1
+
+        seq = self._segment_of.pop(record_id, None)
+        if seq is not None and seq in self._pending_by_segment:
+            self._pending_by_segment[seq].discard(record_id)
+
+    def _take_deletable(self) -> List[int]:
+        """
+        取出可以删除的分段
+
+        完成记录可能写在比推送记录更新的分段里, 只删除最老的连续一段已全部完成的分段,
+        否则重放时可能丢失较老分段的完成记录.
+        """
+        deletable = []
+        for seq in sorted(self._pending_by_segment):
+            if seq >= self._active_seq or self._pending_by_segment[seq]:
+                break
+            deletable.append(seq)
+        for seq in deletable:
+            del self._pending_by_segment[seq]
+        return deletable
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                data = b''.join(item[1] for item in batch)
+
+                # 分段切换和删除的记账都在事件循环线程中完成, 线程池只负责文件IO
+                rotate_to = None
+                if self._active_size >= self.segment_max_bytes:
+                    self._active_seq += 1
+                    self._active_size = 0
+                    rotate_to = self._active_seq
+                deletable = self._take_deletable()
+
+                await loop.run_in_executor(
+                    None, self._write_sync, data, rotate_to, [self._segment_path(seq) for seq in deletable]
+                )
+                self._active_size += len(data)
+                self._counters["fsyncs"] += 1
+
+                ids = self._pending_by_segment.setdefault(self._active_seq, set())
+                for record_id, _, _ in batch:
+                    if record_id:
+                        ids.add(record_id)
+                        self._segment_of[record_id] = self._active_seq
+
+                for _, _, future in batch:
+                    if future and not future.done():
+                        future.set_result(None)
+            except Exception as e:
+                logger.error(f"WAL写入失败: {str(e)}", exc_info=True)
+                for _, _, future in batch:
+                    if future and not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _open_segment(self, seq: int):
+        self._file = open(self._segment_path(seq), 'ab')
+
+    def _write_sync(self, data: bytes, rotate_to: Optional[int], delete_paths: List[str]):
+        """在线程池中执行: 必要时切换分段, 写入并 fsync, 删除已完成的分段"""
+        if rotate_to is not None:
+            self._file.close()
+            self._open_segment(rotate_to)
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        for path in delete_paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def pending_count(self) -> int:
+        return len(self._segment_of)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "active_segment": self._active_seq,
+            "segments": len(self._pending_by_segment),
+            "pending": self.pending_count(),
+            **self._counters,
+        }
@@ -5,8 +5,14 @@ from config.config import cfg
 
 from monitor.webhook_monitor import WebhookMonitor
 from monitor.telegram_monitor import TelegramMonitor 
+from monitor.multiprocess import run_webhook_workers
 
 if __name__ == "__main__":
+    # webhook多进程模式: 每个进程独立的事件循环和监控器
+    if cfg.monitor.driver_type == "webhook" and cfg.monitor.webhook_processes > 1:
+        run_webhook_workers('0.0.0.0', 9999, cfg.monitor.webhook_processes, reuse_port=cfg.monitor.webhook_reuse_port)
+        sys.exit(0)
+
     # 根据驱动模式创建监控器
     if cfg.monitor.driver_type == "webhook":
         monitor = WebhookMonitor(host='0.0.0.0', port=9999)
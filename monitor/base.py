@@ -1,61 +1,356 @@
 import asyncio
+import os
+from dataclasses import asdict
+from typing import List, Optional
 from loguru import logger
 from config.config import cfg 
 from core.analyzer import LlmAnalyzer, TokenSearcher
+from core.llm_client import parse_endpoints
 from core.data_def import Msg
+from core.wal import WalRecord, WriteAheadLog
 import notify.notice as notice  
 from core.trader import ChainTrader 
+from core.dedup import MessageDeduplicator, SharedClaimStore
+from core.image_cache import ImageAnalysisCache
+from core.analysis_cache import AnalysisResultCache
+from core.priority import MessagePrioritizer, PriorityWeights
+from core.prefilter import FAST_PATH, SKIP, PrefilterWeights, TweetPrefilter
+from monitor.ingest_queue import IngestQueue
+from utils.browser_pool import close_browser_pool, get_browser_pool
 
 
 class BaseMonitor:
     """监控器基类，包含公共逻辑"""
-    def __init__(self):
+    def __init__(self, worker_index: Optional[int] = None):
+        """
+        Args:
+            worker_index: 多进程模式下的进程序号, 单进程时为None
+        """
+        self.worker_index = worker_index
         # 初始化公共组件
         self.analyzer = LlmAnalyzer(
             api_key=cfg.llm.api_key,
             base_url=cfg.llm.base_url,
-            model=cfg.llm.model
+            model=cfg.llm.model,
+            image_max_bytes=cfg.llm.image_max_bytes,
+            image_max_dimension=cfg.llm.image_max_dimension,
+            image_quality=cfg.llm.image_quality,
+            image_fetch_timeout=cfg.llm.image_fetch_timeout,
+            image_cache=self._init_image_cache(),
+            image_max_count=cfg.llm.image_max_count,
+            image_total_bytes=cfg.llm.image_total_bytes,
+            image_parallel_calls=cfg.llm.image_parallel_calls,
+            overlap_text_image=cfg.llm.overlap_text_image,
+            result_cache=self._init_result_cache(),
+            batch_size=cfg.llm.batch_size,
+            batch_window=cfg.llm.batch_window,
+            stream=cfg.llm.stream,
+            triage_model=cfg.llm.triage_model,
+            triage_base_url=cfg.llm.triage_base_url,
+            triage_api_key=cfg.llm.triage_api_key,
+            triage_max_tokens=cfg.llm.triage_max_tokens,
+            triage_threshold=cfg.llm.triage_threshold,
+            triage_timeout=cfg.llm.triage_timeout,
+            fallback_endpoints=parse_endpoints(cfg.llm.fallback_endpoints),
+            request_timeout=cfg.llm.request_timeout,
+            hedge_delay=cfg.llm.hedge_delay,
+            hedge_max_parallel=cfg.llm.hedge_max_parallel,
+            eject_after=cfg.llm.eject_after,
+            eject_seconds=cfg.llm.eject_seconds,
+            json_mode=cfg.llm.json_mode
         )
         self.token_searcher = TokenSearcher(max_retries=3, retry_delay=1.0)
-        self.trader = self._init_trader()
-        
-    def _init_trader(self):
-        """初始化交易模块（公共方法）"""
+        # 交易模块在事件循环中初始化, 见 start_pipeline
+        self.trader = None
+        # 按作者信号排序待分析的消息
+        self.prioritizer = MessagePrioritizer(PriorityWeights(
+            followers=cfg.monitor.priority_followers_weight,
+            blue_verified=cfg.monitor.priority_blue_verified_weight,
+            verified_type=cfg.monitor.priority_verified_type_weights,
+            has_ca=cfg.monitor.priority_has_ca_weight,
+            push_type=cfg.monitor.priority_push_type_weights,
+        )) if cfg.monitor.priority_enabled else None
+        # 有界接入队列, 由固定数量的worker执行分析流程
+        self.ingest_queue = IngestQueue(
+            self.process_message,
+            workers=cfg.monitor.ingest_workers,
+            maxsize=cfg.monitor.ingest_queue_size,
+            policy=cfg.monitor.ingest_queue_policy,
+            on_drop=self._on_message_dropped,
+            priority_fn=self.prioritizer,
+            aging_per_second=cfg.monitor.priority_aging_per_second,
+        )
+        # 调用大模型前的本地预筛选
+        self.prefilter = TweetPrefilter(
+            threshold=cfg.monitor.prefilter_threshold,
+            fast_path_score=cfg.monitor.prefilter_fast_path_score,
+            fast_path_enabled=cfg.monitor.prefilter_fast_path_enabled,
+            weights=PrefilterWeights(
+                cashtag=cfg.monitor.prefilter_cashtag_weight,
+                contract_address=cfg.monitor.prefilter_ca_weight,
+                keyword=cfg.monitor.prefilter_keyword_weight,
+                media=cfg.monitor.prefilter_media_weight,
+            ),
+        ) if cfg.monitor.prefilter_enabled else None
+        # 重复推送过滤
+        self.deduplicator = MessageDeduplicator(
+            ttl=cfg.monitor.dedup_ttl_seconds,
+            max_entries=cfg.monitor.dedup_max_entries,
+        ) if cfg.monitor.dedup_enabled else None
+        # 多进程模式下跨进程认领消息, 避免同一推文被多个进程重复分析和交易
+        self.claims = SharedClaimStore(
+            cfg.monitor.claim_db_path,
+            ttl=cfg.monitor.dedup_ttl_seconds,
+            lease=cfg.monitor.claim_lease_seconds,
+        ) if worker_index is not None else None
+        # 接收消息的预写日志, 进程崩溃后重放未处理完的消息, 每个进程使用独立的目录
+        wal_dir = cfg.monitor.wal_dir if worker_index is None else os.path.join(cfg.monitor.wal_dir, f"worker-{worker_index}")
+        self.wal = WriteAheadLog(
+            wal_dir,
+            segment_max_bytes=cfg.monitor.wal_segment_max_bytes,
+        ) if cfg.monitor.wal_enabled else None
+        self._background_tasks = set()
+
+    def _init_image_cache(self) -> Optional[ImageAnalysisCache]:
+        """初始化图片分析缓存, 配置了SQLite文件时加载之前的记录"""
+        if not cfg.llm.image_cache_enabled:
+            return None
+        cache = ImageAnalysisCache(
+            max_entries=cfg.llm.image_cache_max_entries,
+            ttl=cfg.llm.image_cache_ttl,
+            threshold=cfg.llm.image_cache_threshold,
+            db_path=cfg.llm.image_cache_db_path or None,
+        )
+        try:
+            loaded = cache.load()
+            if loaded:
+                logger.info(f"已加载 {loaded} 条图片分析缓存")
+        except Exception as e:
+            logger.warning(f"加载图片分析缓存失败: {str(e)}")
+        return cache
+
+    def _init_result_cache(self) -> Optional[AnalysisResultCache]:
+        """初始化分析结果缓存, 配置了SQLite文件时加载之前的记录"""
+        if not cfg.llm.result_cache_enabled:
+            return None
+        cache = AnalysisResultCache(
+            max_entries=cfg.llm.result_cache_max_entries,
+            # 去重窗口内的重复推送在分析前就被丢弃, 缓存有效期与之对齐, 避免窗口外又复用旧结果重复通知;
+            # 缓存仍覆盖去重不处理的情况: 短文本配不同图片(键包含图片)、进程重启(SQLite)以及关闭去重
+            ttl=cfg.llm.result_cache_ttl or cfg.monitor.dedup_ttl_seconds,
+            db_path=cfg.llm.result_cache_db_path or None,
+        )
+        try:
+            loaded = cache.load()
+            if loaded:
+                logger.info(f"已加载 {loaded} 条分析结果缓存")
+        except Exception as e:
+            logger.warning(f"加载分析结果缓存失败: {str(e)}")
+        return cache
+
+    async def _init_trader(self):
+        """初始化交易模块（公共方法）, 需在处理消息的事件循环中调用"""
         if cfg.trader.enabled and cfg.trader.private_keys:
             trader = ChainTrader()
-            loop = asyncio.get_event_loop()
-            loop.run_until_complete(trader.initialize_chains())
+            await trader.initialize_chains()
             logger.info("自动交易功能已启用")
             return trader
         logger.info("自动交易功能未启用")
         return None
 
+    async def start_pipeline(self):
+        """启动WAL和处理队列, 并重放上次未处理完的消息(需在事件循环中调用)"""
+        if self.trader is None:
+            self.trader = await self._init_trader()
+        pending = []
+        if self.wal:
+            pending = self.wal.replay()
+            await self.wal.open()
+        await notice.start_dispatcher()
+        await self.ingest_queue.start()
+        if pending:
+            self._spawn(self._replay_pending(pending))
+        self._spawn(self._warm_browser())
+
+    async def _warm_browser(self):
+        """后台预热进程内共享的浏览器, 首次需要渲染页面时无需等待启动"""
+        try:
+            await get_browser_pool().start()
+        except Exception as e:
+            logger.warning(f"浏览器页面池预热失败, 将在首次使用时重试: {str(e)}")
+
+    async def stop_pipeline(self):
+        """停止处理队列并关闭WAL"""
+        await self.ingest_queue.stop()
+        await notice.stop_dispatcher()
+        if self.wal:
+            await self.wal.close()
+        await close_browser_pool()
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """创建后台任务并保留引用, 避免任务在执行中被回收"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def ingest(self, message: Msg) -> bool:
+        """
+        接收一条消息: 先写入WAL, 再放入处理队列
+
+        Returns:
+            bool: 是否入队成功
+        """
+        return (await self.ingest_many([message]))[0]
+
+    async def ingest_many(self, messages: List[Msg]) -> List[bool]:
+        """
+        批量接收消息, 多条消息的WAL写入合并为一次落盘
+
+        Returns:
+            List[bool]: 每条消息是否入队成功
+        """
+        if self.wal:
+            record_ids = await asyncio.gather(*(self.wal.append("msg", asdict(m)) for m in messages))
+            for message, record_id in zip(messages, record_ids):
+                message.msg_id = record_id
+        results = []
+        for message in messages:
+            accepted = self.submit(message)
+            if not accepted and self.wal:
+                # 未入队的消息由推送方重试, 不需要重放
+                self.wal.mark_done(message.msg_id)
+            results.append(accepted)
+        return results
+
+    def _on_message_dropped(self, message: Msg):
+        """队列按 drop_oldest 策略丢弃消息时回调"""
+        if self.wal:
+            self.wal.mark_done(message.msg_id)
+
+    async def _replay_pending(self, records: List[WalRecord]):
+        """依次重放WAL中未完成的记录"""
+        for record in records:
+            try:
+                await self._replay_record(record)
+            except Exception as e:
+                logger.error(f"重放消息 {record.record_id} 失败: {str(e)}", exc_info=True)
+                self.wal.mark_done(record.record_id)
+
+    async def _replay_record(self, record: WalRecord):
+        """重放单条WAL记录, 子类可按记录类型扩展"""
+        if record.kind != "msg":
+            logger.warning(f"未知的WAL记录类型: {record.kind}, 已跳过")
+            self.wal.mark_done(record.record_id)
+            return
+        message = Msg.from_dict(record.payload)
+        message.msg_id = record.record_id
+        while not self.submit(message):
+            if not self.ingest_queue.running:
+                return
+            await asyncio.sleep(0.5)
+
+    def submit(self, message: Msg) -> bool:
+        """
+        将消息放入接入队列，由worker异步处理
+
+        Returns:
+            bool: 是否入队成功
+        """
+        return self.ingest_queue.put_nowait(message)
+
     async def process_message(self, message:Msg):
-        return await self._analyze_message(message)
+        recorded = False
+        claimed = False
+        succeeded = False
+        try:
+            if self.deduplicator:
+                if self.deduplicator.check(message):
+                    return None
+                recorded = True
+            if self.claims:
+                if not await self.claims.claim_message(message):
+                    logger.info(f"推文已由其他进程处理: {message.screen_name}-{message.content[:50]}")
+                    return None
+                claimed = True
+            result = await self._analyze_message(message)
+            succeeded = not (isinstance(result, dict) and "error" in result)
+            return result
+        finally:
+            if claimed:
+                await self._settle_claim(message, succeeded)
+            if recorded and not succeeded:
+                # 认领失败或分析失败时撤销本地去重记录, 否则本进程再也不会重试该消息
+                self.deduplicator.forget(message)
+            if self.wal:
+                self.wal.mark_done(message.msg_id)
+
+    async def _settle_claim(self, message: Msg, succeeded: bool):
+        """处理成功时确认认领, 失败或超时时释放认领, 其他进程可以重新处理"""
+        try:
+            if succeeded:
+                await self.claims.confirm_message(message)
+            else:
+                await self.claims.release_message(message)
+        except Exception as e:
+            logger.warning(f"更新推文认领状态失败: {str(e)}")
+
+    def stats(self) -> dict:
+        """运行状态统计"""
+        return {
+            "queue": self.ingest_queue.stats(),
+            "dedup": self.deduplicator.stats() if self.deduplicator else None,
+            "prefilter": self.prefilter.stats() if self.prefilter else None,
+            "wal": self.wal.stats() if self.wal else None,
+            "claims": self.claims.stats() if self.claims else None,
+            "notice": notice.dispatcher_stats(),
+            "media": self.analyzer.media_resolver.stats(),
+            "image_cache": self.analyzer.image_cache.stats() if self.analyzer.image_cache else None,
+            "result_cache": self.analyzer.result_cache.stats() if self.analyzer.result_cache else None,
+            "llm": self.analyzer.stats(),
+            "llm_batch": self.analyzer.text_batcher.stats() if self.analyzer.text_batcher else None,
+            "browser_pool": get_browser_pool().stats(),
+            "worker_index": self.worker_index,
+        }
 
     async def _analyze_message(self, msg: Msg): 
 
+        # 分析过程中提前开始的代币搜索任务
+        prefetched = {}
         try:
             tweet_author = msg.screen_name
             tweet_content = msg.content
             logger.info(f"开始分析推文内容: {tweet_author}-{tweet_content[:100]}...")
         
-            # 调用AI分析器分析内容
-            analysis_result = await self.analyzer.analyze_content(msg)
+            triage = self.prefilter.triage(msg) if self.prefilter else None
+            if triage and triage.decision == SKIP:
+                logger.info(f"预筛选跳过推文(分数 {triage.score}): {tweet_author}")
+                return
+            if triage and triage.decision == FAST_PATH:
+                # 推文中直接给出了合约地址, 跳过大模型
+                logger.info(f"预筛选快速路径(分数 {triage.score}), 直接搜索代币: {triage.addresses}")
+                analysis_result = triage.to_analysis_result()
+            else:
+                # 调用AI分析器分析内容, 提前得到代币名称时立即开始搜索
+
+                def on_tokens(names):
+                    for name in names:
+                        if name not in prefetched:
+                            prefetched[name] = asyncio.ensure_future(self.token_searcher.search_token(name))
+
+                analysis_result = await self.analyzer.analyze_content(msg, on_tokens=on_tokens)
         
             # 记录分析结果
             logger.info(f"推文分析完成，结果: {analysis_result}")
         
             # 如果发现了代币信息，搜索代币并发送详细通知
-            if analysis_result and "speculate_result" in analysis_result:
-                tokens = analysis_result["speculate_result"]
-                if tokens and len(tokens) > 0:
-                    # 提取代币名称
-                    token_names = [token["token_name"] for token in tokens]
+            if analysis_result:
+                token_names = analysis_result.token_names
+                if token_names:
                     logger.info(f"发现潜在代币: {token_names}")
         
                     # 搜索代币信息
-                    search_results = await self._search_tokens(token_names)
+                    search_results = await self._search_tokens(token_names, prefetched)
         
                     # 格式化通知信息，同时获取 token 列表
                     notification, token_list = self._format_token_notification(token_names, search_results, tweet_author, tweet_content)
@@ -110,20 +405,36 @@ class BaseMonitor:
         except Exception as e:
             logger.error(f"分析推文内容时出错: {str(e)}", exc_info=True)
             return {"error": str(e)}
+        finally:
+            for task in prefetched.values():
+                if not task.done():
+                    task.cancel()
 
-    async def _search_tokens(self, token_names):
+    async def _search_tokens(self, token_names, prefetched=None):
         """
         搜索代币信息
         
         Args:
             token_names: 代币名称列表
+            prefetched: 已提前开始的搜索任务, 代币名称到任务的映射
             
         Returns:
             dict: 代币名称到搜索结果的映射
         """
         try:
+            prefetched = prefetched or {}
+            search_results = {}
+            for name in token_names:
+                if name in prefetched:
+                    try:
+                        search_results[name] = await prefetched[name]
+                    except Exception as e:
+                        logger.error(f"搜索代币 {name} 时出错: {str(e)}")
+                        search_results[name] = None
+            remaining = [name for name in token_names if name not in prefetched]
             # 使用代币搜索器批量搜索代币
-            search_results = await self.token_searcher.batch_search_tokens(token_names, concurrency=3)
+            if remaining:
+                search_results.update(await self.token_searcher.batch_search_tokens(remaining, concurrency=3))
             logger.info(f"代币搜索完成，找到 {len(search_results)} 个结果")
             return search_results
         except Exception as e:
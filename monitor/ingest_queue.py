@@ -0,0 +1,206 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from loguru import logger
+
+
+class _HeapQueue(asyncio.Queue):
+    """按 (key, seq, item) 排序的 asyncio 队列, 支持移除排序最靠后的元素"""
+
+    def _init(self, maxsize):
+        self._queue = []
+
+    def _put(self, entry):
+        heapq.heappush(self._queue, entry)
+
+    def _get(self):
+        return heapq.heappop(self._queue)
+
+    def peek_last(self):
+        """排序最靠后(优先级最低)的元素"""
+        return max(self._queue)
+
+    def pop_last(self):
+        """移除并返回排序最靠后(优先级最低)的元素"""
+        index = max(range(len(self._queue)), key=self._queue.__getitem__)
+        entry = self._queue[index]
+        self._queue[index] = self._queue[-1]
+        self._queue.pop()
+        heapq.heapify(self._queue)
+        return entry
+
+
+class IngestQueue:
+    """有界消息接入队列, 由固定数量的 worker 协程消费
+
+    - reject: 队列满时拒绝新消息(webhook 返回 429)
+    - drop_oldest: 队列满时丢弃一条排队中的消息, 保证新消息能进入
+      (FIFO 模式丢弃最早的, 优先级模式丢弃优先级最低的; 新消息的优先级比排队中的都低时丢弃新消息)
+
+    传入 priority_fn 时按优先级出队, 分数越高越先处理. 排队中的消息每等待1秒
+    优先级增加 aging_per_second, 避免低优先级消息一直得不到处理.
+    """
+
+    POLICY_REJECT = "reject"
+    POLICY_DROP_OLDEST = "drop_oldest"
+
+    def __init__(self, handler: Callable[[Any], Awaitable[Any]], workers: int = 4,
+                 maxsize: int = 1000, policy: str = POLICY_REJECT, name: str = "ingest",
+                 on_drop: Optional[Callable[[Any], None]] = None,
+                 priority_fn: Optional[Callable[[Any], float]] = None,
+                 aging_per_second: float = 0.0,
+                 timeout: Optional[float] = None):
+        """
+        Args:
+            handler: 处理单条消息的协程函数
+            workers: worker 协程数量
+            maxsize: 队列最大长度
+            policy: 队列满时的处理策略, reject/drop_oldest
+            name: 队列名称, 用于日志
+            on_drop: 按 drop_oldest 策略丢弃消息时的回调
+            priority_fn: 计算消息优先级分数的函数, 为None时按FIFO处理
+            aging_per_second: 排队中的消息每秒增加的优先级分数
+            timeout: 单条消息的处理超时(秒), 为None时不限制
+        """
+        if policy not in (self.POLICY_REJECT, self.POLICY_DROP_OLDEST):
+            raise ValueError(f"不支持的队列策略: {policy}")
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.name = name
+        self.on_drop = on_drop
+        self.priority_fn = priority_fn
+        self.aging_per_second = aging_per_second
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self._queue: Optional[_HeapQueue] = None
+        self._seq = itertools.count()
+        self._tasks: Set[asyncio.Task] = set()
+        self._busy = 0
+        self._counters = {
+            "accepted": 0,
+            "rejected": 0,
+            "dropped": 0,
+            "processed": 0,
+            "failed": 0,
+            "timeouts": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def depth(self) -> int:
+        """当前排队中的消息数"""
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self):
+        """在当前事件循环中启动 worker"""
+        if self.running:
+            return
+        self._queue = _HeapQueue(maxsize=self.maxsize)
+        for i in range(self.workers):
+            task = asyncio.create_task(self._worker(i), name=f"{self.name}-worker-{i}")
+            self._tasks.add(task)
+        logger.info(f"[{self.name}] 队列已启动, worker数: {self.workers}, 最大长度: {self.maxsize}, 策略: {self.policy}")
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """停止 worker, 尽量在超时前处理完已入队的消息"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[{self.name}] 停止时仍有 {self.depth()} 条消息未处理")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        logger.info(f"[{self.name}] 队列已停止")
+
+    def put_nowait(self, item) -> bool:
+        """
+        非阻塞入队
+
+        Returns:
+            bool: 是否入队成功; 队列未启动、按 reject 策略被拒绝, 或优先级模式下新消息优先级最低被丢弃时返回 False
+        """
+        if not self.running:
+            self._counters["rejected"] += 1
+            return False
+        entry = self._entry(item)
+        if self._queue.full():
+            if self.policy == self.POLICY_REJECT:
+                self._counters["rejected"] += 1
+                logger.warning(f"[{self.name}] 队列已满({self.maxsize}), 拒绝新消息")
+                return False
+            if self.priority_fn and entry > self._queue.peek_last():
+                # 新消息比排队中的消息优先级都低, 保留队列不变, 由调用方按未入队处理
+                self._counters["dropped"] += 1
+                logger.warning(f"[{self.name}] 队列已满({self.maxsize}), 新消息优先级最低, 已丢弃")
+                return False
+            # drop_oldest: FIFO 模式丢弃最早的一条, 优先级模式丢弃优先级最低的一条
+            _, _, dropped = self._queue.pop_last() if self.priority_fn else self._queue.get_nowait()
+            self._queue.task_done()
+            if self.on_drop:
+                self.on_drop(dropped)
+            self._counters["dropped"] += 1
+            logger.warning(f"[{self.name}] 队列已满({self.maxsize}), 丢弃一条排队中的消息")
+        self._queue.put_nowait(entry)
+        self._counters["accepted"] += 1
+        return True
+
+    def _entry(self, item):
+        """
+        构建堆元素 (key, seq, item), key 越小越先出队
+
+        老化是线性的: 有效优先级 = score + aging * (now - 入队时间),
+        排序只取决于 score - aging * 入队时间, 入队时即可确定, 无需重排
+        """
+        seq = next(self._seq)
+        if not self.priority_fn:
+            return seq, seq, item
+        try:
+            score = float(self.priority_fn(item))
+        except Exception as e:
+            logger.error(f"[{self.name}] 计算优先级出错: {str(e)}")
+            score = 0.0
+        return self.aging_per_second * time.monotonic() - score, seq, item
+
+    async def _worker(self, index: int):
+        while True:
+            _, _, item = await self._queue.get()
+            self._busy += 1
+            try:
+                if self.timeout:
+                    await asyncio.wait_for(self.handler(item), timeout=self.timeout)
+                else:
+                    await self.handler(item)
+                self._counters["processed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self._counters["timeouts"] += 1
+                logger.warning(f"[{self.name}] worker-{index} 处理消息超时({self.timeout}s), 已放弃")
+            except Exception as e:
+                self._counters["failed"] += 1
+                logger.error(f"[{self.name}] worker-{index} 处理消息出错: {str(e)}", exc_info=True)
+            finally:
+                self._busy -= 1
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        """队列状态, 用于监控接口和日志"""
+        return {
+            "name": self.name,
+            "running": self.running,
+            "depth": self.depth(),
+            "maxsize": self.maxsize,
+            "workers": self.workers,
+            "busy": self._busy,
+            "policy": self.policy,
+            "priority": self.priority_fn is not None,
+            **self._counters,
+        }
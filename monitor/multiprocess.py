@@ -0,0 +1,98 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import Dict, Optional
+from loguru import logger
+
+
+def _create_listener(host: str, port: int, reuse_port: bool = False, backlog: int = 2048) -> socket.socket:
+    """创建监听socket, reuse_port 为 True 时允许多个进程绑定同一端口"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _worker_main(index: int, host: str, port: int, listener_fd: Optional[int], reuse_port: bool):
+    """子进程入口: 创建独立的事件循环和 WebhookMonitor"""
+    from monitor.webhook_monitor import WebhookMonitor
+
+    # 退出信号由父进程统一处理, 子进程只响应 SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if listener_fd is None:
+        listener_fd = _create_listener(host, port, reuse_port=True).detach()
+    monitor = WebhookMonitor(host=host, port=port, worker_index=index)
+    monitor.serve_fd(listener_fd)
+
+
+def run_webhook_workers(host: str, port: int, processes: int, reuse_port: bool = False):
+    """
+    多进程启动 webhook 服务
+
+    默认由父进程创建监听socket后 fork 子进程, 所有子进程在同一个socket上 accept;
+    reuse_port 为 True 时每个子进程各自以 SO_REUSEPORT 绑定端口, 由内核分配连接.
+    子进程异常退出时自动重启.
+
+    Args:
+        host: 监听地址
+        port: 监听端口
+        processes: 子进程数量
+        reuse_port: 是否使用 SO_REUSEPORT
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        raise RuntimeError("多进程模式需要支持 fork 的系统(Linux)")
+    ctx = multiprocessing.get_context("fork")
+
+    listener = None if reuse_port else _create_listener(host, port)
+    listener_fd = listener.fileno() if listener else None
+    workers: Dict[int, multiprocessing.Process] = {}
+    stopping = False
+
+    def spawn(index: int):
+        process = ctx.Process(
+            target=_worker_main,
+            args=(index, host, port, listener_fd, reuse_port),
+            name=f"webhook-worker-{index}",
+            daemon=False,
+        )
+        process.start()
+        workers[index] = process
+        logger.info(f"webhook worker-{index} 已启动, pid: {process.pid}")
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    logger.info(f"多进程模式启动, 进程数: {processes}, 监听地址: {host}:{port}, "
+                f"模式: {'SO_REUSEPORT' if reuse_port else '共享监听socket'}")
+    for index in range(processes):
+        spawn(index)
+
+    try:
+        while not stopping:
+            time.sleep(0.5)
+            for index, process in list(workers.items()):
+                if not process.is_alive() and not stopping:
+                    logger.warning(f"webhook worker-{index} 已退出(exitcode={process.exitcode}), 正在重启")
+                    spawn(index)
+    finally:
+        logger.info("正在停止所有 webhook worker...")
+        for process in workers.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        for process in workers.values():
+            process.join(timeout=15)
+            if process.is_alive():
+                process.kill()
+        if listener:
+            listener.close()
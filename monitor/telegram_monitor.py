@@ -1,9 +1,13 @@
 from telethon import TelegramClient, events
 from telethon.tl.types import PeerChannel, PeerChat
 from monitor.base import BaseMonitor  # 继承基类
+from monitor.ingest_queue import IngestQueue
 from core.data_def import  Msg
+from core.message_template import TemplateRegistry, source_url
+from config.config import cfg
+from loguru import logger
 import re
-from utils.x_abstract import get_tweet_details
+from utils.tweet_resolver import TweetResolver
 import notify.notice as notice  
 import asyncio
 
@@ -20,6 +24,24 @@ class TelegramMonitor(BaseMonitor):
             "消息推送Chanel/Group": target_chat_id,
         }
         self.target_list = self._build_target_list()
+        # 消息解析(抓取推文)阶段的有界并发队列, 单条消息超时后放弃, 不阻塞后续消息
+        self.telegram_queue = IngestQueue(
+            self._handle_item,
+            workers=cfg.telegram.workers,
+            maxsize=cfg.telegram.queue_size,
+            timeout=cfg.telegram.message_timeout,
+            name="telegram",
+        )
+        # 推送文本模板, 可按频道通过 TELEGRAM_TEMPLATES_FILE 追加
+        self.templates = TemplateRegistry()
+        if cfg.telegram.templates_file:
+            self.templates.load_file(cfg.telegram.templates_file)
+        # 推文解析: 先走HTTP, 失败时再用浏览器渲染, 结果按推文缓存
+        self.tweet_resolver = TweetResolver(
+            http_timeout=cfg.telegram.resolver_http_timeout,
+            cache_ttl=cfg.telegram.resolver_cache_ttl,
+            cache_max_entries=cfg.telegram.resolver_cache_max_entries,
+        )
         self._register_handlers()
 
     def _build_target_list(self):
@@ -37,44 +59,109 @@ class TelegramMonitor(BaseMonitor):
             await self._handle_message(event.message)
 
     async def _handle_message(self, message):
-        """消息处理核心逻辑"""
-        msg:Msg = await self.parse_message(message)  # 添加await
-        await self.process_message(msg)
+        """消息处理核心逻辑: 写入WAL后放入解析队列, 立即返回"""
+        if not self.telegram_queue.running:
+            # 处理流程未启动或已停止(WAL未打开), 不接收消息
+            logger.warning(f"处理流程未运行, 丢弃消息: {(message.raw_text or '')[:50]}")
+            return
+        # 先写入WAL, 进程崩溃后可重放
+        chat_id = getattr(message, "chat_id", None)
+        payload = {"raw_text": message.raw_text, "chat_id": chat_id}
+        record_id = await self.wal.append("telegram", payload) if self.wal else ''
+        if not self.telegram_queue.put_nowait((message.raw_text, record_id, chat_id)):
+            logger.warning(f"Telegram消息队列已满, 丢弃消息: {message.raw_text[:50]}")
+            if self.wal:
+                self.wal.mark_done(record_id)
+
+    async def _handle_item(self, item):
+        await self._handle_text(*item)
+
+    async def _handle_text(self, text, record_id='', chat_id=None):
+        """解析消息文本, 解析完成后交给分析队列"""
+        handed_off = False
+        try:
+            msg: Msg = await self.parse_text(text, chat_id)
+            msg.msg_id = record_id
+            handed_off = self.submit(msg)
+            if not handed_off:
+                logger.warning(f"分析队列已满, 丢弃消息: {msg.screen_name}-{msg.content[:50]}")
+        finally:
+            # 解析失败/超时/未入队的消息不会再被处理, 直接标记完成
+            if not handed_off and self.wal:
+                self.wal.mark_done(record_id)
+
+    async def _replay_record(self, record):
+        """重放WAL中未处理完的Telegram消息"""
+        if record.kind == "telegram":
+            item = (record.payload.get("raw_text", ""), record.record_id, record.payload.get("chat_id"))
+            while not self.telegram_queue.put_nowait(item):
+                if not self.telegram_queue.running:
+                    return
+                await asyncio.sleep(0.5)
+            return
+        await super()._replay_record(record)
+
+    async def start_pipeline(self):
+        await self.telegram_queue.start()
+        await super().start_pipeline()
+
+    async def stop_pipeline(self):
+        await self.telegram_queue.stop()
+        await super().stop_pipeline()
+        await self.tweet_resolver.close()
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["telegram_queue"] = self.telegram_queue.stats()
+        stats["templates"] = self.templates.stats()
+        stats["tweet_resolver"] = self.tweet_resolver.stats()
+        return stats
 
     async def parse_message(self, message):  # 改为异步方法
         """解析消息内容"""
-        # 使用正则表达式解析出链接
-        text = message.raw_text
-        url_pattern = r'Source:\s*(https?://\S+)'
-        match = re.search(url_pattern, text)
-        msg = Msg(
-            push_type='new_tweet',  # 默认推送类型
-            title='',               # 根据实际情况补充标题字段
-            content='',             # 默认空内容
-            name='',                # 默认空名称
-            screen_name=''          # 默认空用户名
-        )
-        if match:
-            source_url = match.group(1)
-            print("解析出的原文链接为:", source_url)
-            loop = asyncio.get_event_loop()
-            msg_info = await loop.run_in_executor(
-                None,  # 使用默认线程池
-                get_tweet_details,
-                source_url
+        return await self.parse_text(message.raw_text, getattr(message, "chat_id", None))
+
+    async def parse_text(self, text, chat_id=None):
+        """
+        解析消息文本
+
+        优先用消息模板直接从推送文本构建消息, 模板未匹配或缺少内容/用户名时
+        才通过原文链接抓取推文补全
+        """
+        msg = self.templates.parse(text, chat_id)
+        if msg is None:
+            msg = Msg(
+                push_type='new_tweet',  # 默认推送类型
+                title='',               # 根据实际情况补充标题字段
+                content='',             # 默认空内容
+                name='',                # 默认空名称
+                screen_name=''          # 默认空用户名
             )
-            msg.content = msg_info.get("content")
-            msg.name = msg_info.get("name")
-            msg.screen_name = msg_info.get("username")
+        url = source_url(text)
+        if url and not (msg.content and msg.screen_name):
+            logger.info(f"推送文本信息不完整, 抓取原文补全: {url}")
+            if not msg.tweet_id:
+                status_match = re.search(r'/status/(\d+)', url)
+                if status_match:
+                    msg.tweet_id = status_match.group(1)
+            msg_info = await self.tweet_resolver.resolve(url)
+            msg.content = msg.content or msg_info.get("content")
+            msg.name = msg.name or msg_info.get("name")
+            msg.screen_name = msg.screen_name or msg_info.get("username")
             msg.title = f'{msg.screen_name} 发布了一条新推文'
         notice.send_notice_msg(str(msg))    
         return msg  
 
     async def _client_main(self):
-        """客户端主循环"""
-        me = await self.client.get_me()
-        self._show_login_info(me)
-        await self.client.run_until_disconnected()
+        """客户端主循环: 先启动处理流程再连接, 断开连接后再停止, 收到的消息都能写入WAL"""
+        await self.start_pipeline()
+        try:
+            async with self.client:
+                me = await self.client.get_me()
+                self._show_login_info(me)
+                await self.client.run_until_disconnected()
+        finally:
+            await self.stop_pipeline()
 
     def _show_login_info(self, me):
         """显示登录信息"""
@@ -85,8 +172,7 @@ class TelegramMonitor(BaseMonitor):
 
     def start(self):
         """启动监控"""
-        with self.client:
-            self.client.loop.run_until_complete(self._client_main())
+        self.client.loop.run_until_complete(self._client_main())
 
 if __name__ == '__main__':
     from config.config import cfg 
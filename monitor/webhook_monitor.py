@@ -1,16 +1,17 @@
 
 from quart import Quart, request, jsonify 
 import asyncio
-import json
+import signal
 from loguru import logger
-from typing import Optional
-from core.data_def import PushMsg, User, Tweet,Msg
+from typing import List, Optional, Union
+from config.config import cfg
+from core.data_def import Msg, PushRecord, decode_push, json_loads
 from monitor.base import BaseMonitor
 import notify.notice as notice  
 
 class WebhookMonitor(BaseMonitor):
-    def __init__(self, host='0.0.0.0', port=9999):
-        super().__init__()  # 继承基类初始化
+    def __init__(self, host='0.0.0.0', port=9999, worker_index=None):
+        super().__init__(worker_index=worker_index)  # 继承基类初始化
         self.app = Quart(__name__)
         self.host = host
         self.port = port
@@ -19,6 +20,22 @@ class WebhookMonitor(BaseMonitor):
 
     def _register_routes(self):
         """注册API路由"""
+        @self.app.before_serving
+        async def start_workers():
+            await self.start_pipeline()
+
+        @self.app.after_serving
+        async def stop_workers():
+            await self.stop_pipeline()
+
+        @self.app.route('/status', methods=['GET'])
+        async def status():
+            return jsonify(self.stats()), 200
+
+        @self.app.route('/status/queue', methods=['GET'])
+        async def queue_status():
+            return jsonify(self.ingest_queue.stats()), 200
+
         @self.app.route('/post/tweet', methods=['POST'])
         async def receive_tweet():
             try:
@@ -30,22 +47,24 @@ class WebhookMonitor(BaseMonitor):
                 logger.debug(f"收到原始数据: {data}")
 
                 # 解析推文数据
-                push_msg: PushMsg = self._parse_tweet_data(data)
+                push_msg: PushRecord = self._parse_tweet_data(data)
                 if not push_msg:
                     return jsonify({"status": "error", "message": "Failed to parse tweet data"}), 400
 
                 logger.info(f"解析后的推文数据: {push_msg}")
 
-                msg:Msg = Msg(
-                    push_type=push_msg.push_type,
-                    title=push_msg.title,
-                    content=push_msg.content,
-                    name=push_msg.user.name,
-                    screen_name=push_msg.user.screen_name
-                )
+                msg: Msg = self._build_msg(push_msg)
+                # 写入WAL后放入接入队列，由worker异步处理
+                if not await self.ingest(msg):
+                    if not self.ingest_queue.running:
+                        return jsonify({"status": "error", "message": "Service unavailable"}), 503
+                    return jsonify({
+                        "status": "error",
+                        "message": "Too many pending tweets",
+                        "queue_depth": self.ingest_queue.depth()
+                    }), 429
+                # 只通知已入队的推文, 被拒绝的推文由推送方重试, 避免重复通知
                 notice.send_notice_msg(msg)
-                # 异步处理推文
-                asyncio.create_task(self.process_message(msg))
 
                 return jsonify({
                     "status": "success",
@@ -55,7 +74,105 @@ class WebhookMonitor(BaseMonitor):
                 logger.error(f"处理推文时发生错误: {str(e)}", exc_info=True)
                 return jsonify({"status": "error", "message": str(e)}), 500
 
-    def _parse_tweet_data(self, raw_data) -> Optional[PushMsg]:
+        @self.app.route('/post/tweets', methods=['POST'])
+        async def receive_tweets():
+            """批量接收推文, 支持 JSON 数组或 NDJSON(每行一个 PushMsg)"""
+            try:
+                data = await request.get_data()
+                data = data.decode('utf-8')
+                try:
+                    items = self._split_batch(data)
+                except ValueError as e:
+                    return jsonify({"status": "error", "message": str(e)}), 400
+                if not items:
+                    return jsonify({"status": "error", "message": "Invalid or missing json data"}), 400
+                if len(items) > cfg.monitor.batch_max_items:
+                    return jsonify({
+                        "status": "error",
+                        "message": f"Too many items in one batch (max {cfg.monitor.batch_max_items})"
+                    }), 413
+
+                results = [None] * len(items)
+                decoded = []
+                for index, item in enumerate(items):
+                    try:
+                        decoded.append((index, self._build_msg(self._decode_push_msg(item))))
+                    except Exception as e:
+                        logger.warning(f"批量数据第{index}条解析失败: {str(e)}")
+                        results[index] = {"index": index, "status": "error", "message": f"parse error: {str(e)}"}
+
+                # 整批一次写入WAL后入队
+                accepted = 0
+                queue_full = False
+                ingested = await self.ingest_many([msg for _, msg in decoded]) if decoded else []
+                for (index, msg), ok in zip(decoded, ingested):
+                    if not ok:
+                        queue_full = True
+                        results[index] = {"index": index, "status": "error", "message": "queue full"}
+                        continue
+                    notice.send_notice_msg(msg)
+                    accepted += 1
+                    results[index] = {"index": index, "status": "queued"}
+
+                logger.info(f"批量接收推文 {len(items)} 条, 入队 {accepted} 条")
+                body = {
+                    "status": "success" if accepted == len(items) else ("partial" if accepted else "error"),
+                    "accepted": accepted,
+                    "rejected": len(items) - accepted,
+                    "results": results
+                }
+                if accepted:
+                    return jsonify(body), 200
+                if not self.ingest_queue.running:
+                    return jsonify(body), 503
+                return jsonify(body), 429 if queue_full else 400
+            except Exception as e:
+                logger.error(f"批量处理推文时发生错误: {str(e)}", exc_info=True)
+                return jsonify({"status": "error", "message": str(e)}), 500
+
+    @staticmethod
+    def _split_batch(raw_data: str) -> List[Union[str, dict]]:
+        """
+        拆分批量请求体
+
+        Args:
+            raw_data: JSON 数组或 NDJSON 字符串
+
+        Returns:
+            List: JSON 数组时为已解析的字典列表, NDJSON 时为逐行的原始字符串
+        """
+        raw_data = raw_data.strip()
+        if not raw_data:
+            return []
+        if raw_data.startswith('['):
+            try:
+                items = json_loads(raw_data)
+            except ValueError as e:
+                raise ValueError(f"Invalid json array: {str(e)}")
+            if not isinstance(items, list):
+                raise ValueError("Batch body must be a json array")
+            return items
+        return [line for line in raw_data.splitlines() if line.strip()]
+
+    @staticmethod
+    def _build_msg(push_msg: PushRecord) -> Msg:
+        """将推送数据转换为分析流程使用的 Msg"""
+        return push_msg.to_msg()
+
+    @staticmethod
+    def _decode_push_msg(raw_data: Union[str, bytes, dict]) -> PushRecord:
+        """
+        解析单条推送数据, 失败时抛出异常
+
+        Args:
+            raw_data: 原始JSON字符串或已解析的字典
+
+        Returns:
+            PushRecord: 解析后的推文数据
+        """
+        return decode_push(raw_data)
+
+    def _parse_tweet_data(self, raw_data) -> Optional[PushRecord]:
         """
         解析推文数据
         
@@ -63,29 +180,10 @@ class WebhookMonitor(BaseMonitor):
             raw_data: 原始JSON字符串
             
         Returns:
-            Optional[PushMsg]: 解析后的推文数据，如果解析失败则返回None
+            Optional[PushRecord]: 解析后的推文数据，如果解析失败则返回None
         """
         try:
-            data = json.loads(raw_data)
-            user = User(**data["user"])
-            
-            # 根据推送类型处理不同的数据结构
-            push_type = data.get("push_type", "")
-            
-            # 只有new_tweet类型才有tweet数据
-            if push_type == "new_tweet" and "tweet" in data:
-                tweet = Tweet(**data["tweet"])
-            else:
-                # 其他类型的推送，tweet对象设为None
-                tweet = None
-            
-            return PushMsg(
-                push_type=data["push_type"],
-                title=data["title"],
-                content=data["content"],
-                user=user,
-                tweet=tweet
-            )
+            return self._decode_push_msg(raw_data)
         except Exception as e:
             logger.error(f"解析JSON数据失败: {str(e)}", exc_info=True)
             return None
@@ -100,4 +198,25 @@ class WebhookMonitor(BaseMonitor):
         except Exception as e:
             logger.error(f"服务启动失败: {str(e)}", exc_info=True)
         finally:
-            logger.info("Twitter监控服务已停止")
\ No newline at end of file
+            logger.info("Twitter监控服务已停止")
+
+    def serve_fd(self, fd: int):
+        """在已创建的监听socket上启动服务(多进程模式), 收到 SIGTERM 后优雅退出"""
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config as HypercornConfig
+
+        config = HypercornConfig()
+        config.bind = [f"fd://{fd}"]
+
+        async def main():
+            stop_event = asyncio.Event()
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop_event.set)
+            await serve(self.app, config, shutdown_trigger=stop_event.wait)
+
+        logger.info(f"Twitter监控服务 worker-{self.worker_index} 启动中...")
+        try:
+            asyncio.run(main())
+        except Exception as e:
+            logger.error(f"服务启动失败: {str(e)}", exc_info=True)
+        finally:
+            logger.info(f"Twitter监控服务 worker-{self.worker_index} 已停止")
@@ -10,10 +10,13 @@ import logging
 import requests
 
 class DingTalkRobot(object):
-    def __init__(self, robot_id, secret):
+    def __init__(self, robot_id, secret, rate_limit=True, timeout=10):
         super(DingTalkRobot, self).__init__()
         self.robot_id = robot_id
         self.secret = secret
+        # rate_limit为False时由调用方负责限流(如notice中的令牌桶), 发送时不再休眠
+        self.rate_limit = rate_limit
+        self.timeout = timeout
         self.headers = {'Content-Type': 'application/json; charset=utf-8'}
         self.times = 0
         self.start_time = time.time()
@@ -132,7 +135,7 @@ class DingTalkRobot(object):
         :return: 返回发送结果
         """
         self.times += 1
-        if self.times > 20:
+        if self.rate_limit and self.times > 20:
             if time.time() - self.start_time < 60:
                 logging.debug('钉钉官方限制每个机器人每分钟最多发送20条，当前消息发送频率已达到限制条件，休眠一分钟')
                 time.sleep(60)
@@ -140,7 +143,7 @@ class DingTalkRobot(object):
 
         post_data = json.dumps(data)
         try:
-            response = requests.post(self.__spliceUrl(), headers=self.headers, data=post_data)
+            response = requests.post(self.__spliceUrl(), headers=self.headers, data=post_data, timeout=self.timeout)
             logging.debug('成功发送钉钉%'+str(response))
         except Exception as e:
             logging.debug('发送钉钉失败:' +str(e))
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import itertools
+import time
+from typing import Any, Callable, Optional, Set
+from loguru import logger
+
+
+class TokenBucket:
+    """令牌桶限流, 只计算需要等待的时间, 不阻塞"""
+
+    def __init__(self, rate_per_minute: float = 20, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            rate_per_minute: 每分钟补充的令牌数
+            capacity: 桶容量, 默认等于每分钟令牌数
+            clock: 时间函数, 便于测试替换
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """
+        尝试取一个令牌
+
+        Returns:
+            float: 0 表示已取得令牌, 否则为需要等待的秒数
+        """
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class NoticeDispatcher:
+    """后台通知发送器
+
+    通知先进入队列立即返回, 由后台协程按令牌桶限流后在线程池中执行实际的 HTTP 请求,
+    webhook 响应和分析流程不会被通知发送或限流等待阻塞.
+
+    交易提醒等紧急通知(urgent)排在所有普通通知之前发送, 也不受普通通知的排队上限限制,
+    普通通知积压时最多只需等待下一个令牌.
+    """
+
+    def __init__(self, rate_per_minute: float = 20, max_queue: int = 1000):
+        """
+        Args:
+            rate_per_minute: 每分钟最多发送的通知数(钉钉限制每个机器人每分钟20条)
+            max_queue: 排队的普通通知上限, 超出后丢弃新通知
+        """
+        self.bucket = TokenBucket(rate_per_minute)
+        self.max_queue = max_queue
+        # (优先级, 序号, 发送函数, 参数), 紧急通知优先级为0, 同优先级按提交顺序发送
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._seq = itertools.count()
+        self._normal_pending = 0
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Set[asyncio.Future] = set()
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        """是否在当前线程的事件循环中运行"""
+        if not self._task:
+            return False
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def start(self):
+        if self._task:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.PriorityQueue()
+        self._normal_pending = 0
+        self._task = asyncio.create_task(self._run(), name="notice-dispatcher")
+        logger.info("通知发送器已启动")
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """停止发送器, 尽量在超时前发完排队中的通知, 并等待线程池中的发送完成"""
+        if not self._task:
+            return
+        deadline = time.monotonic() + drain_timeout
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"通知发送器停止时仍有 {self._queue.qsize()} 条通知未发送")
+        if self._inflight:
+            _, pending = await asyncio.wait(set(self._inflight), timeout=max(0.0, deadline - time.monotonic()))
+            if pending:
+                logger.warning(f"通知发送器停止时仍有 {len(pending)} 条通知正在发送")
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._loop = None
+
+    def submit(self, fn: Callable[..., Any], *args, urgent: bool = False) -> bool:
+        """
+        提交一个同步发送函数, 立即返回
+
+        Args:
+            urgent: 是否为紧急通知, 紧急通知排在普通通知之前且不受排队上限限制
+
+        Returns:
+            bool: 是否进入发送队列
+        """
+        if not urgent:
+            if self._normal_pending >= self.max_queue:
+                self.dropped += 1
+                logger.warning(f"通知队列已满({self.max_queue}), 丢弃通知")
+                return False
+            self._normal_pending += 1
+        self._queue.put_nowait((0 if urgent else 1, next(self._seq), fn, args))
+        return True
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            priority, _, fn, args = await self._queue.get()
+            if priority:
+                self._normal_pending -= 1
+            try:
+                # 令牌不足时只让本协程等待, 不影响事件循环中的其他任务
+                wait = self.bucket.try_acquire()
+                while wait > 0:
+                    await asyncio.sleep(wait)
+                    wait = self.bucket.try_acquire()
+                # 在线程池中执行阻塞的 HTTP 请求, 不等待结果, 以便继续按限流节奏发送
+                future = loop.run_in_executor(None, fn, *args)
+                self._inflight.add(future)
+                future.add_done_callback(self._on_done)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"发送通知时出错: {str(e)}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def _on_done(self, future: asyncio.Future):
+        self._inflight.discard(future)
+        if future.cancelled():
+            return
+        if future.exception() or future.result() is False:
+            self.failed += 1
+        else:
+            self.sent += 1
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize() if self._queue else 0,
+            "inflight": len(self._inflight),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
@@ -2,10 +2,13 @@
 from loguru import logger
 from typing import List, Tuple, Optional
 from notify.dingding import DingTalkRobot
+from notify.dispatcher import NoticeDispatcher
 from config.config import cfg  # 从config导入配置
 
 # 初始化钉钉机器人
 _robot = None
+# 后台通知发送器, 在事件循环中启动后通知改为异步发送
+_dispatcher: Optional[NoticeDispatcher] = None
 
 def _get_robot():
     """获取钉钉机器人实例"""
@@ -14,12 +17,44 @@ def _get_robot():
         if not cfg.dingtalk.token or not cfg.dingtalk.secret:
             logger.warning("钉钉机器人未启用或未配置Token/Secret,无法发送通知")
             return None
-        _robot = DingTalkRobot(cfg.dingtalk.token, cfg.dingtalk.secret)
+        # 限流由通知发送器的令牌桶负责, 机器人内部不再休眠等待
+        _robot = DingTalkRobot(cfg.dingtalk.token, cfg.dingtalk.secret, rate_limit=False)
     return _robot
 
+async def start_dispatcher():
+    """在当前事件循环中启动后台通知发送器"""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = NoticeDispatcher(
+            rate_per_minute=cfg.dingtalk.rate_per_minute,
+            max_queue=cfg.dingtalk.queue_size
+        )
+    await _dispatcher.start()
+
+async def stop_dispatcher():
+    """停止后台通知发送器"""
+    if _dispatcher:
+        await _dispatcher.stop()
+
+def dispatcher_stats() -> Optional[dict]:
+    return _dispatcher.stats() if _dispatcher else None
+
+def _dispatch(fn, *args, urgent: bool = False) -> Optional[bool]:
+    """
+    发送器运行中时把发送函数放入队列, urgent 为 True 时排在普通通知之前
+
+    Returns:
+        Optional[bool]: 发送器未运行时返回None, 否则返回是否入队成功
+    """
+    if _dispatcher and _dispatcher.running:
+        return _dispatcher.submit(fn, *args, urgent=urgent)
+    return None
+
 def send_notice_msg(content: str, title: str = "系统通知", btn_info: List[Tuple[str, str]] = []) -> bool:
     """
     发送通知消息,默认使用ActionCard格式
+
+    发送器运行中时异步发送, 立即返回
     
     Args:
         content: 消息内容
@@ -27,8 +62,15 @@ def send_notice_msg(content: str, title: str = "系统通知", btn_info: List[Tu
         btn_info: 按钮信息列表，每个元素为(按钮标题, 按钮链接)元组,默认为None
         
     Returns:
-        bool: 是否发送成功
+        bool: 是否发送成功(异步发送时为是否进入发送队列)
     """
+    content = str(content)
+    queued = _dispatch(_send_notice_msg, content, title, list(btn_info))
+    if queued is not None:
+        return queued
+    return _send_notice_msg(content, title, btn_info)
+
+def _send_notice_msg(content: str, title: str, btn_info: List[Tuple[str, str]]) -> bool:
     try:
         robot = _get_robot()
         if not robot:
@@ -50,6 +92,8 @@ def send_notice_msg(content: str, title: str = "系统通知", btn_info: List[Tu
 def send_warn_action_card(title: str, text: str, btn_orientation: str = "0", *btns: Tuple[str, str]) -> bool:
     """
     发送警告ActionCard消息
+
+    发送器运行中时异步发送, 立即返回; 交易提醒排在普通推送通知之前发送
     
     Args:
         title: 标题
@@ -58,8 +102,14 @@ def send_warn_action_card(title: str, text: str, btn_orientation: str = "0", *bt
         btns: 按钮列表，每个按钮为(标题, 链接)元组
         
     Returns:
-        bool: 是否发送成功
+        bool: 是否发送成功(异步发送时为是否进入发送队列)
     """
+    queued = _dispatch(_send_warn_action_card, title, text, btn_orientation, *btns, urgent=True)
+    if queued is not None:
+        return queued
+    return _send_warn_action_card(title, text, btn_orientation, *btns)
+
+def _send_warn_action_card(title: str, text: str, btn_orientation: str = "0", *btns: Tuple[str, str]) -> bool:
     try:
         robot = _get_robot()
         if not robot:
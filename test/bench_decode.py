@@ -0,0 +1,79 @@
+"""
+推送消息解码微基准: 对比旧路径(json.loads + 完整 dataclass)与 decode_push
+
+用法:
+    python test/bench_decode.py [样本文件.jsonl] [迭代次数]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.data_def import Msg, PushMsg, Tweet, User, decode_push, orjson  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "push_samples.jsonl")
+
+
+def legacy_decode(raw: str) -> Msg:
+    """原 WebhookMonitor._parse_tweet_data + Msg 构建路径"""
+    data = json.loads(raw)
+    user = User(**data["user"])
+    push_type = data.get("push_type", "")
+    tweet = Tweet(**data["tweet"]) if push_type == "new_tweet" and "tweet" in data else None
+    push_msg = PushMsg(
+        push_type=data["push_type"],
+        title=data["title"],
+        content=data["content"],
+        user=user,
+        tweet=tweet
+    )
+    return Msg(
+        push_type=push_msg.push_type,
+        title=push_msg.title,
+        content=push_msg.content,
+        name=push_msg.user.name,
+        screen_name=push_msg.user.screen_name
+    )
+
+
+def fast_decode(raw: str) -> Msg:
+    return decode_push(raw).to_msg()
+
+
+def bench(fn, corpus, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for raw in corpus:
+            fn(raw)
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(corpus)) * 1e6
+
+
+def main():
+    corpus_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CORPUS
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    with open(corpus_path, encoding="utf-8") as f:
+        corpus = [line.strip() for line in f if line.strip()]
+
+    # 旧路径遇到未知/缺失字段会直接失败, 只用它能解析的样本对比
+    legacy_ok = []
+    for raw in corpus:
+        try:
+            legacy_decode(raw)
+            legacy_ok.append(raw)
+        except Exception:
+            pass
+
+    print(f"样本数: {len(corpus)}, 旧路径可解析: {len(legacy_ok)}, 迭代: {iterations}, orjson: {orjson is not None}")
+    if legacy_ok:
+        legacy_us = bench(legacy_decode, legacy_ok, iterations)
+        fast_us = bench(fast_decode, legacy_ok, iterations)
+        print(f"旧路径:      {legacy_us:8.2f} us/msg")
+        print(f"decode_push: {fast_us:8.2f} us/msg  ({legacy_us / fast_us:.2f}x)")
+    print(f"decode_push(全部样本): {bench(fast_decode, corpus, iterations):8.2f} us/msg")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+图片分析缓存基准: 统计感知哈希耗时, 以及转发图片(缩放/重新压缩/裁边)的命中率和误命中率
+
+用法:
+    python test/bench_image_cache.py [图片目录] [汉明距离阈值]
+"""
+import asyncio
+import glob
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.image_cache import ImageAnalysisCache, image_hash  # noqa: E402
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "images")
+
+
+def variants(data: bytes):
+    """模拟转发时常见的变化"""
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert("RGB")
+        width, height = img.size
+        yield "缩小50%", img.resize((max(1, width // 2), max(1, height // 2)))
+        yield "JPEG q=50", img
+        yield "裁边2%", img.crop((width // 50, height // 50, width - width // 50, height - height // 50))
+
+
+def encode(img) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=50)
+    return buffer.getvalue()
+
+
+async def run(directory: str, threshold: int):
+    paths = sorted(p for p in glob.glob(os.path.join(directory, "*"))
+                   if p.lower().endswith((".png", ".jpg", ".jpeg", ".webp", ".gif")))
+    if not paths:
+        print(f"目录中没有图片: {directory}")
+        return
+    images = {path: open(path, "rb").read() for path in paths}
+
+    start = time.perf_counter()
+    hashes = {path: image_hash(data) for path, data in images.items()}
+    hash_ms = (time.perf_counter() - start) / len(images) * 1000
+    print(f"图片数: {len(images)}, Pillow: {Image is not None}, 阈值: {threshold}, 平均哈希耗时: {hash_ms:.2f} ms")
+
+    # 每张原图缓存一次, 用其变体查询: 应命中自身的描述, 命中其他图片的描述为误命中
+    cache = ImageAnalysisCache(threshold=threshold)
+    for path, value in hashes.items():
+        await cache.set(value, path)
+    total = correct = wrong = 0
+    if Image is not None:
+        for path, data in images.items():
+            for name, img in variants(data):
+                result = await cache.get(image_hash(encode(img)))
+                total += 1
+                if result == path:
+                    correct += 1
+                elif result is not None:
+                    wrong += 1
+                    print(f"  误命中: {os.path.basename(path)} ({name}) -> {os.path.basename(result)}")
+    if total:
+        print(f"变体查询: {total}, 命中: {correct} ({correct / total:.0%}), 误命中: {wrong}")
+    print(f"缓存统计: {cache.stats()}")
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DIR
+    threshold = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    asyncio.run(run(directory, threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import asyncio
+from core.analysis_cache import AnalysisResultCache, analysis_key
+from core.analyzer import LlmAnalyzer
+from core.data_def import AIAnalysisResult, Msg
+
+
+def _msg(content, push_type='new_tweet', medias=None):
+    return Msg(push_type=push_type, title='', content=content, name='a', screen_name='a',
+               medias=medias or [])
+
+
+def test_key_normalizes_text_and_separates_images():
+    key = analysis_key(_msg("Buy $FROG now!! https://t.co/aaa"), "1")
+    assert key == analysis_key(_msg("RT @bot: buy $frog now https://t.co/aaa"), "1")
+    assert key != analysis_key(_msg("Buy $FROG now!! https://t.co/aaa"), "2")
+    assert key != analysis_key(_msg("Buy $FROG now!! https://t.co/bbb"), "1")
+    assert key != analysis_key(_msg("Buy $FROG now!!", push_type='new_description'), "1")
+    with_media = analysis_key(_msg("Buy $FROG now", medias=["https://pbs.twimg.com/media/A.jpg"]), "1")
+    assert with_media != analysis_key(_msg("Buy $FROG now", medias=["https://pbs.twimg.com/media/B.jpg"]), "1")
+    assert analysis_key(_msg(""), "1") is None
+
+
+def test_cache_persists_across_instances(tmp_path):
+    db_path = str(tmp_path / "analysis.db")
+
+    async def run():
+        cache = AnalysisResultCache(db_path=db_path)
+        await cache.set("k", {"speculate_result": [{"token_name": "FROG"}]})
+        restored = AnalysisResultCache(db_path=db_path)
+        assert restored.load() == 1
+        result = await restored.get("k")
+        result["speculate_result"].clear()
+        assert (await restored.get("k"))["speculate_result"] == [{"token_name": "FROG"}]
+        assert await AnalysisResultCache(db_path=db_path).get("k") is not None
+        assert await AnalysisResultCache(db_path=db_path, ttl=0).get("k") is None
+
+    asyncio.run(run())
+
+
+def test_analyzer_reuses_results_for_repeats():
+    analyzer = LlmAnalyzer(api_key="test", base_url="http://127.0.0.1", model="test",
+                           result_cache=AnalysisResultCache())
+    calls = []
+
+    async def analyze(msg, on_tokens=None, image_failures=None):
+        calls.append(msg.content)
+        await asyncio.sleep(0.05)
+        return None if "fail" in msg.content else {"speculate_result": []}
+
+    analyzer._analyze_content = analyze
+
+    async def run():
+        # 同时到达的相同推文只分析一次
+        first = await asyncio.gather(*(analyzer.analyze_content(_msg("gm $FROG")) for _ in range(3)))
+        assert first == [AIAnalysisResult()] * 3
+        assert await analyzer.analyze_content(_msg("GM  $frog")) == AIAnalysisResult()
+        # 失败结果不缓存
+        await analyzer.analyze_content(_msg("fail"))
+        await analyzer.analyze_content(_msg("fail"))
+
+    asyncio.run(run())
+    assert calls == ["gm $FROG", "fail", "fail"]
+
+
+def test_text_only_fallback_after_image_failure_is_not_cached():
+    analyzer = LlmAnalyzer(api_key="test", base_url="http://127.0.0.1", model="test",
+                           result_cache=AnalysisResultCache(), overlap_text_image=False)
+    described = []
+
+    async def resolve(msg):
+        return list(msg.medias)
+
+    async def analyze_images(images, **kwargs):
+        described.append(images)
+        return {"error": "图片编码失败"} if len(described) == 1 else {"status": "success", "analysis": "a frog"}
+
+    async def analyze_text(msg, image_analysis, on_tokens=None):
+        return {"speculate_result": [{"token_name": "FROG"}] if image_analysis else []}
+
+    analyzer.media_resolver.resolve = resolve
+    analyzer.analyze_images = analyze_images
+    analyzer._analyze_text = analyze_text
+    msg = _msg("what is this", medias=["https://pbs.twimg.com/media/A.jpg"])
+
+    async def run():
+        first = await analyzer.analyze_content(msg)
+        second = await analyzer.analyze_content(msg)
+        third = await analyzer.analyze_content(msg)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first.token_names == []
+    assert second.token_names == third.token_names == ["FROG"]
+    # 第一次图片失败的结果没有缓存, 第二次成功的结果被第三次复用
+    assert len(described) == 2
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import re
+from types import SimpleNamespace
+import pytest
+from core.analyzer import LlmAnalyzer
+from core.data_def import Msg
+from utils.micro_batch import MicroBatcher
+
+
+class FakeCompletions:
+    """按推文内容中的 $TICKER 返回结果, drop 中的推文在合并请求中不返回"""
+
+    def __init__(self, drop=(), truncate=False):
+        self.calls = []
+        self.drop = set(drop)
+        self.truncate = truncate
+
+    async def create(self, model, messages, **kwargs):
+        text = messages[1]["content"][0]["text"]
+        blocks = re.findall(r"推文ID: (\d+)\n推文内容：\n(.*)", text)
+        await asyncio.sleep(0.01)
+        if blocks:
+            self.calls.append(len(blocks))
+            content = json.dumps({index: self._result(tweet) for index, tweet in blocks
+                                  if tweet not in self.drop})
+            if self.truncate:
+                # 截断在最后一个代币名称中间
+                content = content[:content.rindex('"}]}') - 1]
+        else:
+            self.calls.append(1)
+            tweet = re.search(r"推文内容：\n(.*)", text).group(1)
+            content = "```json\n" + json.dumps(self._result(tweet)) + "\n```"
+        message = SimpleNamespace(content=content)
+        finish_reason = "length" if blocks and self.truncate else "stop"
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)])
+
+    @staticmethod
+    def _result(tweet):
+        return {"speculate_result": [{"token_name": name} for name in re.findall(r"\$(\w+)", tweet)]}
+
+
+def _analyzer(drop=(), truncate=False, **kwargs):
+    analyzer = LlmAnalyzer(api_key="test", base_url="http://127.0.0.1", model="test", **kwargs)
+    completions = FakeCompletions(drop, truncate)
+    analyzer.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return analyzer, completions
+
+
+def _msg(content):
+    return Msg(push_type='new_tweet', title='', content=content, name='a', screen_name='a')
+
+
+def test_batches_concurrent_tweets_and_fans_out():
+    analyzer, completions = _analyzer(batch_size=4, batch_window=0.05)
+
+    async def run():
+        return await asyncio.gather(*(analyzer.analyze_content(_msg(f"gm ${name}"))
+                                      for name in ["A", "B", "C", "D", "E"]))
+
+    results = asyncio.run(run())
+    assert [result.token_names for result in results] == [["A"], ["B"], ["C"], ["D"], ["E"]]
+    # 凑满4条立即发送, 剩余1条在窗口到期后单独发送
+    assert completions.calls == [4, 1]
+    assert analyzer.text_batcher.stats()["max_batch"] == 4
+
+
+def test_missing_batch_results_are_retried_individually():
+    analyzer, completions = _analyzer(drop=["gm $B"], batch_size=8, batch_window=0.01)
+
+    async def run():
+        return await asyncio.gather(analyzer.analyze_content(_msg("gm $A")),
+                                    analyzer.analyze_content(_msg("gm $B")))
+
+    results = asyncio.run(run())
+    assert [result.token_names for result in results] == [["A"], ["B"]]
+    assert completions.calls == [2, 1]
+
+
+def test_truncated_batch_retries_last_result():
+    analyzer, completions = _analyzer(truncate=True, batch_size=8, batch_window=0.01)
+
+    async def run():
+        return await asyncio.gather(analyzer.analyze_content(_msg("gm $FROG")),
+                                    analyzer.analyze_content(_msg("gm $PEPE")))
+
+    results = asyncio.run(run())
+    # 被截断的 "PEP" 不作为结果, 第二条推文单独重新分析
+    assert [result.token_names for result in results] == [["FROG"], ["PEPE"]]
+    assert completions.calls == [2, 1]
+
+
+def test_batcher_propagates_handler_errors():
+    async def handler(items):
+        raise RuntimeError("rate limited")
+
+    async def run():
+        batcher = MicroBatcher(handler, max_size=2, window=0.01)
+        with pytest.raises(RuntimeError):
+            await batcher.submit(1)
+        assert batcher.stats()["failures"] == 1
+
+    asyncio.run(run())
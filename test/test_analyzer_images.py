@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+from core.analyzer import LlmAnalyzer
+from core.image_cache import ImageAnalysisCache
+from utils.image_fetch import FetchedImage
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, model, messages, max_tokens=None, **kwargs):
+        images = [part for part in messages[0]["content"] if part["type"] == "image_url"]
+        self.calls.append(len(images))
+        await asyncio.sleep(0.01)
+        message = SimpleNamespace(content=f"{len(images)} images")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _analyzer(**kwargs):
+    analyzer = LlmAnalyzer(api_key="test", base_url="http://127.0.0.1", model="test", **kwargs)
+    completions = FakeCompletions()
+    analyzer.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    async def fetch(url):
+        return FetchedImage(url.encode() * 100, "image/png")
+
+    analyzer._encode_image_from_url = fetch
+    return analyzer, completions
+
+
+def test_images_in_single_request():
+    analyzer, completions = _analyzer()
+    result = asyncio.run(analyzer.analyze_images(["a", "b", "c", "a"]))
+    assert result["status"] == "success"
+    assert result["image_count"] == 3
+    assert completions.calls == [3]
+
+
+def test_parallel_calls_and_bytes_budget():
+    analyzer, completions = _analyzer(image_parallel_calls=2, image_total_bytes=250, image_max_count=4)
+    result = asyncio.run(analyzer.analyze_images(["a", "b", "c", "d", "e"]))
+    # 每张图100字节, 预算内只保留前两张, 分两次请求
+    assert result["image_count"] == 2
+    assert sorted(completions.calls) == [1, 1]
+    assert result["analysis"] == "图片1: 1 images\n图片2: 1 images"
+
+
+def test_single_image_results_are_cached():
+    analyzer, completions = _analyzer(image_cache=ImageAnalysisCache(), image_parallel_calls=4)
+
+    async def run():
+        await analyzer.analyze_images(["a", "b"])
+        return await analyzer.analyze_images(["b", "a"])
+
+    result = asyncio.run(run())
+    assert completions.calls == [1, 1]
+    assert result["cached"] is True
@@ -0,0 +1,61 @@
+import asyncio
+from core.analyzer import LlmAnalyzer
+from core.data_def import Msg
+
+
+def _analyzer(text_results, image_delay=0.2):
+    analyzer = LlmAnalyzer(api_key="test", base_url="http://127.0.0.1", model="test", overlap_text_image=True)
+    calls = []
+    results = iter(text_results)
+
+    async def analyze_text(msg, image_analysis, on_tokens=None):
+        calls.append(image_analysis)
+        return next(results)
+
+    async def describe_images(msg, failures=None):
+        await asyncio.sleep(image_delay)
+        calls.append("image")
+        return "a frog wearing a crown"
+
+    analyzer._analyze_text = analyze_text
+    analyzer._describe_tweet_images = describe_images
+    return analyzer, calls
+
+
+def _msg(content):
+    return Msg(push_type='new_tweet', title='', content=content, name='a', screen_name='a',
+               medias=["https://pbs.twimg.com/media/A.jpg"])
+
+
+def test_confident_text_result_skips_image_wait():
+    result = {"speculate_result": [{"token_name": "PEPE"}]}
+    analyzer, calls = _analyzer([result])
+    early = []
+
+    async def run():
+        start = asyncio.get_running_loop().time()
+        value = await analyzer.analyze_content(_msg("launching $PEPE now"), on_tokens=early.extend)
+        return value, asyncio.get_running_loop().time() - start
+
+    value, elapsed = asyncio.run(run())
+    assert value.token_names == ["PEPE"]
+    assert early == ["PEPE"]
+    assert calls == [None]
+    assert elapsed < 0.2
+
+
+def test_reanalyzes_with_image_description():
+    first = {"speculate_result": []}
+    second = {"speculate_result": [{"token_name": "KING"}]}
+    analyzer, calls = _analyzer([first, second], image_delay=0.01)
+    value = asyncio.run(analyzer.analyze_content(_msg("gm https://t.co/abc")))
+    assert value.token_names == ["KING"]
+    assert calls == [None, "image", "a frog wearing a crown"]
+
+
+def test_confident_tokens_need_cashtag_or_whole_word():
+    result = {"speculate_result": [{"token_name": name} for name in ["AI", "ME", "X", "FROG", "KING", "PEPE"]]}
+    text = "AI agents on X are wild, frogs everywhere, $PEPE and the KING is back"
+    # 短名称只认 $ 前缀, 较长的名称需要作为完整单词出现("frogs" 不算 FROG)
+    assert LlmAnalyzer._confident_tokens(result, text) == ["KING", "PEPE"]
+    assert LlmAnalyzer._confident_tokens(result, "buy $ai and $me now") == ["AI", "ME"]
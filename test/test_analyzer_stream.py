@@ -0,0 +1,95 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from core.analyzer import LlmAnalyzer
+from core.data_def import Msg
+from utils.json_stream import JsonFieldStream
+
+REPLY = "```json\n" + json.dumps({"speculate_result": [
+    {"token_name": "FROG", "reason": "推文中 \"token_name\": \"FAKE\" 只是引用", "key_elements": ["frog"]},
+    {"token_name": "KING", "reason": "long " * 50, "key_elements": []},
+]}, ensure_ascii=False).replace("KING", "KI\\u004eG") + "\n```"
+
+
+def test_field_stream_emits_complete_values_once():
+    stream = JsonFieldStream("token_name")
+    emitted = []
+    for i in range(0, len(REPLY), 3):
+        emitted.append(stream.feed(REPLY[i:i + 3]))
+    assert [names for names in emitted if names] == [["FROG"], ["KING"]]
+    assert stream.text == REPLY
+
+
+class FakeStream:
+    def __init__(self, text, events):
+        self.chunks = [text[i:i + 5] for i in range(0, len(text), 5)]
+        self.events = events
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            self.events.append("chunk")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))])
+
+
+def test_stream_reports_token_names_before_completion():
+    events = []
+
+    async def create(stream=False, **kwargs):
+        assert stream
+        return FakeStream(REPLY, events)
+
+    analyzer = LlmAnalyzer(api_key="test", base_url="http://127.0.0.1", model="test", stream=True)
+    analyzer.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    def on_tokens(names):
+        events.append(names)
+
+    msg = Msg(push_type='new_tweet', title='', content='gm', name='a', screen_name='a')
+    result = asyncio.run(analyzer.analyze_content(msg, on_tokens=on_tokens))
+    assert result.token_names == ["FROG", "KING"]
+    assert [event for event in events if event != "chunk"] == [["FROG"], ["KING"]]
+    # 第一个代币名称在回复结束前就已回调
+    assert events.index(["FROG"]) < events.index(["KING"]) < len(events) - 10
+
+
+def test_streamed_names_are_normalized_and_prefetch_is_reused(monkeypatch):
+    import notify.notice as notice
+    from monitor.base import BaseMonitor
+
+    reply = json.dumps({"speculate_result": [
+        {"token_name": "$PEPE", "reason": "cashtag"},
+        {"token_name": "PEPE-USDT", "reason": "pair"},
+        {"token_name": "WIF/SOL", "reason": "pair"},
+    ]})
+
+    async def create(stream=False, **kwargs):
+        return FakeStream(reply, [])
+
+    analyzer = LlmAnalyzer(api_key="test", base_url="http://127.0.0.1", model="test", stream=True)
+    analyzer.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    searched = []
+
+    class Searcher:
+        async def search_token(self, name):
+            searched.append(name)
+            return None
+
+        async def batch_search_tokens(self, names, concurrency=3):
+            raise AssertionError(f"prefetch not reused for {names}")
+
+    monitor = BaseMonitor.__new__(BaseMonitor)
+    monitor.analyzer = analyzer
+    monitor.token_searcher = Searcher()
+    monitor.prefilter = None
+    monitor.trader = None
+    monkeypatch.setattr(notice, "send_warn_action_card", lambda *args, **kwargs: True)
+
+    msg = Msg(push_type='new_tweet', title='', content='gm', name='a', screen_name='a')
+    result = asyncio.run(monitor._analyze_message(msg))
+    assert result.token_names == ["PEPE", "WIF"]
+    # 流式回调的名称与最终结果一致, 每个代币只搜索一次
+    assert searched == ["PEPE", "WIF"]
@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+from core.analyzer import LlmAnalyzer
+from core.data_def import AIAnalysisResult, Msg
+from utils.metrics import LatencyTracker
+
+
+def _analyzer(reply, delay=0.0):
+    analyzer = LlmAnalyzer(api_key="test", base_url="http://127.0.0.1", model="vision",
+                           triage_model="small", triage_timeout=0.1)
+    requests = []
+
+    async def create(model, messages, max_tokens=None, **kwargs):
+        requests.append((model, max_tokens))
+        await asyncio.sleep(delay)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+    analyzer.triage_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    full = []
+
+    async def analyze_text(msg, image_analysis, on_tokens=None):
+        full.append(msg.content)
+        return {"speculate_result": [{"token_name": "FROG"}]}
+
+    async def describe_images(msg, failures=None):
+        return None
+
+    analyzer._analyze_text = analyze_text
+    analyzer._describe_tweet_images = describe_images
+    return analyzer, requests, full
+
+
+def _msg(content):
+    return Msg(push_type='new_tweet', title='', content=content, name='a', screen_name='a')
+
+
+def test_only_relevant_tweets_escalate():
+    analyzer, requests, full = _analyzer("12")
+    assert asyncio.run(analyzer.analyze_content(_msg("good morning"))) == AIAnalysisResult()
+    assert requests == [("small", 4)] and full == []
+
+    analyzer, requests, full = _analyzer("85")
+    result = asyncio.run(analyzer.analyze_content(_msg("$FROG launching")))
+    assert result.token_names == ["FROG"]
+    assert full == ["$FROG launching"]
+    stats = analyzer.stats()
+    assert stats["triage"]["passed"] == 1
+    assert stats["latency"]["triage"]["count"] == 1
+
+
+def test_triage_failures_fall_back_to_full_analysis():
+    for reply, delay in (("n/a", 0.0), ("10", 0.5)):
+        analyzer, _, full = _analyzer(reply, delay)
+        asyncio.run(analyzer.analyze_content(_msg("hmm")))
+        assert full == ["hmm"]
+        assert analyzer.stats()["triage"]["errors"] == 1
+
+
+def test_latency_percentiles():
+    tracker = LatencyTracker(window=100)
+    for ms in range(1, 101):
+        tracker.record(ms / 1000)
+    assert tracker.percentile(50) == 0.05
+    assert tracker.percentile(95) == 0.095
+    try:
+        with tracker.measure():
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert tracker.stats()["errors"] == 1
+    assert tracker.stats()["max_ms"] == 100.0
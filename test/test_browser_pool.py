@@ -0,0 +1,138 @@
+import asyncio
+import pytest
+import playwright.async_api
+import utils.browser_pool as browser_pool
+from utils.browser_pool import BrowserPool
+
+
+class FakeContext:
+    async def new_page(self):
+        return object()
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self, fail_pages=False):
+        self.fail_pages = fail_pages
+        self.closed = False
+
+    def on(self, event, handler):
+        pass
+
+    async def new_context(self, **kwargs):
+        if self.fail_pages:
+            raise RuntimeError("new_context failed")
+        return FakeContext()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePlaywright:
+    """模拟 async_playwright().start() 返回的对象, 记录启动/停止次数"""
+
+    def __init__(self, launches):
+        self.launches = launches
+        self.stopped = False
+        self.chromium = self
+
+    async def launch(self, **kwargs):
+        result = self.launches.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def playwrights(monkeypatch):
+    """按顺序返回 FakePlaywright, 每个实例的 launch 结果由测试指定"""
+    started = []
+    launches = []
+
+    class Starter:
+        async def start(self):
+            started.append(FakePlaywright(launches))
+            return started[-1]
+
+    monkeypatch.setattr(playwright.async_api, "async_playwright", Starter)
+    monkeypatch.setattr(browser_pool, "_install_checked", True)
+    return started, launches
+
+
+def test_launch_failure_stops_playwright(playwrights, monkeypatch):
+    started, launches = playwrights
+
+    async def install():
+        pass
+
+    monkeypatch.setattr(browser_pool, "_install_checked", False)
+    monkeypatch.setattr(browser_pool, "install_chromium", install)
+    # 安装后重试仍失败
+    launches.extend([RuntimeError("no chromium"), RuntimeError("still no chromium")])
+    pool = BrowserPool(size=1)
+    with pytest.raises(RuntimeError):
+        asyncio.run(pool.start())
+    assert started[-1].stopped
+    assert not pool.started
+
+    # 浏览器已启动但创建页面失败, 浏览器和 Playwright 都要关闭
+    browser = FakeBrowser(fail_pages=True)
+    launches.append(browser)
+    with pytest.raises(RuntimeError):
+        asyncio.run(pool.start())
+    assert browser.closed
+    assert started[-1].stopped
+    assert not pool.started
+
+
+def test_restart_wakes_waiters_on_old_queue(playwrights):
+    started, launches = playwrights
+    launches.extend([FakeBrowser(), FakeBrowser()])
+
+    async def run():
+        pool = BrowserPool(size=1, lease_timeout=5)
+        await pool.start()
+        got = []
+
+        async def waiter():
+            async with pool.page() as page:
+                got.append(page)
+
+        async with pool.page():
+            waiters = [asyncio.create_task(waiter()) for _ in range(2)]
+            await asyncio.sleep(0)
+            # 借出期间浏览器崩溃, 由下一次借用触发重启
+            pool._crashed = True
+            async with pool.page(timeout=1):
+                pass
+        await asyncio.wait_for(asyncio.gather(*waiters), 1)
+        await pool.close()
+        return pool, got
+
+    pool, got = asyncio.run(run())
+    assert pool.restarts == 1
+    assert len(got) == 2
+    assert pool.lease_timeouts == 0
+
+
+def test_close_fails_waiters(playwrights):
+    started, launches = playwrights
+    launches.append(FakeBrowser())
+
+    async def run():
+        pool = BrowserPool(size=1)
+        await pool.start()
+        async with pool.page():
+            waiter = asyncio.create_task(pool.page().__aenter__())
+            await asyncio.sleep(0)
+            await pool.close()
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(waiter, 1)
+        assert not pool.started
+
+    asyncio.run(run())
@@ -0,0 +1,72 @@
+import json
+import os
+import pytest
+from core.data_def import decode_push
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "push_samples.jsonl")
+
+
+def _samples():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [line for line in f if line.strip()]
+
+
+def test_decode_corpus_to_msg():
+    for raw in _samples():
+        data = json.loads(raw)
+        msg = decode_push(raw).to_msg()
+        assert msg.push_type == data["push_type"]
+        assert msg.content == data["content"]
+        assert msg.screen_name == data["user"]["screen_name"]
+        assert msg.name == data["user"]["name"]
+
+
+def test_nested_objects_are_lazy():
+    record = decode_push(_samples()[0])
+    assert record._user is None and record._tweet is None
+    assert record.tweet.tweet_id == "1902564961307488532"
+    assert record._user is None
+    assert record.user.screen_name == "elonmusk"
+
+
+def test_tolerates_unknown_and_missing_fields():
+    raw = json.dumps({
+        "push_type": "new_tweet",
+        "content": "gm",
+        "user": {"screen_name": "someone", "unknown_field": 1},
+        "tweet": {"tweet_id": "1", "lang": "en"},
+    })
+    record = decode_push(raw)
+    assert record.title == ""
+    assert record.user.followers_count == 0
+    push_msg = record.to_push_msg()
+    assert push_msg.user.screen_name == "someone"
+    assert push_msg.user.followers_count is None
+    assert push_msg.tweet.tweet_id == "1"
+
+
+def test_description_push_has_no_tweet():
+    raw = json.dumps({"push_type": "new_description", "user": {}, "tweet": {"tweet_id": "1"}})
+    assert decode_push(raw).tweet is None
+
+
+@pytest.mark.parametrize("raw", ["[]", "{}", '{"user": "x"}'])
+def test_rejects_invalid_payload(raw):
+    with pytest.raises(ValueError):
+        decode_push(raw)
+
+
+def test_msg_carries_payload_media():
+    msg = decode_push(_samples()[0]).to_msg()
+    assert msg.medias == ["https://pbs.twimg.com/ext_tw_video_thumb/1902520094779179008/pu/img/GAxFkN4qowT1vGA_.jpg"]
+    assert msg.urls == []
+
+    raw = json.dumps({
+        "push_type": "new_tweet",
+        "user": {"screen_name": "someone"},
+        "tweet": {"tweet_id": "1", "medias": None,
+                  "urls": [{"expanded_url": "https://example.com/a"}, "https://example.com/b", None]},
+    })
+    msg = decode_push(raw).to_msg()
+    assert msg.medias == []
+    assert msg.urls == ["https://example.com/a", "https://example.com/b"]
@@ -0,0 +1,120 @@
+import asyncio
+from core.data_def import Msg
+from core.dedup import MessageDeduplicator, SharedClaimStore, message_keys, normalize_content
+from utils.ttl_cache import TTLCache
+
+
+def _msg(content, tweet_id='', screen_name='user'):
+    return Msg(push_type='new_tweet', title='', content=content, name=screen_name,
+               screen_name=screen_name, tweet_id=tweet_id)
+
+
+def test_normalize_strips_links_and_retweet_prefix():
+    a = normalize_content("RT @elonmusk: The Return of the King https://t.co/AAAA")
+    b = normalize_content("the return  of the KING https://t.co/BBBB")
+    assert a == b == "the return of the king"
+
+
+def test_duplicate_by_tweet_id_and_content():
+    dedup = MessageDeduplicator()
+    assert dedup.check(_msg("first launch of $FOO today", tweet_id="1")) is None
+    assert dedup.check(_msg("something else entirely", tweet_id="1")) == "tweet_id"
+    assert dedup.check(_msg("First launch of $FOO today https://t.co/x", tweet_id="2",
+                            screen_name="other")) == "content"
+    assert dedup.check(_msg("gm", tweet_id="3")) is None
+    assert dedup.check(_msg("gm", tweet_id="4")) is None
+    assert dedup.stats()["hits"] == 2
+
+
+def test_ttl_cache_expiry_and_capacity():
+    now = [0.0]
+    cache = TTLCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    assert cache.add("a")
+    assert not cache.add("a")
+    cache.set("b")
+    cache.set("c")
+    assert "a" not in cache and cache.evictions == 1
+    now[0] = 11
+    assert cache.get("b") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_shared_claims_contention_and_expiry(tmp_path, monkeypatch):
+    from core import dedup as module
+    now = [1000.0]
+    monkeypatch.setattr(module, "time", type("FakeTime", (), {"time": staticmethod(lambda: now[0])}))
+    path = str(tmp_path / "claims.db")
+    a = SharedClaimStore(path, ttl=100, lease=10)
+    b = SharedClaimStore(path, ttl=100, lease=10)
+
+    async def run():
+        msg = _msg("first launch of $FOO today", tweet_id="1")
+        assert await a.claim(["k1", "k2"], "rec-1")
+        # 其他 owner 在租约内认领任一键失败, 同一 owner(WAL重放)可以重新认领
+        assert not await b.claim(["k2", "k3"], "rec-2")
+        assert await b.claim(["k1"], "rec-1")
+        # 租约到期后其他进程可以认领
+        now[0] += 11
+        assert await b.claim(["k1", "k2"], "rec-2")
+        # 处理完成后认领延长到 ttl
+        await b.confirm(["k1", "k2"], "rec-2")
+        now[0] += 50
+        assert not await a.claim(["k1"], "rec-3")
+        now[0] += 51
+        assert await a.claim(["k1"], "rec-3")
+        # 处理失败释放认领后其他进程立即可以认领
+        msg.msg_id = "rec-4"
+        assert await a.claim_message(msg)
+        assert not await b.claim([key for _, key in message_keys(msg)], "rec-5")
+        await a.release_message(msg)
+        assert await b.claim([key for _, key in message_keys(msg)], "rec-5")
+
+    asyncio.run(run())
+    assert a.stats()["conflicts"] == 1 and b.stats()["conflicts"] == 2
+
+
+def test_process_message_forgets_unprocessed_message():
+    from monitor.base import BaseMonitor
+
+    class FakeClaims:
+        def __init__(self):
+            self.won = False
+            self.settled = []
+
+        async def claim_message(self, msg):
+            return self.won
+
+        async def confirm_message(self, msg):
+            self.settled.append("confirm")
+
+        async def release_message(self, msg):
+            self.settled.append("release")
+
+    results = [{"error": "llm failed"}, {"speculate_result": []}]
+    analyzed = []
+
+    async def analyze(msg):
+        analyzed.append(msg.tweet_id)
+        return results.pop(0)
+
+    monitor = BaseMonitor.__new__(BaseMonitor)
+    monitor.deduplicator = MessageDeduplicator()
+    monitor.claims = FakeClaims()
+    monitor.wal = None
+    monitor._analyze_message = analyze
+    msg = _msg("first launch of $FOO today", tweet_id="1")
+
+    async def run():
+        # 其他进程认领中, 本地不记录, 之后可以重试
+        assert await monitor.process_message(msg) is None
+        monitor.claims.won = True
+        # 分析失败释放认领, 本地记录同样撤销
+        await monitor.process_message(msg)
+        await monitor.process_message(msg)
+        # 成功处理后才真正去重
+        assert await monitor.process_message(msg) is None
+
+    asyncio.run(run())
+    assert analyzed == ["1", "1"]
+    assert monitor.claims.settled == ["release", "confirm"]
+    assert monitor.deduplicator.stats()["hits"] == 1
@@ -0,0 +1,79 @@
+import asyncio
+import time
+from notify.dispatcher import NoticeDispatcher, TokenBucket
+
+
+def test_token_bucket_waits_instead_of_refusing():
+    now = [0.0]
+    bucket = TokenBucket(rate_per_minute=60, capacity=2, clock=lambda: now[0])
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 1.0
+    now[0] = 0.5
+    assert bucket.try_acquire() == 0.5
+    now[0] = 1.0
+    assert bucket.try_acquire() == 0
+
+
+def test_burst_above_capacity_is_delayed_not_dropped():
+    sent = []
+
+    async def run():
+        dispatcher = NoticeDispatcher(rate_per_minute=600)
+        # 桶容量2, 每秒补充10个令牌: 后3条各需等待约0.1秒
+        dispatcher.bucket = TokenBucket(rate_per_minute=600, capacity=2)
+        await dispatcher.start()
+        started = time.monotonic()
+        assert all(dispatcher.submit(sent.append, i) for i in range(5))
+        while len(sent) < 5:
+            await asyncio.sleep(0.01)
+        elapsed = time.monotonic() - started
+        await dispatcher.stop()
+        return elapsed, dispatcher.stats()
+
+    elapsed, stats = asyncio.run(run())
+    assert sorted(sent) == [0, 1, 2, 3, 4]
+    assert elapsed >= 0.25
+    assert stats["sent"] == 5 and stats["dropped"] == 0
+
+
+def test_stop_drains_pending_sends():
+    sent = []
+
+    def slow_send(i):
+        time.sleep(0.05)
+        sent.append(i)
+
+    async def run():
+        dispatcher = NoticeDispatcher(rate_per_minute=600)
+        dispatcher.bucket = TokenBucket(rate_per_minute=600, capacity=1)
+        await dispatcher.start()
+        for i in range(3):
+            dispatcher.submit(slow_send, i)
+        # 立即停止, 排队中和线程池中正在发送的通知都应完成
+        await dispatcher.stop()
+        return dispatcher.stats()
+
+    stats = asyncio.run(run())
+    assert sorted(sent) == [0, 1, 2]
+    assert stats["sent"] == 3 and stats["pending"] == 0 and stats["inflight"] == 0
+
+
+def test_action_card_jumps_full_notice_backlog():
+    sent = []
+
+    async def run():
+        dispatcher = NoticeDispatcher(rate_per_minute=600, max_queue=3)
+        dispatcher.bucket = TokenBucket(rate_per_minute=600, capacity=1)
+        await dispatcher.start()
+        for i in range(3):
+            assert dispatcher.submit(sent.append, i)
+        # 普通通知已满, 新的普通通知被丢弃, 交易提醒仍然入队并最先发送
+        assert not dispatcher.submit(sent.append, 3)
+        assert dispatcher.submit(sent.append, "card", urgent=True)
+        await dispatcher.stop()
+        return dispatcher.stats()
+
+    stats = asyncio.run(run())
+    assert sent == ["card", 0, 1, 2]
+    assert stats["dropped"] == 1 and stats["sent"] == 4
@@ -0,0 +1,51 @@
+import asyncio
+import io
+import pytest
+from core.image_cache import ImageAnalysisCache, hamming_distance, image_hash
+
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+
+def _image(box=(100, 60, 300, 240), size=(400, 300), fmt="PNG", quality=90):
+    img = Image.new("RGB", (400, 300), "white")
+    draw = ImageDraw.Draw(img)
+    for x in range(0, 400, 4):
+        draw.line([(x, 0), (x, 300)], fill=(x * 255 // 400, 80, 160))
+    draw.ellipse(box, fill="black")
+    img = img.resize(size)
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, quality=quality)
+    return buffer.getvalue()
+
+
+def test_near_duplicate_images_share_hash():
+    original = image_hash(_image())
+    reposted = image_hash(_image(size=(200, 150), fmt="JPEG", quality=50))
+    different = image_hash(_image(box=(10, 10, 120, 290)))
+    assert hamming_distance(original, reposted) <= 6
+    assert hamming_distance(original, different) > 6
+
+
+def test_cache_hits_near_images_and_persists(tmp_path):
+    db_path = str(tmp_path / "images.db")
+
+    async def run():
+        cache = ImageAnalysisCache(threshold=6, db_path=db_path)
+        original = image_hash(_image())
+        assert await cache.get(original, "describe") is None
+        await cache.set(original, "a black circle", "describe")
+        assert await cache.get(image_hash(_image(size=(200, 150), fmt="JPEG", quality=50)), "describe") == "a black circle"
+        # 不同的提示词不复用
+        assert await cache.get(original, "other prompt") is None
+        assert await cache.get(image_hash(_image(box=(10, 10, 120, 290))), "describe") is None
+        stats = cache.stats()
+        assert (stats["near_hits"], stats["misses"]) == (1, 3)
+
+        # 新实例(重启或其他进程)从SQLite读取
+        restarted = ImageAnalysisCache(db_path=db_path)
+        assert await restarted.get(original, "describe") == "a black circle"
+        assert restarted.stats()["disk_hits"] == 1
+        assert ImageAnalysisCache(db_path=db_path).load() == 1
+
+    asyncio.run(run())
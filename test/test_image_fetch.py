@@ -0,0 +1,66 @@
+import asyncio
+import io
+import pytest
+from aiohttp import web
+from utils.image_fetch import FetchedImage, ImageTooLarge, fetch_image, shrink_image, sniff_content_type
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png(size, mode="RGB"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def _serve(body: bytes, content_type: str):
+    async def handler(request):
+        response = web.StreamResponse(headers={"Content-Type": content_type})
+        await response.prepare(request)
+        # 分块发送, 不带 Content-Length
+        for i in range(0, len(body), 1024):
+            await response.write(body[i:i + 1024])
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/img", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/img"
+
+
+def test_fetch_uses_sniffed_type_and_enforces_cap():
+    body = _png((64, 64))
+
+    async def run():
+        runner, url = await _serve(body, "application/octet-stream")
+        try:
+            image = await fetch_image(url)
+            assert image.data == body
+            assert image.content_type == "image/png"
+            with pytest.raises(ImageTooLarge):
+                await fetch_image(url, max_bytes=len(body) - 1)
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_shrink_downscales_large_images():
+    big = FetchedImage(_png((3000, 1500)), "image/png")
+    small = shrink_image(big, max_dimension=1024, quality=80)
+    assert small.content_type == "image/jpeg"
+    with Image.open(io.BytesIO(small.data)) as img:
+        assert img.size == (1024, 512)
+
+    transparent = FetchedImage(_png((2000, 2000), mode="RGBA"), "image/png")
+    assert shrink_image(transparent, max_dimension=500).content_type == "image/png"
+
+    # 小图不做处理
+    tiny = FetchedImage(_png((10, 10)), "image/png")
+    assert shrink_image(tiny) is tiny
+    assert sniff_content_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
@@ -0,0 +1,132 @@
+import asyncio
+from monitor.ingest_queue import IngestQueue
+
+
+def test_reject_when_full():
+    async def run():
+        gate = asyncio.Event()
+        handled = []
+
+        async def handler(item):
+            await gate.wait()
+            handled.append(item)
+
+        queue = IngestQueue(handler, workers=1, maxsize=2, policy="reject")
+        await queue.start()
+        # 第一条被 worker 取走并阻塞, 后两条占满队列
+        assert queue.put_nowait(1)
+        await asyncio.sleep(0)
+        assert queue.put_nowait(2)
+        assert queue.put_nowait(3)
+        assert not queue.put_nowait(4)
+        assert queue.stats()["rejected"] == 1
+
+        gate.set()
+        await queue.stop()
+        assert handled == [1, 2, 3]
+
+    asyncio.run(run())
+
+
+def test_drop_oldest_when_full():
+    async def run():
+        gate = asyncio.Event()
+        handled = []
+
+        async def handler(item):
+            await gate.wait()
+            handled.append(item)
+
+        queue = IngestQueue(handler, workers=1, maxsize=2, policy="drop_oldest")
+        await queue.start()
+        queue.put_nowait(1)
+        await asyncio.sleep(0)
+        for i in (2, 3, 4):
+            assert queue.put_nowait(i)
+        assert queue.stats()["dropped"] == 1
+
+        gate.set()
+        await queue.stop()
+        assert handled == [1, 3, 4]
+
+    asyncio.run(run())
+
+
+def test_reject_before_start():
+    async def handler(item):
+        pass
+
+    queue = IngestQueue(handler)
+    assert not queue.put_nowait(1)
+
+
+def test_priority_order_and_drop_lowest():
+    async def run():
+        gate = asyncio.Event()
+        handled = []
+        dropped = []
+
+        async def handler(item):
+            await gate.wait()
+            handled.append(item)
+
+        queue = IngestQueue(handler, workers=1, maxsize=3, policy="drop_oldest",
+                            priority_fn=lambda item: item, on_drop=dropped.append)
+        await queue.start()
+        queue.put_nowait(0)
+        await asyncio.sleep(0)
+        for score in (1, 5, 3, 4):
+            queue.put_nowait(score)
+
+        gate.set()
+        await queue.stop()
+        assert dropped == [1]
+        assert handled == [0, 5, 4, 3]
+
+    asyncio.run(run())
+
+
+def test_priority_drop_keeps_queue_when_incoming_is_lowest():
+    async def run():
+        gate = asyncio.Event()
+        handled = []
+        dropped = []
+
+        async def handler(item):
+            await gate.wait()
+            handled.append(item)
+
+        queue = IngestQueue(handler, workers=1, maxsize=2, policy="drop_oldest",
+                            priority_fn=lambda item: item, on_drop=dropped.append)
+        await queue.start()
+        queue.put_nowait(0)
+        await asyncio.sleep(0)
+        assert queue.put_nowait(5)
+        assert queue.put_nowait(3)
+        # 新消息优先级比排队中的都低, 丢弃新消息而不是排队中的消息
+        assert not queue.put_nowait(1)
+        assert queue.stats()["dropped"] == 1
+
+        gate.set()
+        await queue.stop()
+        assert dropped == []
+        assert handled == [0, 5, 3]
+
+    asyncio.run(run())
+
+
+def test_priority_aging_prevents_starvation(monkeypatch):
+    from monitor import ingest_queue as module
+
+    now = [0.0]
+    monkeypatch.setattr(module, "time", type("FakeTime", (), {"monotonic": staticmethod(lambda: now[0])}))
+
+    async def handler(item):
+        pass
+
+    queue = IngestQueue(handler, priority_fn=lambda item: item[1], aging_per_second=1.0)
+    # 低优先级消息等待10秒后, 优先级高于刚到的中等优先级消息
+    entry_low = queue._entry(("low", 1))
+    now[0] = 10.0
+    entry_mid = queue._entry(("mid", 5))
+    assert entry_low < entry_mid
@@ -0,0 +1,104 @@
+import asyncio
+from aiohttp import web
+from core.analyzer import LlmAnalyzer
+from core.data_def import AIAnalysisResult, Msg
+from utils.json_repair import loads_lenient
+
+
+def test_tolerates_fences_trailing_commas_and_truncation():
+    assert loads_lenient('```json\n{"a": [1, 2,], "b": {"c": "}",},}\n```') == {"a": [1, 2], "b": {"c": "}"}}
+    assert loads_lenient('结果如下: {"a": 1} 以上') == {"a": 1}
+    truncated = '{"speculate_result": [{"token_name": "FROG", "reason": "cut he'
+    assert loads_lenient(truncated) == {"speculate_result": [{"token_name": "FROG"}]}
+    truncated = '```json\n{"speculate_result": [{"token_name": "FROG"}, {"token_name": "KING", "reas'
+    assert loads_lenient(truncated) == {"speculate_result": [{"token_name": "FROG"}, {"token_name": "KING"}]}
+    assert loads_lenient('{"speculate_result": [{"token_name": ') == {"speculate_result": [{}]}
+    assert loads_lenient("没有发现代币") is None
+
+
+def test_truncated_token_name_is_dropped():
+    # 被截断的代币名称不能当作完整名称去搜索和交易
+    single = '{"speculate_result": [{"token_name": "FROG", "reason": "x"}, {"token_name": "PEP'
+    assert loads_lenient(single) == {"speculate_result": [{"token_name": "FROG", "reason": "x"}, {}]}
+    assert AIAnalysisResult.from_dict(loads_lenient(single)).token_names == ["FROG"]
+    batch = ('{"1": {"speculate_result": [{"token_name": "FROG"}]}, '
+             '"2": {"speculate_result": [{"token_name": "PEP')
+    assert loads_lenient(batch) == {"1": {"speculate_result": [{"token_name": "FROG"}]},
+                                    "2": {"speculate_result": [{}]}}
+    assert AIAnalysisResult.from_dict(loads_lenient(batch)["2"]).token_names == []
+    assert loads_lenient('{"speculate_result": ["FROG", "PEP') == {"speculate_result": ["FROG"]}
+
+
+def test_result_from_loose_dict():
+    result = AIAnalysisResult.from_dict({"speculate_result": [
+        {"token_name": "$FROG", "reason": "x", "key_elements": "frog"},
+        {"token_name": "frog"},
+        "KING-USDT",
+        {"reason": "no name"},
+        None,
+    ]})
+    assert result.token_names == ["FROG", "KING"]
+    assert result.speculate_result[0].key_elements == ["frog"]
+    assert AIAnalysisResult.from_dict(result.to_dict()) == result
+    assert AIAnalysisResult.from_dict({}) == AIAnalysisResult()
+
+
+def test_json_mode_falls_back_when_unsupported():
+    requests = []
+
+    async def handler(request):
+        body = await request.json()
+        requests.append("response_format" in body)
+        if "response_format" in body:
+            return web.json_response({"error": {"message": "response_format is not supported"}}, status=400)
+        content = '```json\n{"speculate_result": [{"token_name": "FROG", "reason": "trunc'
+        return web.json_response({
+            "id": "x", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "length",
+                         "message": {"role": "assistant", "content": content}}],
+        })
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            analyzer = LlmAnalyzer(api_key="test", base_url=f"http://127.0.0.1:{port}/v1", model="m")
+            msg = Msg(push_type='new_tweet', title='', content='gm $FROG', name='a', screen_name='a')
+            first = await analyzer.analyze_content(msg)
+            second = await analyzer.analyze_content(Msg(push_type='new_tweet', title='', content='gm $FROG again',
+                                                        name='a', screen_name='a'))
+            return analyzer, first, second
+        finally:
+            await runner.cleanup()
+
+    analyzer, first, second = asyncio.run(run())
+    assert first.token_names == ["FROG"] and second.token_names == ["FROG"]
+    assert analyzer.json_mode is False
+    assert requests == [True, False, False]
+
+
+def test_json_mode_kept_on_unrelated_bad_request():
+    import httpx
+    from types import SimpleNamespace
+    from openai import BadRequestError
+
+    calls = []
+
+    async def create(**kwargs):
+        calls.append("response_format" in kwargs)
+        response = httpx.Response(400, request=httpx.Request("POST", "http://127.0.0.1/v1/chat/completions"))
+        raise BadRequestError("This model's maximum context length is 8192 tokens", response=response,
+                              body={"message": "maximum context length exceeded"})
+
+    analyzer = LlmAnalyzer(api_key="test", base_url="http://127.0.0.1", model="m")
+    analyzer.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    msg = Msg(push_type='new_tweet', title='', content='gm $FROG', name='a', screen_name='a')
+    assert asyncio.run(analyzer.analyze_content(msg)) is None
+    # 与输出模式无关的参数错误不重试, 也不关闭 json_mode
+    assert calls == [True]
+    assert analyzer.json_mode is True
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import time
+import pytest
+from aiohttp import web
+from openai import BadRequestError
+from core.llm_client import HedgedLlmClient, LlmEndpoint, parse_endpoints
+
+
+async def _serve(name, delay=0.0, status=200):
+    """模拟 OpenAI 兼容的 chat.completions 接口"""
+    state = {"calls": 0, "delay": delay, "status": status}
+
+    async def handler(request):
+        state["calls"] += 1
+        body = await request.json()
+        await asyncio.sleep(state["delay"])
+        if state["status"] != 200:
+            return web.json_response({"error": {"message": "boom"}}, status=state["status"])
+        if body.get("stream"):
+            chunk = {"id": "x", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                     "choices": [{"index": 0, "delta": {"content": name}, "finish_reason": None}]}
+            return web.Response(text=f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n",
+                                content_type="text/event-stream")
+        return web.json_response({
+            "id": "x", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": f"{name}:{body['model']}"}}],
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, LlmEndpoint(base_url=f"http://127.0.0.1:{port}/v1", api_key="test", name=name), state
+
+
+async def _ask(client):
+    response = await client.chat.completions.create(model="m", messages=[{"role": "user", "content": "hi"}])
+    return response.choices[0].message.content
+
+
+def test_hedges_slow_primary_and_takes_first_answer():
+    async def run():
+        slow_runner, slow, _ = await _serve("slow", delay=1.0)
+        fast_runner, fast, fast_state = await _serve("fast")
+        fast.model = "other"
+        try:
+            client = HedgedLlmClient([slow, fast], hedge_delay=0.1)
+            start = time.monotonic()
+            assert await _ask(client) == "fast:other"
+            assert time.monotonic() - start < 0.8
+            stats = client.stats()
+            assert stats["hedges"] == 1
+            assert stats["endpoints"]["fast"]["wins"] == 1
+            assert fast_state["calls"] == 1
+        finally:
+            await slow_runner.cleanup()
+            await fast_runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_fails_over_and_ejects_unhealthy_endpoint():
+    async def run():
+        bad_runner, bad, bad_state = await _serve("bad", status=500)
+        good_runner, good, _ = await _serve("good")
+        try:
+            client = HedgedLlmClient([bad, good], hedge_delay=5.0, eject_after=2, eject_seconds=60)
+            for _ in range(3):
+                assert await _ask(client) == "good:m"
+            # 连续失败2次后不再请求
+            assert bad_state["calls"] == 2
+            assert client.stats()["endpoints"]["bad"]["ejected"] is True
+            assert client.stats()["failovers"] == 2
+        finally:
+            await bad_runner.cleanup()
+            await good_runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_client_errors_are_raised_without_failover():
+    async def run():
+        bad_runner, bad, _ = await _serve("bad", status=400)
+        good_runner, good, good_state = await _serve("good")
+        try:
+            client = HedgedLlmClient([bad, good], hedge_delay=5.0, eject_after=1)
+            for _ in range(2):
+                with pytest.raises(BadRequestError):
+                    await _ask(client)
+            # 请求本身的错误不改发其他服务, 也不暂停该服务
+            assert good_state["calls"] == 0
+            assert client.stats()["failovers"] == 0
+            assert client.stats()["endpoints"]["bad"]["ejected"] is False
+        finally:
+            await bad_runner.cleanup()
+            await good_runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_stream_latency_is_tracked_separately():
+    async def run():
+        runner, endpoint, _ = await _serve("only")
+        try:
+            client = HedgedLlmClient([endpoint])
+            assert await _ask(client) == "only:m"
+            stream = await client.chat.completions.create(
+                model="m", messages=[{"role": "user", "content": "hi"}], stream=True)
+            assert [chunk.choices[0].delta.content async for chunk in stream] == ["only"]
+            stats = client.stats()["endpoints"]["only"]
+            assert stats["count"] == 1 and stats["stream"]["count"] == 1
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_parse_endpoints():
+    assert parse_endpoints("") == []
+    endpoints = parse_endpoints('[{"base_url": "http://a/v1", "api_key": "k", "model": "m2"}]')
+    assert endpoints == [LlmEndpoint(base_url="http://a/v1", api_key="k", model="m2")]
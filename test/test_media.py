@@ -0,0 +1,72 @@
+import asyncio
+from core.data_def import Msg
+from core.data_def import decode_push
+from core.media import MediaResolver, payload_images
+from core.processor import TwitterLinkProcessor
+
+
+def _msg(content, medias=(), urls=(), media_type=''):
+    return Msg(push_type='new_tweet', title='', content=content, name='a', screen_name='a',
+               medias=list(medias), urls=list(urls), media_type=media_type)
+
+
+def test_payload_media_skips_scraping(monkeypatch):
+    async def fail(text):
+        raise AssertionError("should not scrape")
+
+    monkeypatch.setattr(TwitterLinkProcessor, "extract_image_urls", staticmethod(fail))
+    resolver = MediaResolver()
+    msg = _msg("look https://t.co/abc", medias=["https://pbs.twimg.com/media/A.jpg"],
+               urls=["https://pbs.twimg.com/media/A.jpg", "https://example.com/b.png", "https://example.com/page"])
+    images = asyncio.run(resolver.resolve(msg))
+    assert images == ["https://pbs.twimg.com/media/A.jpg", "https://example.com/b.png"]
+    assert resolver.stats()["from_payload"] == 1
+
+
+def test_falls_back_to_short_link(monkeypatch):
+    calls = []
+
+    async def scrape(text):
+        calls.append(text)
+        return ["https://pbs.twimg.com/media/B.jpg"]
+
+    monkeypatch.setattr(TwitterLinkProcessor, "extract_image_urls", staticmethod(scrape))
+    resolver = MediaResolver()
+    assert asyncio.run(resolver.resolve(_msg("gm"))) == []
+    assert asyncio.run(resolver.resolve(_msg("look https://t.co/abc"))) == ["https://pbs.twimg.com/media/B.jpg"]
+    assert len(calls) == 1
+    assert resolver.stats() == {"from_payload": 0, "from_scrape": 1, "no_media": 1}
+
+
+def test_payload_images_skip_video_and_gif():
+    medias = [
+        "https://pbs.twimg.com/media/A.jpg",
+        "https://pbs.twimg.com/media/B?format=png&name=large",
+        "https://pbs.twimg.com/ext_tw_video_thumb/1/pu/img/C.jpg",
+        "https://pbs.twimg.com/tweet_video_thumb/D.jpg",
+        "https://video.twimg.com/ext_tw_video/1/pu/vid/720x1280/E.mp4",
+        "https://video.twimg.com/tweet_video/F.mp4",
+    ]
+    urls = ["https://example.com/G.png", "https://example.com/clip.mp4"]
+    assert payload_images(_msg("look", medias, urls)) == [
+        "https://pbs.twimg.com/media/A.jpg",
+        "https://pbs.twimg.com/media/B?format=png&name=large",
+        "https://example.com/G.png",
+    ]
+    # 推文媒体类型不是图片时只使用链接中的图片
+    assert payload_images(_msg("look", medias, urls, media_type="video")) == ["https://example.com/G.png"]
+
+
+def test_push_media_objects_keep_photos_only():
+    push = decode_push({
+        "push_type": "new_tweet", "title": "", "content": "look",
+        "user": {"name": "a", "screen_name": "a"},
+        "tweet": {"tweet_id": "1", "media_type": "photo", "medias": [
+            {"type": "photo", "media_url_https": "https://pbs.twimg.com/media/A.jpg"},
+            {"type": "video", "media_url_https": "https://pbs.twimg.com/media/B.jpg"},
+            {"type": "animated_gif", "media_url_https": "https://pbs.twimg.com/media/C.jpg"},
+        ]},
+    })
+    msg = push.to_msg()
+    assert msg.media_type == "photo"
+    assert payload_images(msg) == ["https://pbs.twimg.com/media/A.jpg"]
@@ -0,0 +1,48 @@
+import json
+from core.message_template import MessageTemplate, TemplateRegistry, source_url
+
+KBOT_TEXT = """🔴 CZ posted a new tweet 🔴
+
+📝 Content:
+
+.@CoinMarketCap AI https://t.co/RfFBMHkSM6
+
+🕔 Time: 5/20/2025, 3:43:58 PM
+
+🔗 Source: https://x.com/cz_binance/status/1924853614155374842"""
+
+
+def test_kbot_template_builds_msg():
+    msg = TemplateRegistry().parse(KBOT_TEXT)
+    assert msg.name == "CZ"
+    assert msg.screen_name == "cz_binance"
+    assert msg.tweet_id == "1924853614155374842"
+    assert msg.content == ".@CoinMarketCap AI https://t.co/RfFBMHkSM6"
+    assert source_url(KBOT_TEXT) == "https://x.com/cz_binance/status/1924853614155374842"
+
+
+def test_unmatched_text_returns_none():
+    registry = TemplateRegistry()
+    assert registry.parse("🔗 Source: https://x.com/a/status/1") is None
+    assert registry.stats() == {"matched": 0, "unmatched": 1}
+
+
+def test_chat_templates_take_precedence(tmp_path):
+    path = tmp_path / "templates.json"
+    path.write_text(json.dumps([{
+        "name": "bio",
+        "chat_id": -1001,
+        "push_type": "new_description",
+        "pattern": r"^(?P<screen_name>\w+) updated bio: (?P<content>.+)$",
+    }]), encoding="utf-8")
+    registry = TemplateRegistry()
+    registry.load_file(str(path))
+
+    msg = registry.parse("toly updated bio: building $SOL", chat_id=-1001)
+    assert msg.push_type == "new_description"
+    assert msg.screen_name == "toly"
+    assert msg.content == "building $SOL"
+    # 其他频道不使用该模板
+    assert registry.parse("toly updated bio: building $SOL", chat_id=-1002) is None
+    registry.register(MessageTemplate("any", r"^(?P<content>.+)$"))
+    assert registry.parse("hello", chat_id=-1002).content == "hello"
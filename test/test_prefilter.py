@@ -0,0 +1,40 @@
+from core.data_def import Msg
+from core.prefilter import FAST_PATH, FULL, SKIP, TweetPrefilter
+
+EVM_CA = "0x" + "ab12" * 10
+SOL_CA = "7GCihgDB8fe6KNjn2MYtkzZcRjQy3t9GHdC8uHYmW2hr"
+
+
+def _msg(content, medias=None):
+    return Msg(push_type='new_tweet', title='', content=content, name='a', screen_name='a',
+               medias=medias or [])
+
+
+def test_extracts_tickers_and_addresses():
+    prefilter = TweetPrefilter()
+    assert prefilter.extract_cashtags("$BTC and $frog, $FROG again, price $100") == ["frog", "FROG"]
+    text = f"CA: {EVM_CA} sol {SOL_CA} https://x.com/a/status/{SOL_CA} supercalifragilisticexpialidociouswords"
+    assert prefilter.extract_addresses(text) == [EVM_CA, SOL_CA]
+    assert prefilter.match_keywords("Stealth LAUNCH today, capable 土狗") == ["stealth launch", "土狗"]
+
+
+def test_triage_decisions_and_counters():
+    prefilter = TweetPrefilter(threshold=1.0, fast_path_score=4.0)
+    assert prefilter.triage(_msg("gm frens")).decision == SKIP
+    assert prefilter.triage(_msg("$BTC looking strong, $ETH too")).decision == SKIP
+    assert prefilter.triage(_msg("gm", medias=["https://pbs.twimg.com/media/A.jpg"])).decision == FULL
+    assert prefilter.triage(_msg("new meme incoming")).decision == FULL
+
+    fast = prefilter.triage(_msg(f"$FROG launching now, CA {EVM_CA}"))
+    assert fast.decision == FAST_PATH
+    assert fast.tokens == ["FROG", EVM_CA]
+    # 快速路径只给出合约地址, 代币符号由大模型按过滤规则判断
+    assert fast.to_analysis_result().token_names == [EVM_CA]
+    # 只有代币符号时即使分数足够也交给大模型, 避免已上架大型交易所的代币绕过过滤
+    tickers = prefilter.triage(_msg("$PEPE $WIF $BONK launching, huge pump"))
+    assert tickers.score >= 4.0
+    assert tickers.decision == FULL
+
+    assert prefilter.stats() == {SKIP: 2, FAST_PATH: 1, FULL: 3, "total": 6,
+                                 "llm_saved": 3, "llm_saved_ratio": 0.5}
+    assert TweetPrefilter(fast_path_enabled=False).triage(_msg(f"$FROG {EVM_CA}")).decision == FULL
@@ -0,0 +1,95 @@
+import asyncio
+from pathlib import Path
+from aiohttp import web
+from utils.tweet_resolver import TweetResolver, status_key
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PAGES = {
+    "realDonaldTrump": "tweet_rendered.html",
+    "elonmusk": "tweet_og.html",
+    "shell": "tweet_shell.html",
+}
+
+
+async def _serve():
+    requests = []
+
+    async def handler(request):
+        requests.append(request.path)
+        page = PAGES.get(request.match_info["user"])
+        if not page:
+            return web.Response(status=404)
+        return web.Response(text=(FIXTURES / page).read_text(encoding="utf-8"), content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{user}/status/{id}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", requests
+
+
+def test_status_key_ignores_host_and_query():
+    assert status_key("https://x.com/a/status/123?s=20") == status_key("https://twitter.com/a/status/123")
+
+
+def test_http_first_with_cache():
+    async def run():
+        runner, base, requests = await _serve()
+        browser_calls = []
+
+        async def browser_fetch(url):
+            browser_calls.append(url)
+            return {}
+
+        resolver = TweetResolver(browser_fetch=browser_fetch)
+        try:
+            url = f"{base}/realDonaldTrump/status/1923432648103333919"
+            result = await resolver.resolve(url)
+            assert result["content"] == "Launching $TRUMP today on Solana"
+            assert result["name"] == "Donald J. Trump"
+            assert result["username"] == "realDonaldTrump"
+            assert result["timestamp"] == "2025-05-16T18:02:11.000Z"
+
+            # Open Graph 元信息同样可以解析
+            result = await resolver.resolve(f"{base}/elonmusk/status/1924523182909747657")
+            assert result["content"] == "Dogecoin to the moon 🚀"
+            assert result["name"] == "Elon Musk"
+            assert result["username"] == "elonmusk"
+
+            # 同一推文命中缓存, 不再发起请求
+            await resolver.resolve(url + "?s=20")
+            assert len(requests) == 2
+            assert browser_calls == []
+            assert resolver.stats()["http_resolved"] == 2
+        finally:
+            await resolver.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_browser_fallback_and_shared_inflight():
+    async def run():
+        runner, base, requests = await _serve()
+        browser_calls = []
+
+        async def browser_fetch(url):
+            browser_calls.append(url)
+            await asyncio.sleep(0.05)
+            return {"content": "rendered", "name": "Shell", "username": "shell", "timestamp": None}
+
+        resolver = TweetResolver(browser_fetch=browser_fetch)
+        try:
+            url = f"{base}/shell/status/1"
+            results = await asyncio.gather(*(resolver.resolve(url) for _ in range(3)))
+            assert [r["content"] for r in results] == ["rendered"] * 3
+            assert len(browser_calls) == 1
+            assert resolver.stats()["browser_resolved"] == 1
+        finally:
+            await resolver.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
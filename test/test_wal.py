@@ -0,0 +1,64 @@
+import asyncio
+import os
+from core.wal import WriteAheadLog
+
+
+def _segments(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.log'))
+
+
+def test_replay_skips_completed_records(tmp_path):
+    async def run():
+        wal = WriteAheadLog(str(tmp_path))
+        wal.replay()
+        await wal.open()
+        first, second = await asyncio.gather(
+            wal.append("msg", {"content": "a"}),
+            wal.append("msg", {"content": "b"}),
+        )
+        wal.mark_done(first)
+        await wal.close()
+        return second
+
+    pending_id = asyncio.run(run())
+
+    # 模拟重启
+    pending = WriteAheadLog(str(tmp_path)).replay()
+    assert [r.record_id for r in pending] == [pending_id]
+    assert pending[0].kind == "msg" and pending[0].payload == {"content": "b"}
+
+
+def test_ignores_truncated_tail(tmp_path):
+    async def run():
+        wal = WriteAheadLog(str(tmp_path))
+        wal.replay()
+        await wal.open()
+        await wal.append("msg", {"content": "a"})
+        await wal.close()
+
+    asyncio.run(run())
+    with open(os.path.join(str(tmp_path), _segments(str(tmp_path))[-1]), 'ab') as f:
+        f.write(b'{"t": "push", "id": "half')
+    assert len(WriteAheadLog(str(tmp_path)).replay()) == 1
+
+
+def test_rotates_and_deletes_completed_segments(tmp_path):
+    async def run():
+        wal = WriteAheadLog(str(tmp_path), segment_max_bytes=1)
+        wal.replay()
+        await wal.open()
+        ids = []
+        for i in range(3):
+            ids.append(await wal.append("msg", {"i": i}))
+        assert len(_segments(str(tmp_path))) == 3
+        for record_id in ids:
+            wal.mark_done(record_id)
+        # 完成记录写入后, 之前的分段才会被删除
+        await wal.append("msg", {"i": 3})
+        await wal.append("msg", {"i": 4})
+        await wal.close()
+
+    asyncio.run(run())
+    assert len(_segments(str(tmp_path))) < 5
+    pending = WriteAheadLog(str(tmp_path)).replay()
+    assert [r.payload["i"] for r in pending] == [3, 4]
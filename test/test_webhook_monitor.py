@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+import pytest
+from quart import Quart
+from config.config import cfg
+from monitor.ingest_queue import IngestQueue
+from monitor.webhook_monitor import WebhookMonitor
+import notify.notice as notice
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "push_samples.jsonl")
+
+
+def _samples():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _monitor(maxsize=100):
+    """只初始化批量接口用到的部分, 不创建分析器和交易模块"""
+    gate = asyncio.Event()
+
+    async def handler(msg):
+        await gate.wait()
+
+    monitor = WebhookMonitor.__new__(WebhookMonitor)
+    monitor.app = Quart(__name__)
+    monitor.wal = None
+    monitor.ingest_queue = IngestQueue(handler, workers=1, maxsize=maxsize)
+    monitor._register_routes()
+    return monitor, gate
+
+
+async def _post(monitor, gate, body, start=True):
+    if start:
+        await monitor.ingest_queue.start()
+    try:
+        response = await monitor.app.test_client().post("/post/tweets", data=body)
+        return response.status_code, await response.get_json()
+    finally:
+        gate.set()
+        await monitor.ingest_queue.stop()
+
+
+@pytest.fixture(autouse=True)
+def notices(monkeypatch):
+    sent = []
+    monkeypatch.setattr(notice, "send_notice_msg", lambda msg, *args, **kwargs: sent.append(msg) or True)
+    return sent
+
+
+def test_split_batch_json_array_and_ndjson():
+    lines = _samples()[:2]
+    items = WebhookMonitor._split_batch("[" + ",".join(lines) + "]")
+    assert [item["push_type"] for item in items] == ["new_tweet", "new_description"]
+    # NDJSON 跳过空行, 保留原始字符串由后续逐条解析
+    assert WebhookMonitor._split_batch("\n" + lines[0] + "\n\n  \n" + lines[1] + "\n") == lines
+    assert WebhookMonitor._split_batch("  \n ") == []
+    with pytest.raises(ValueError):
+        WebhookMonitor._split_batch("[" + lines[0])
+    with pytest.raises(ValueError):
+        WebhookMonitor._split_batch("[]]")
+
+
+def test_batch_reports_parse_errors_per_item():
+    lines = _samples()[:2]
+    body = "\n".join([lines[0], "{not json", "", lines[1], json.dumps({"push_type": "new_tweet"})])
+
+    async def run():
+        monitor, gate = _monitor()
+        return await _post(monitor, gate, body)
+
+    status, result = asyncio.run(run())
+    assert status == 200
+    assert result["status"] == "partial"
+    assert (result["accepted"], result["rejected"]) == (2, 2)
+    assert [item["status"] for item in result["results"]] == ["queued", "error", "queued", "error"]
+    assert result["results"][1]["message"].startswith("parse error")
+
+
+def test_batch_all_invalid_returns_400():
+    async def run():
+        monitor, gate = _monitor()
+        return await _post(monitor, gate, "{not json\n[1]")
+
+    status, result = asyncio.run(run())
+    assert status == 400
+    assert result["status"] == "error"
+    assert result["accepted"] == 0
+
+
+def test_batch_over_limit_returns_413(monkeypatch):
+    monkeypatch.setattr(cfg.monitor, "batch_max_items", 2)
+    lines = _samples()[:3]
+
+    async def run():
+        monitor, gate = _monitor()
+        return await _post(monitor, gate, "\n".join(lines))
+
+    status, result = asyncio.run(run())
+    assert status == 413
+    assert "max 2" in result["message"]
+
+
+def test_batch_queue_full_statuses():
+    lines = _samples()[:3]
+
+    async def run():
+        # 整批同步入队, 前两条占满队列, 第三条被拒绝
+        monitor, gate = _monitor(maxsize=2)
+        partial = await _post(monitor, gate, "\n".join(lines))
+        # 队列已满且没有任何一条入队时返回 429
+        monitor, gate = _monitor(maxsize=1)
+        await monitor.ingest_queue.start()
+        monitor.ingest_queue.put_nowait(None)
+        await asyncio.sleep(0)
+        monitor.ingest_queue.put_nowait(None)
+        full = await _post(monitor, gate, lines[0], start=False)
+        # 队列未启动时返回 503
+        monitor, gate = _monitor()
+        stopped = await monitor.app.test_client().post("/post/tweets", data=lines[0])
+        return partial, full, stopped.status_code
+
+    (partial_status, partial), (full_status, full), stopped_status = asyncio.run(run())
+    assert partial_status == 200
+    assert partial["status"] == "partial"
+    assert [item["status"] for item in partial["results"]] == ["queued", "queued", "error"]
+    assert partial["results"][2]["message"] == "queue full"
+    assert full_status == 429
+    assert full["status"] == "error"
+    assert stopped_status == 503
+
+
+def test_single_push_notifies_only_when_queued(notices):
+    line = _samples()[0]
+
+    async def run():
+        monitor, gate = _monitor(maxsize=1)
+        await monitor.ingest_queue.start()
+        client = monitor.app.test_client()
+        try:
+            accepted = await client.post("/post/tweet", data=line)
+            await asyncio.sleep(0)
+            queued = await client.post("/post/tweet", data=line)
+            rejected = await client.post("/post/tweet", data=line)
+        finally:
+            gate.set()
+            await monitor.ingest_queue.stop()
+        stopped = await client.post("/post/tweet", data=line)
+        return [r.status_code for r in (accepted, queued, rejected, stopped)]
+
+    assert asyncio.run(run()) == [200, 200, 429, 503]
+    # 被拒绝(429/503)的推送不发送通知
+    assert len(notices) == 2
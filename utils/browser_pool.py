@@ -0,0 +1,277 @@
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from loguru import logger
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+)
+
+# 进程内只检查/安装一次 Chromium
+_install_checked = False
+
+# 关闭或重启时放入旧的空闲队列, 唤醒仍在等待旧队列的借用方
+_RESTARTED = object()
+_CLOSED = object()
+
+
+class _PooledPage:
+    """池中的页面及其使用次数"""
+    __slots__ = ("context", "page", "uses")
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.uses = 0
+
+
+class BrowserPool:
+    """常驻的无头浏览器页面池
+
+    进程内只启动一次 Chromium, 预先创建若干个独立 context 的页面循环复用;
+    页面使用达到 max_uses 次或出错后关闭并重建, 避免页面内存持续增长.
+    浏览器进程崩溃(断开连接)后, 下次借出页面时自动重启.
+    """
+
+    def __init__(self, size: int = 2, max_uses: int = 50, headless: bool = True,
+                 user_agent: str = DEFAULT_USER_AGENT, lease_timeout: Optional[float] = None):
+        """
+        Args:
+            size: 页面数量, 即最大并发渲染数
+            max_uses: 单个页面最多使用次数, 超过后回收重建
+            headless: 是否无头模式
+            user_agent: 浏览器 UA
+            lease_timeout: 等待空闲页面的默认超时(秒), None 表示一直等待
+        """
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self.user_agent = user_agent
+        self.lease_timeout = lease_timeout
+        self._playwright = None
+        self._browser = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._pages: List[_PooledPage] = []
+        self._lock = asyncio.Lock()
+        self._crashed = False
+        self.leases = 0
+        self.lease_timeouts = 0
+        self.recycled = 0
+        self.restarts = 0
+
+    @property
+    def started(self) -> bool:
+        return self._browser is not None
+
+    async def start(self):
+        """启动浏览器并创建页面, 重复调用无副作用"""
+        async with self._lock:
+            if self._browser:
+                return
+            await self._launch()
+            logger.info(f"浏览器页面池已启动, 页面数: {self.size}")
+
+    async def _launch(self):
+        from playwright.async_api import async_playwright
+
+        global _install_checked
+        self._playwright = await async_playwright().start()
+        try:
+            try:
+                browser = await self._playwright.chromium.launch(headless=self.headless)
+            except Exception:
+                if _install_checked:
+                    raise
+                # 首次启动失败时安装 Chromium 后重试
+                _install_checked = True
+                await install_chromium()
+                browser = await self._playwright.chromium.launch(headless=self.headless)
+            _install_checked = True
+            browser.on("disconnected", self._on_disconnected)
+            self._browser = browser
+            self._crashed = False
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                self._idle.put_nowait(await self._new_page())
+        except BaseException:
+            # 启动失败时关闭已启动的浏览器和 Playwright, 下次借出页面时重新启动
+            await self._shutdown()
+            await self._stop_playwright()
+            raise
+
+    def _on_disconnected(self, *args):
+        if self._browser is not None:
+            logger.warning("浏览器进程已断开, 下次使用时重启")
+            self._crashed = True
+
+    async def restart(self):
+        """关闭当前浏览器并重新启动, 借出中的页面归还时直接丢弃"""
+        async with self._lock:
+            if self._browser and not self._crashed:
+                return
+            await self._shutdown(_RESTARTED)
+            await self._launch()
+            self.restarts += 1
+            logger.info("浏览器已重启")
+
+    async def close(self):
+        async with self._lock:
+            await self._shutdown()
+
+    async def _shutdown(self, reason=_CLOSED):
+        if not self._browser:
+            return
+        browser = self._browser
+        self._browser = None
+        # 唤醒等待旧队列的借用方: 重启时改从新队列借出, 关闭时直接失败
+        if self._idle is not None:
+            self._idle.put_nowait(reason)
+        self._idle = None
+        self._pages.clear()
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.warning(f"关闭浏览器时出错: {str(e)}")
+        await self._stop_playwright()
+
+    async def _stop_playwright(self):
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.warning(f"停止 Playwright 时出错: {str(e)}")
+            self._playwright = None
+
+    async def _new_page(self) -> _PooledPage:
+        context = await self._browser.new_context(user_agent=self.user_agent)
+        pooled = _PooledPage(context, await context.new_page())
+        self._pages.append(pooled)
+        return pooled
+
+    async def _close_page(self, pooled: _PooledPage):
+        if pooled in self._pages:
+            self._pages.remove(pooled)
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            logger.warning(f"关闭浏览器页面时出错: {str(e)}")
+
+    @asynccontextmanager
+    async def page(self, timeout: Optional[float] = None):
+        """
+        借出一个页面, 用完自动归还
+
+        使用中抛出异常的页面不再复用, 关闭后重建
+
+        Args:
+            timeout: 等待空闲页面的超时(秒), 默认使用 lease_timeout
+
+        Raises:
+            asyncio.TimeoutError: 超时仍没有空闲页面
+            RuntimeError: 等待期间页面池被关闭
+        """
+        loop = asyncio.get_running_loop()
+        timeout = self.lease_timeout if timeout is None else timeout
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            if not self._browser:
+                await self.start()
+            elif self._crashed:
+                await self.restart()
+            idle = self._idle
+            remaining = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                pooled: Optional[_PooledPage] = await asyncio.wait_for(idle.get(), remaining)
+            except asyncio.TimeoutError:
+                self.lease_timeouts += 1
+                raise
+            if pooled is _RESTARTED or pooled is _CLOSED:
+                # 等待期间浏览器已重启或关闭, 传给下一个等待旧队列的借用方
+                idle.put_nowait(pooled)
+                if pooled is _CLOSED:
+                    raise RuntimeError("浏览器页面池已关闭")
+                continue
+            break
+        if pooled is None:
+            # 之前重建失败留下的空位, 借出时再创建
+            try:
+                pooled = await self._new_page()
+            except Exception:
+                idle.put_nowait(None)
+                raise
+        pooled.uses += 1
+        self.leases += 1
+        healthy = False
+        try:
+            yield pooled.page
+            healthy = True
+        finally:
+            await self._release(pooled, idle, healthy)
+
+    async def _release(self, pooled: _PooledPage, idle: asyncio.Queue, healthy: bool):
+        if idle is not self._idle:
+            # 借出期间浏览器已关闭或重启
+            return
+        if self._crashed:
+            idle.put_nowait(None)
+            return
+        if healthy and pooled.uses < self.max_uses:
+            idle.put_nowait(pooled)
+            return
+        self.recycled += 1
+        await self._close_page(pooled)
+        try:
+            idle.put_nowait(await self._new_page())
+        except Exception as e:
+            logger.error(f"重建浏览器页面失败: {str(e)}")
+            idle.put_nowait(None)
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "crashed": self._crashed,
+            "pages": len(self._pages),
+            "idle": self._idle.qsize() if self._idle else 0,
+            "leases": self.leases,
+            "lease_timeouts": self.lease_timeouts,
+            "recycled": self.recycled,
+            "restarts": self.restarts,
+        }
+
+
+async def install_chromium():
+    """安装 Playwright Chromium"""
+    logger.info("正在安装 Playwright Chromium...")
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "playwright", "install", "chromium"
+    )
+    if await process.wait() != 0:
+        raise RuntimeError("安装 Playwright Chromium 失败")
+    logger.info("Playwright Chromium 安装完成")
+
+
+_shared_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """获取进程内共享的浏览器页面池"""
+    global _shared_pool
+    if _shared_pool is None:
+        from config.config import cfg
+
+        _shared_pool = BrowserPool(
+            size=cfg.monitor.browser_pages,
+            max_uses=cfg.monitor.browser_page_max_uses,
+            lease_timeout=cfg.monitor.browser_lease_timeout
+        )
+    return _shared_pool
+
+
+async def close_browser_pool():
+    """关闭共享的浏览器页面池"""
+    global _shared_pool
+    if _shared_pool is not None:
+        await _shared_pool.close()
+        _shared_pool = None
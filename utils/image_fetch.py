@@ -0,0 +1,116 @@
+import asyncio
+import base64
+import io
+from dataclasses import dataclass
+from typing import Optional
+import aiohttp
+from loguru import logger
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - Pillow 为可选依赖
+    Image = None
+
+# 文件头 -> 图片类型, 响应头缺失或不可信时使用
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+@dataclass
+class FetchedImage:
+    data: bytes
+    content_type: str
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.data).decode('utf-8')
+
+    def to_data_url(self) -> str:
+        return f"data:{self.content_type};base64,{self.to_base64()}"
+
+
+class ImageTooLarge(ValueError):
+    """图片超过大小限制"""
+
+
+def sniff_content_type(data: bytes, default: str = "image/jpeg") -> str:
+    """根据文件头判断图片类型"""
+    for signature, content_type in _SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return default
+
+
+async def fetch_image(url: str, session: Optional[aiohttp.ClientSession] = None,
+                      max_bytes: int = 10 * 1024 * 1024, timeout: float = 10.0) -> FetchedImage:
+    """
+    流式下载图片, 超过 max_bytes 时立即中止
+
+    Raises:
+        ImageTooLarge: 图片超过大小限制
+        aiohttp.ClientError: 请求失败
+    """
+    own_session = session is None
+    if own_session:
+        session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout))
+    try:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            if response.content_length and response.content_length > max_bytes:
+                raise ImageTooLarge(f"图片大小 {response.content_length} 超过限制 {max_bytes}")
+            buffer = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                buffer.extend(chunk)
+                if len(buffer) > max_bytes:
+                    raise ImageTooLarge(f"图片大小超过限制 {max_bytes}")
+            header_type = (response.content_type or "").lower()
+    finally:
+        if own_session:
+            await session.close()
+    data = bytes(buffer)
+    content_type = header_type if header_type.startswith("image/") else sniff_content_type(data)
+    return FetchedImage(data, content_type)
+
+
+def shrink_image(image: FetchedImage, max_dimension: int = 1024, quality: int = 85,
+                 min_bytes: int = 256 * 1024) -> FetchedImage:
+    """
+    缩放并重新压缩图片(需要 Pillow, 未安装时原样返回)
+
+    尺寸不超过 max_dimension 且小于 min_bytes 的图片不做处理;
+    GIF 只取第一帧, 带透明通道的图片压缩为 PNG, 其他压缩为 JPEG.
+    """
+    if Image is None:
+        return image
+    try:
+        with Image.open(io.BytesIO(image.data)) as img:
+            if max(img.size) <= max_dimension and len(image.data) < min_bytes:
+                return image
+            img.thumbnail((max_dimension, max_dimension))
+            output = io.BytesIO()
+            if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+                img.convert("RGBA").save(output, format="PNG", optimize=True)
+                content_type = "image/png"
+            else:
+                img.convert("RGB").save(output, format="JPEG", quality=quality, optimize=True)
+                content_type = "image/jpeg"
+    except Exception as e:
+        logger.warning(f"压缩图片失败, 使用原图: {str(e)}")
+        return image
+    data = output.getvalue()
+    if len(data) >= len(image.data):
+        return image
+    return FetchedImage(data, content_type)
+
+
+async def shrink_image_async(image: FetchedImage, max_dimension: int = 1024, quality: int = 85) -> FetchedImage:
+    """在线程池中缩放图片, 不阻塞事件循环"""
+    if Image is None:
+        return image
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, shrink_image, image, max_dimension, quality)
@@ -0,0 +1,103 @@
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+_FENCE = re.compile(r'```[ \t]*(?:json|JSON)?[ \t]*\n?')
+_TRAILING_COMMA = re.compile(r',\s*$')
+
+
+def strip_code_fence(text: str) -> str:
+    """取出 markdown 代码块中的内容; 代码块没有结束(输出被截断)时取开头标记之后的全部内容"""
+    match = _FENCE.search(text)
+    if not match:
+        return text
+    end = text.find('```', match.end())
+    return text[match.end():end if end >= 0 else len(text)]
+
+
+def _scan(text: str) -> Tuple[str, List[str], bool, List[Tuple[int, List[str]]]]:
+    """
+    扫描第一个完整的JSON值, 同时去掉 } 和 ] 前多余的逗号
+
+    Returns:
+        (清理后的文本, 未闭合的括号栈, 是否停在字符串中, 可截断的位置及当时的括号栈)
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    cuts: List[Tuple[int, List[str]]] = []
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+            out.append(ch)
+            cuts.append((len(out), list(stack)))
+        elif ch in '}]':
+            # 去掉多余的逗号: [1, 2,] / {"a": 1,}
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                break
+        elif ch == ',':
+            cuts.append((len(out), list(stack)))
+            out.append(ch)
+        else:
+            out.append(ch)
+    return ''.join(out), stack, in_string, cuts
+
+
+def loads_lenient(text: str) -> Optional[Any]:
+    """
+    宽松地解析大模型返回的JSON
+
+    兼容 markdown 代码块、JSON 前后的说明文字、多余的逗号, 以及输出被截断时未闭合的数组和对象.
+    截断处不完整的键值会被丢弃; 截断在字符串中间时同样丢弃该键值, 不补全字符串,
+    避免 "PEP" 这样被截断的代币名称被当作完整结果. 也可以用于解析流式返回中途的文本.
+
+    Returns:
+        解析结果, 无法解析时返回 None
+    """
+    if not text:
+        return None
+    text = strip_code_fence(text)
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if not starts:
+        return None
+    text = text[min(starts):]
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    cleaned, stack, in_string, cuts = _scan(text)
+    candidates = []
+    if not stack:
+        candidates.append(cleaned)
+    else:
+        if not in_string:
+            candidates.append(_TRAILING_COMMA.sub('', cleaned.rstrip()) + ''.join(reversed(stack)))
+        # 截断处的键值不完整时, 从后往前退回到上一个逗号或括号
+        for position, cut_stack in reversed(cuts):
+            candidates.append(cleaned[:position] + ''.join(reversed(cut_stack)))
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
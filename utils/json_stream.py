@@ -0,0 +1,48 @@
+import json
+import re
+from typing import List
+
+
+class JsonFieldStream:
+    """从流式返回的JSON文本中增量提取字段值
+
+    每收到一段文本调用一次 feed, 字段的字符串值完整(遇到结束引号)后立即返回,
+    不需要等待整个JSON结束; 兼容外层的 markdown 代码块. 每个值只返回一次.
+    """
+
+    def __init__(self, field: str):
+        """
+        Args:
+            field: 字段名, 如 token_name
+        """
+        self._pattern = re.compile(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)"' % re.escape(field))
+        self._text = ''
+        # 已扫描到的位置, 之后只从这里继续匹配
+        self._pos = 0
+        self.values: List[str] = []
+
+    @property
+    def text(self) -> str:
+        """目前收到的全部文本"""
+        return self._text
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        追加一段文本
+
+        Returns:
+            List[str]: 本次新得到的字段值
+        """
+        self._text += chunk
+        new_values = []
+        for match in self._pattern.finditer(self._text, self._pos):
+            self._pos = match.end()
+            try:
+                value = json.loads(f'"{match.group(1)}"')
+            except ValueError:
+                value = match.group(1)
+            value = value.strip()
+            if value and value not in self.values:
+                self.values.append(value)
+                new_values.append(value)
+        return new_values
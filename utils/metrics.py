@@ -0,0 +1,63 @@
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+
+class LatencyTracker:
+    """耗时统计
+
+    保留最近 window 次请求的耗时, 计算平均值和分位数; 失败的请求只计数, 不计入耗时分布.
+    """
+
+    def __init__(self, window: int = 512):
+        """
+        Args:
+            window: 参与分位数计算的最近样本数
+        """
+        self._samples: deque = deque(maxlen=max(1, int(window)))
+        self.count = 0
+        self.errors = 0
+
+    def record(self, seconds: float):
+        """记录一次成功请求的耗时(秒)"""
+        self._samples.append(seconds)
+        self.count += 1
+
+    def record_error(self):
+        self.errors += 1
+
+    @contextmanager
+    def measure(self):
+        """统计代码块耗时, 代码块抛出异常时记为失败(被取消不计入)"""
+        start = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.errors += 1
+            raise
+        self.record(time.monotonic() - start)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """最近样本的第 p 百分位耗时(秒), 没有样本时返回 None"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def stats(self) -> Dict[str, Any]:
+        samples = self._samples
+
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": ms(sum(samples) / len(samples)) if samples else None,
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "max_ms": ms(max(samples)) if samples else None,
+        }
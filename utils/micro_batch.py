@@ -0,0 +1,92 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+
+class MicroBatcher:
+    """微批处理
+
+    在 window 秒内收集提交的条目, 凑满 max_size 条或窗口到期时调用一次 handler 批量处理,
+    再把结果分发给各自的调用方. handler 返回与输入等长、顺序一致的结果列表.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], Awaitable[List[Any]]],
+                 max_size: int = 8, window: float = 0.05, name: str = "batch"):
+        """
+        Args:
+            handler: 批量处理函数
+            max_size: 每批最多条目数
+            window: 第一条目到达后最多等待的时间(秒)
+            name: 名称, 用于日志
+        """
+        self.handler = handler
+        self.max_size = max(1, int(max_size))
+        self.window = window
+        self.name = name
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+        self.max_batch = 0
+        self.failures = 0
+
+    async def submit(self, item: Any) -> Any:
+        """提交一个条目, 等待所在批次处理完成后返回该条目的结果"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # 等待期间已取消的调用方不再处理
+        batch = [(item, future) for item, future in self._pending if not future.done()]
+        self._pending = []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+        self.max_batch = max(self.max_batch, len(batch))
+        try:
+            results = await self.handler([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"批量处理返回 {len(results)} 条结果, 预期 {len(batch)} 条")
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"{self.name} 批量处理失败: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self):
+        """立即处理剩余条目并等待所有批次完成"""
+        if self._pending:
+            self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "failures": self.failures,
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,112 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """带过期时间的 LRU 缓存
+
+    - 条目数超过 max_entries 时淘汰最久未使用的条目, 用于限制内存占用
+    - 条目在 ttl 秒后过期, 访问时惰性清理
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_entries: 最大条目数
+            ttl: 过期时间(秒)
+            clock: 时间函数, 便于测试替换
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl)
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    def _lookup(self, key: Hashable) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return _MISSING
+        expires_at, value = item
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.expirations += 1
+            return _MISSING
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存, 命中时刷新 LRU 顺序"""
+        value = self._lookup(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any = True, ttl: Optional[float] = None):
+        """写入缓存"""
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        self._evict()
+
+    def add(self, key: Hashable, value: Any = True) -> bool:
+        """
+        不存在时写入
+
+        Returns:
+            bool: True 表示新写入, False 表示已存在(计为命中)
+        """
+        if self._lookup(key) is not _MISSING:
+            self.hits += 1
+            self._data.move_to_end(key)
+            return False
+        self.misses += 1
+        self.set(key, value)
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def purge_expired(self) -> int:
+        """清理所有过期条目, 返回清理数量"""
+        now = self._clock()
+        expired = [k for k, (expires_at, _) in self._data.items() if expires_at <= now]
+        for k in expired:
+            del self._data[k]
+        self.expirations += len(expired)
+        return len(expired)
+
+    def _evict(self):
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
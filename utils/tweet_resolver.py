@@ -0,0 +1,173 @@
+import asyncio
+import re
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+import aiohttp
+from bs4 import BeautifulSoup
+from loguru import logger
+from utils.ttl_cache import TTLCache
+from utils.x_abstract import extract_author, extract_content, extract_time, fetch_tweet_details
+
+# 以爬虫 UA 请求时, 推文页面会直接返回带标题/Open Graph 信息的 HTML, 无需渲染
+DEFAULT_HTTP_USER_AGENT = "Mozilla/5.0 (compatible; Twitterbot/1.0)"
+
+_STATUS_RE = re.compile(r'/([A-Za-z0-9_]+)/status(?:es)?/(\d+)')
+_OG_TITLE_RE = re.compile(r'^(.*?) (?:on X|on Twitter)\b')
+
+
+def status_key(url: str) -> str:
+    """推文链接的缓存键, x.com / twitter.com / 带查询参数的链接指向同一条推文"""
+    match = _STATUS_RE.search(urlsplit(url).path)
+    return f"status:{match.group(2)}" if match else url
+
+
+def parse_status_html(html: str, url: str = '') -> Dict[str, Optional[str]]:
+    """
+    轻量解析推文页面HTML
+
+    优先使用浏览器渲染后才有的 title / User-Name 区块, 缺失时退而使用
+    Open Graph 元信息和链接中的用户名
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    author = extract_author(soup) or {}
+    result = {
+        "content": extract_content(soup),
+        "name": author.get("name"),
+        "username": author.get("username"),
+        "timestamp": extract_time(soup),
+    }
+    if not result["content"]:
+        description = _meta(soup, "og:description")
+        if description:
+            result["content"] = description.strip().strip('"“”')
+    if not result["name"]:
+        title = _meta(soup, "og:title")
+        match = _OG_TITLE_RE.match(title or '')
+        if match:
+            result["name"] = match.group(1)
+    if not result["username"]:
+        match = _STATUS_RE.search(urlsplit(url).path)
+        if match and match.group(1) != "i":
+            result["username"] = match.group(1)
+    return result
+
+
+def _meta(soup, prop: str) -> Optional[str]:
+    tag = soup.find('meta', attrs={'property': prop}) or soup.find('meta', attrs={'name': prop})
+    return tag.get('content') if tag else None
+
+
+class TweetResolver:
+    """推文解析器
+
+    先用普通 HTTP 请求获取推文页面并轻量解析, 失败时才使用浏览器渲染;
+    解析结果按推文缓存, 同一推文的并发请求共享一次解析.
+    """
+
+    def __init__(self, http_timeout: float = 5.0, cache_ttl: float = 600.0,
+                 cache_max_entries: int = 1000,
+                 browser_fetch: Optional[Callable[[str], Awaitable[dict]]] = None,
+                 user_agent: str = DEFAULT_HTTP_USER_AGENT):
+        """
+        Args:
+            http_timeout: HTTP 请求超时(秒)
+            cache_ttl: 解析结果缓存时间(秒)
+            cache_max_entries: 缓存最大条目数
+            browser_fetch: 浏览器渲染的回退函数, 默认使用常驻浏览器页面池
+            user_agent: HTTP 请求的 UA
+        """
+        self.http_timeout = http_timeout
+        self.cache = TTLCache(max_entries=cache_max_entries, ttl=cache_ttl)
+        self.browser_fetch = browser_fetch or fetch_tweet_details
+        self.user_agent = user_agent
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.http_resolved = 0
+        self.browser_resolved = 0
+        self.failed = 0
+
+    async def resolve(self, url: str) -> dict:
+        """
+        解析推文链接
+
+        Returns:
+            dict: content/name/username/timestamp
+        """
+        key = status_key(url)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                return dict(await asyncio.shield(pending))
+            except asyncio.CancelledError:
+                # 发起解析的任务被取消(如超时)时, 由当前任务重新解析
+                if not pending.cancelled():
+                    raise
+            return await self.resolve(url)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._resolve(url)
+            if result.get("content"):
+                self.cache.set(key, result)
+            future.set_result(result)
+            return dict(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _resolve(self, url: str) -> dict:
+        try:
+            result = await self._fetch_http(url)
+            if result and result.get("content") and result.get("username"):
+                self.http_resolved += 1
+                return result
+            logger.debug(f"HTTP解析推文信息不完整, 使用浏览器渲染: {url}")
+        except Exception as e:
+            logger.debug(f"HTTP获取推文失败, 使用浏览器渲染: {url}, {str(e)}")
+        try:
+            result = await self.browser_fetch(url)
+        except Exception:
+            self.failed += 1
+            raise
+        self.browser_resolved += 1
+        return result
+
+    async def _fetch_http(self, url: str) -> Optional[dict]:
+        session = await self._get_session()
+        async with session.get(url, allow_redirects=True) as response:
+            if response.status != 200:
+                return None
+            html = await response.text()
+        return parse_status_html(html, url)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.http_timeout),
+                headers={"User-Agent": self.user_agent, "Accept-Language": "en-US,en;q=0.9"}
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def stats(self) -> dict:
+        return {
+            "http_resolved": self.http_resolved,
+            "browser_resolved": self.browser_resolved,
+            "failed": self.failed,
+            "cache": self.cache.stats(),
+        }
@@ -1,7 +1,46 @@
 from playwright.sync_api import sync_playwright
 from bs4 import BeautifulSoup
+from loguru import logger
+from typing import Optional
+from utils.browser_pool import BrowserPool, get_browser_pool
+from config.config import cfg
 import time
 
+# 推文正文/作者区块出现即认为页面已就绪
+TWEET_READY_SELECTOR = '[data-testid="tweetText"], [data-testid="User-Name"]'
+
+
+async def fetch_tweet_details(url, pool: Optional[BrowserPool] = None, ready_timeout: float = None):
+    """
+    使用常驻浏览器页面池获取推文详细信息
+
+    页面出现推文正文/作者区块后立即解析, 超过 ready_timeout 仍未出现时
+    退而等待网络空闲, 不再固定休眠.
+
+    :param url: 推文链接
+    :param pool: 浏览器页面池, 默认使用进程内共享的页面池
+    :param ready_timeout: 等待页面就绪的最长时间(秒)
+    :return: 结构化推文数据字典
+    """
+    pool = pool or get_browser_pool()
+    if ready_timeout is None:
+        ready_timeout = cfg.monitor.browser_ready_timeout
+    async with pool.page() as page:
+        deadline = time.monotonic() + ready_timeout
+        await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+        try:
+            await page.wait_for_selector(TWEET_READY_SELECTOR, timeout=ready_timeout * 1000)
+        except Exception:
+            remaining = max(deadline - time.monotonic(), 0.5)
+            logger.warning(f"推文页面在 {ready_timeout}s 内未就绪, 等待网络空闲: {url}")
+            try:
+                await page.wait_for_load_state("networkidle", timeout=remaining * 1000)
+            except Exception:
+                pass
+        html = await page.content()
+    return parse_tweet_html(html)
+
+
 def get_tweet_details(url):
     """
     通过浏览器模拟获取推文详细信息
@@ -20,23 +59,28 @@ def get_tweet_details(url):
         try:
             # 访问目标页面
             page.goto(url, timeout=60000)
-            time.sleep(3)  # 等待动态内容加载
+            try:
+                page.wait_for_selector(TWEET_READY_SELECTOR, timeout=10000)
+            except Exception:
+                page.wait_for_load_state("networkidle", timeout=10000)
             
             # 获取页面HTML内容
-            html = page.content()
-            soup = BeautifulSoup(html, 'html.parser')
-            author_info = extract_author(soup)
-            
-            # 解析关键数据
-            return {
-                "content": extract_content(soup),  # 修改字段名
-                "name": author_info.get("name"),
-                "username": author_info.get("username"),
-                "timestamp": extract_time(soup),
-            }
+            return parse_tweet_html(page.content())
         finally:
             browser.close()
 
+
+def parse_tweet_html(html):
+    """从推文页面HTML中解析关键数据"""
+    soup = BeautifulSoup(html, 'html.parser')
+    author_info = extract_author(soup) or {}
+    return {
+        "content": extract_content(soup),  # 修改字段名
+        "name": author_info.get("name"),
+        "username": author_info.get("username"),
+        "timestamp": extract_time(soup),
+    }
+
 # 辅助解析函数
 def extract_content(soup):
     # 从title标签提取推文内容（格式：作者名 on X: "内容" / X）